@@ -0,0 +1,108 @@
+"""Экономия места в S3 от перекодирования архивных копий в Opus для речи
+
+Для каждой записи из папки (*.ogg, *.oga, *.wav) и каждого битрейта
+считается размер архивной копии после encode_archive, сэкономленные байты и
+скорость кодирования (во сколько раз быстрее реального времени). Копия
+проверяется на пригодность к воспроизведению и повторному распознаванию:
+она снова декодируется, длительность должна совпадать с исходной. С флагом
+--transcribe исходная запись и копия отправляются в SpeechKit (или в
+заглушку tools.fake_speechkit через YANDEX_STT_URL) и сравнивается WER.
+
+    python -m benchmarks.bench_archive_encode <папка с записями> [--bitrates 12k,16k,24k] [--transcribe]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.bench_silence_trim import EXTENSIONS, transcribe, word_error_rate
+from src.services.audio_processing import decode_audio, encode_archive
+
+DEFAULT_BITRATES = ('12k', '16k', '24k')
+# Допустимое расхождение длительности копии (заполнение кадров Opus)
+DURATION_TOLERANCE_SECONDS = 0.1
+
+
+def parse_bitrates() -> List[str]:
+    if '--bitrates' in sys.argv:
+        return sys.argv[sys.argv.index('--bitrates') + 1].split(',')
+    return list(DEFAULT_BITRATES)
+
+
+async def main():
+    if len(sys.argv) < 2 or sys.argv[1].startswith('--'):
+        print(__doc__)
+        return
+    samples = sorted(path for path in Path(sys.argv[1]).iterdir() if path.suffix.lower() in EXTENSIONS)
+    if not samples:
+        print("В папке нет записей")
+        return
+    bitrates = parse_bitrates()
+    with_stt = '--transcribe' in sys.argv
+
+    totals: Dict[str, Dict[str, float]] = {
+        bitrate: {'bytes_in': 0, 'bytes_out': 0, 'audio_seconds': 0.0, 'encode_seconds': 0.0, 'kept': 0}
+        for bitrate in bitrates
+    }
+    errors: Dict[str, List[float]] = {bitrate: [] for bitrate in bitrates}
+
+    for path in samples:
+        audio_data = path.read_bytes()
+        audio_format = EXTENSIONS[path.suffix.lower()]
+        reference = None
+        if with_stt:
+            reference_path = path.with_suffix('.txt')
+            reference = (
+                reference_path.read_text(encoding='utf-8') if reference_path.exists()
+                else (await transcribe(audio_data))[0]
+            )
+
+        for bitrate in bitrates:
+            started = time.perf_counter()
+            result = encode_archive(audio_data, audio_format, bitrate)
+            seconds = time.perf_counter() - started
+
+            duration = result['duration_seconds']
+            archive = result['audio']
+            decoded = len(decode_audio(archive, 'ogg' if result['codec'] else audio_format)) / 1000
+            assert abs(decoded - duration) <= DURATION_TOLERANCE_SECONDS, (path.name, bitrate, decoded, duration)
+
+            total = totals[bitrate]
+            total['bytes_in'] += len(audio_data)
+            total['bytes_out'] += len(archive)
+            total['audio_seconds'] += duration
+            total['encode_seconds'] += seconds
+            total['kept'] += result['codec'] is None
+
+            line = (
+                f"{path.name:30s} {bitrate:>4s} {len(audio_data):8d} -> {len(archive):8d} байт "
+                f"(сэкономлено {len(audio_data) - len(archive):7d}), "
+                f"{seconds * 1000:5.0f} мс, x{duration / seconds:.0f}"
+            )
+            if with_stt and result['codec']:
+                text, _ = await transcribe(archive)
+                wer = word_error_rate(reference, text)
+                errors[bitrate].append(wer)
+                line += f"  WER {wer:.3f}"
+            print(line)
+
+    print(f"\nзаписей: {len(samples)}")
+    print(f"{'битрейт':8s}{'байт на запись':>22s}{'экономия':>22s}{'кодирование':>16s}{'скорость':>12s}")
+    for bitrate, total in totals.items():
+        count = len(samples)
+        saved = total['bytes_in'] - total['bytes_out']
+        print(
+            f"{bitrate:8s}{total['bytes_in'] / count:10.0f} -> {total['bytes_out'] / count:8.0f}"
+            f"{saved / count:12.0f} ({saved / total['bytes_in'] * 100:5.1f}%)"
+            f"{total['encode_seconds'] / count * 1000:13.0f} мс"
+            f"{total['audio_seconds'] / total['encode_seconds']:10.0f}x"
+        )
+        if total['kept']:
+            print(f"        исходная запись сохранена для {total['kept']:.0f} (копия не меньше)")
+        if errors[bitrate]:
+            print(f"        WER копии: в среднем {sum(errors[bitrate]) / len(errors[bitrate]):.3f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
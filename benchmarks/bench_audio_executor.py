@@ -0,0 +1,62 @@
+"""Масштабирование пула обработки аудио по числу процессов
+
+Каждое задание декодирует голосовое сообщение (analyze_voice). По умолчанию
+используется синтетический WAV, для реальной нагрузки можно передать OGG файл:
+
+    python -m benchmarks.bench_audio_executor [задания] [путь к voice.ogg]
+"""
+import asyncio
+import io
+import sys
+import time
+
+from src.services.audio_executor import AudioExecutor, available_cpus
+from src.services.audio_processing import analyze_voice
+
+
+def synthetic_voice(seconds: int = 30) -> bytes:
+    """Синусоида в WAV: декодируется без ffmpeg"""
+    from pydub.generators import Sine
+
+    buffer = io.BytesIO()
+    Sine(220).to_audio_segment(duration=seconds * 1000).set_frame_rate(48000).export(buffer, format='wav')
+    return buffer.getvalue()
+
+
+async def run(workers: int, jobs: int, audio_data: bytes, audio_format: str) -> float:
+    """Возвращает пропускную способность в заданиях в секунду"""
+    executor = AudioExecutor(workers)
+    try:
+        # Прогрев: процессы запускаются до замера
+        await asyncio.gather(*(
+            executor.submit(str(shard), analyze_voice, audio_data, audio_format) for shard in range(workers * 4)
+        ))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            executor.submit(str(user_id), analyze_voice, audio_data, audio_format) for user_id in range(jobs)
+        ))
+        return jobs / (time.perf_counter() - started)
+    finally:
+        executor.shutdown()
+
+
+async def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'rb') as f:
+            audio_data, audio_format = f.read(), 'ogg'
+    else:
+        audio_data, audio_format = synthetic_voice(), 'wav'
+
+    cpus = available_cpus()
+    counts = sorted({1, 2, 4, 8, 16, cpus} & set(range(1, cpus + 1)))
+    baseline = None
+    for workers in counts:
+        throughput = await run(workers, jobs, audio_data, audio_format)
+        baseline = baseline or throughput
+        print(f"процессов: {workers:2d}  {throughput:8.1f} заданий/с  ускорение x{throughput / baseline:.2f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""Размер базы и скорость чтения/записи с разными форматами хранения транскрипций
+
+Сравниваются три варианта: текст как есть, zstd без словаря и zstd со
+словарем, обученным на отдельной выборке транскрипций. Транскрипции берутся из
+существующей базы SQLite (если передан путь) или генерируются из частотных
+русских слов. В конце проверяется, что бот читает строки, пересжатые
+словарем, который обучил другой процесс.
+
+    python -m benchmarks.bench_compression [число сообщений] [путь к summary_bot.db]
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from src.models.user_message import UserMessage
+from src.services.backends.sqlite import SQLiteBackend
+from src.utils.compression import TranscriptionCodec, transcription_codec
+
+WORDS = (
+    "я ты он она мы вы они это что как так вот ну да нет не и в на с по к у из за от до "
+    "сегодня завтра вчера утром вечером надо нужно можно хочу думаю кажется работа проект "
+    "встреча задача задачи сделать написать позвонить купить отправить проверить обсудить "
+    "потом сначала еще уже очень много мало хорошо плохо важно быстро время день неделя "
+    "клиент команда отчет письмо документ созвон план идея вопрос ответ деньги дом магазин "
+    "продукты молоко хлеб врач спортзал тренировка устал настроение отлично нормально"
+).split()
+
+
+def synthetic_transcripts(count: int, seed: int = 1) -> List[str]:
+    """Транскрипции голосовых заметок длиной от пары слов до минуты речи"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    result = []
+    for _ in range(count):
+        length = int(rng.lognormvariate(3, 0.8)) + 2
+        text = ' '.join(rng.choices(WORDS, weights, k=length))
+        result.append(text[0].upper() + text[1:] + '.')
+    return result
+
+
+def real_transcripts(db_path: str) -> List[str]:
+    with sqlite3.connect(db_path) as db:
+        rows = db.execute("SELECT transcription FROM user_messages WHERE transcription IS NOT NULL").fetchall()
+    return [transcription_codec.decompress(row[0]) for row in rows]
+
+
+def storage_stats(db_path: str):
+    """Размер файла и страниц таблицы сообщений с индексами (то, что читается в кэш)"""
+    with sqlite3.connect(db_path) as db:
+        db.execute("VACUUM")
+        rows = db.execute("""
+            SELECT SUM(pgsize) FROM dbstat
+            WHERE name = 'user_messages' OR name LIKE 'idx_user_messages%' OR name LIKE 'sqlite_autoindex_user_messages%'
+        """).fetchone()
+    return os.path.getsize(db_path), rows[0] or 0
+
+
+async def run(name: str, db_path: str, transcripts: List[str], dictionary: bytes = None):
+    backend = SQLiteBackend(db_path)
+    await backend.initialize()
+    if dictionary is not None:
+        await backend.add_compression_dictionary(dictionary)
+
+    now = datetime.now()
+    day = now.strftime('%Y-%m-%d')
+    users = [f'bench-{i}' for i in range(max(1, len(transcripts) // 20))]
+
+    started = time.perf_counter()
+    for i, text in enumerate(transcripts):
+        await backend.add_user_message(UserMessage(
+            user_id=users[i % len(users)], message_id=i, date=day, timestamp=now.isoformat(),
+            s3_key=f'voice_messages/{i}.ogg', transcription=text, created_at=now + timedelta(microseconds=i)
+        ))
+    write_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    characters = 0
+    for user_id in users:
+        for message in await backend.get_user_messages(user_id, day):
+            characters += len(message.transcription or '')
+        characters += sum(len(text) for text in await backend.get_user_transcriptions(user_id, day))
+    read_seconds = time.perf_counter() - started
+
+    file_size, table_size = storage_stats(db_path)
+    print(
+        f"{name:22s} файл {file_size / 1024:8.0f} КБ  сообщения+индексы {table_size / 1024:8.0f} КБ  "
+        f"запись {len(transcripts) / write_seconds:6.0f} сообщ./с  чтение {len(users) / read_seconds:6.0f} польз./с"
+    )
+    return characters
+
+
+async def check_foreign_dictionary(db_path: str, training: List[str]):
+    """Словарь, обученный другим процессом, подгружается при первом чтении"""
+    backend = SQLiteBackend(db_path)
+    await backend.initialize()
+    day = datetime.now().strftime('%Y-%m-%d')
+    await backend.add_user_message(UserMessage(
+        user_id='foreign', message_id=1, date=day, timestamp=datetime.now().isoformat(),
+        transcription=training[0], created_at=datetime.now()
+    ))
+
+    # Другой процесс (python -m src.utils.compression train) со своим кодеком
+    other = TranscriptionCodec()
+    dictionary = TranscriptionCodec.train(training[1:], 16 * 1024)
+    dict_id = other.add_dictionary(dictionary)
+    assert dict_id not in transcription_codec._dictionaries
+    with sqlite3.connect(db_path) as db:
+        db.execute("INSERT INTO compression_dicts (dict_id, data) VALUES (?, ?)", (dict_id, dictionary))
+        db.execute("UPDATE user_messages SET transcription = ? WHERE user_id = 'foreign'", (other.compress(training[0]),))
+
+    assert await backend.get_user_transcriptions('foreign', day) == [training[0]]
+    assert [m.transcription for m in await backend.get_user_messages('foreign', day)] == [training[0]]
+    print("словарь другого процесса подгружен при чтении")
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    if len(sys.argv) > 2:
+        transcripts = real_transcripts(sys.argv[2])
+        random.Random(1).shuffle(transcripts)
+    else:
+        transcripts = synthetic_transcripts(count * 2)
+
+    # Словарь обучается на одной половине, замер идет на другой
+    training, transcripts = transcripts[:len(transcripts) // 2], transcripts[len(transcripts) // 2:][:count]
+    started = time.perf_counter()
+    dictionary = TranscriptionCodec.train(training)
+    print(f"сообщений: {len(transcripts)}, средняя длина {sum(map(len, transcripts)) / len(transcripts):.0f} символов")
+    print(f"словарь {len(dictionary)} байт обучен на {len(training)} транскрипциях за {time.perf_counter() - started:.2f} с\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        transcription_codec.enabled = False
+        expected = await run('текст', os.path.join(tmp, 'plain.db'), transcripts)
+        transcription_codec.enabled = True
+        assert await run('zstd', os.path.join(tmp, 'zstd.db'), transcripts) == expected
+        assert await run('zstd + словарь', os.path.join(tmp, 'zstd_dict.db'), transcripts, dictionary) == expected
+        await check_foreign_dictionary(os.path.join(tmp, 'foreign.db'), training)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
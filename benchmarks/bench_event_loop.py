@@ -0,0 +1,128 @@
+"""Микробенчмарк event loop: стандартный asyncio, asyncio с nest_asyncio и uvloop
+
+Каждый вариант запускается в отдельном процессе, потому что nest_asyncio
+подменяет методы event loop глобально и отменить это нельзя.
+
+    python -m benchmarks.bench_event_loop
+"""
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+VARIANTS = ('asyncio', 'nest_asyncio', 'uvloop')
+
+
+async def tasks(count: int = 100_000):
+    """Создание задач и ожидание через gather"""
+    async def noop():
+        pass
+    await asyncio.gather(*(asyncio.create_task(noop()) for _ in range(count)))
+    return count
+
+
+async def switches(workers: int = 10, rounds: int = 20_000):
+    """Переключения между задачами (await asyncio.sleep(0))"""
+    async def worker():
+        for _ in range(rounds):
+            await asyncio.sleep(0)
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return workers * rounds
+
+
+async def queue(count: int = 200_000):
+    """Производитель и потребитель через asyncio.Queue"""
+    items: asyncio.Queue = asyncio.Queue(maxsize=100)
+
+    async def producer():
+        for i in range(count):
+            await items.put(i)
+
+    async def consumer():
+        for _ in range(count):
+            await items.get()
+
+    await asyncio.gather(producer(), consumer())
+    return count
+
+
+async def tcp(count: int = 10_000):
+    """Запрос-ответ по TCP на localhost"""
+    async def echo(reader, writer):
+        while data := await reader.readline():
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(echo, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for _ in range(count):
+        writer.write(b'ping\n')
+        await reader.readline()
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return count
+
+
+WORKLOADS = (tasks, switches, queue, tcp)
+
+
+def run_variant(variant: str) -> dict:
+    """Выполняет все нагрузки в текущем процессе, возвращает операций в секунду"""
+    if variant == 'uvloop':
+        import uvloop
+        loop = uvloop.new_event_loop()
+    else:
+        loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    if variant == 'nest_asyncio':
+        import nest_asyncio
+        nest_asyncio.apply(loop)
+
+    result = {}
+    try:
+        for workload in WORKLOADS:
+            best = 0.0
+            for _ in range(3):
+                started = time.perf_counter()
+                operations = loop.run_until_complete(workload())
+                best = max(best, operations / (time.perf_counter() - started))
+            result[workload.__name__] = best
+    finally:
+        loop.close()
+    return result
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--variant':
+        print(json.dumps(run_variant(sys.argv[2])))
+        return
+
+    results = {}
+    for variant in VARIANTS:
+        process = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_event_loop', '--variant', variant],
+            capture_output=True, text=True
+        )
+        if process.returncode != 0:
+            print(f"{variant}: пропущен ({process.stderr.strip().splitlines()[-1]})")
+            continue
+        results[variant] = json.loads(process.stdout)
+
+    baseline = results.get('asyncio')
+    print(f"\n{'нагрузка':10s}" + ''.join(f"{variant:>22s}" for variant in results))
+    for workload in WORKLOADS:
+        name = workload.__name__
+        row = f"{name:10s}"
+        for variant, values in results.items():
+            ratio = f" x{values[name] / baseline[name]:.2f}" if baseline else ''
+            row += f"{values[name]:>14,.0f}/с{ratio:>6s}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
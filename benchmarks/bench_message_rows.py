@@ -0,0 +1,170 @@
+"""Время и память на чтение сообщений: модели, легкие строки и выборка колонок
+
+Сравниваются три способа прочитать сообщения пользователя и пройти по
+времени и тексту каждого:
+
+- модели UserMessage со словарями поверх них (как было раньше);
+- строки MessageRow без копирования (get_user_messages_by_date_range);
+- колонки fetch_message_columns('timestamp', 'transcription').
+
+Сначала замеряется только построение объектов из уже прочитанных строк
+базы: время (под tracemalloc, поэтому завышенное), число оставшихся блоков
+памяти и пик. Затем - полный запрос к SQLite без tracemalloc.
+
+    python -m benchmarks.bench_message_rows [число строк]
+"""
+import asyncio
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, List, Sequence
+
+from src.models.message_row import MessageRow
+from src.models.user_message import UserMessage
+from src.services.backends.sqlite import SQLiteBackend
+from src.utils.compression import transcription_codec
+
+USER_ID = 'bench'
+FIRST_DAY = datetime(2024, 1, 1)
+
+
+def legacy_models(rows: Sequence[Sequence]) -> List[dict]:
+    """Прежний путь: UserMessage на строку, затем словарь для storage.get_user_messages"""
+    result = []
+    for row in rows:
+        created_at = row[7]
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        message = UserMessage(
+            id=row[0], user_id=row[1], message_id=row[2], date=row[3], timestamp=row[4],
+            s3_key=row[5], transcription=transcription_codec.decompress(row[6]), created_at=created_at,
+            audio_seconds=row[8], audio_bytes=row[9]
+        )
+        result.append({
+            'message_id': message.message_id,
+            'timestamp': message.timestamp,
+            's3_key': message.s3_key,
+            'transcription': message.transcription
+        })
+    return result
+
+
+def scan_dicts(messages: List[dict]) -> int:
+    return sum(len(m['timestamp']) + len(m['transcription'] or '') for m in messages)
+
+
+def scan_rows(rows: List[MessageRow]) -> int:
+    return sum(len(row.timestamp) + len(row.transcription or '') for row in rows)
+
+
+def scan_columns(columns: dict) -> int:
+    return sum(len(t) + len(text or '') for t, text in zip(columns['timestamp'], columns['transcription']))
+
+
+def measure(build: Callable[[], object], scan: Callable[[object], int]):
+    """Время построения и прохода, число живых блоков памяти после прохода и пик"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    characters = scan(result)
+    seconds = time.perf_counter() - started
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    del result
+    return seconds, blocks, peak, characters
+
+
+def timed(coroutine_factory) -> float:
+    started = time.perf_counter()
+    asyncio.run(coroutine_factory())
+    return time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    first_day = FIRST_DAY.strftime('%Y-%m-%d')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'rows.db')
+        backend = SQLiteBackend(db_path)
+        asyncio.run(backend.initialize())
+
+        # Пакетная вставка через sqlite3: построчная через бэкенд заняла бы минуты
+        started = time.perf_counter()
+        with sqlite3.connect(db_path) as db:
+            now = datetime.now()
+            days = max(1, count // 1000)
+            db.executemany("""
+                INSERT INTO user_messages
+                (user_id, message_id, date, timestamp, s3_key, transcription, created_at, audio_seconds, audio_bytes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                (USER_ID, i, (FIRST_DAY + timedelta(days=i % days)).strftime('%Y-%m-%d'), now.isoformat(),
+                 f'voice_messages/{i}.ogg',
+                 transcription_codec.compress(f'голосовая заметка номер {i} про встречу и задачи ' * 3),
+                 (now + timedelta(microseconds=i)).isoformat(), 12.5, 20000)
+                for i in range(count)
+            ))
+            last_day = (FIRST_DAY + timedelta(days=days - 1)).strftime('%Y-%m-%d')
+            rows = db.execute(
+                f"SELECT {SQLiteBackend.MESSAGE_COLUMNS} FROM user_messages ORDER BY date, created_at"
+            ).fetchall()
+            column_rows = db.execute(
+                "SELECT timestamp, transcription FROM user_messages ORDER BY date, created_at"
+            ).fetchall()
+        print(f"строк: {len(rows)}, подготовка {time.perf_counter() - started:.1f} с\n")
+
+        variants = (
+            ('UserMessage + dict', lambda: legacy_models(rows), scan_dicts),
+            ('MessageRow', lambda: [MessageRow(row) for row in rows], scan_rows),
+            ('колонки', lambda: SQLiteBackend._rows_to_columns(('timestamp', 'transcription'), column_rows), scan_columns),
+        )
+        print("построение из прочитанных строк и проход по времени и тексту:")
+        print(f"{'':20s}{'время':>10s}{'мкс/строку':>12s}{'блоков':>12s}{'пик памяти':>14s}")
+        expected = None
+        for name, build, scan in variants:
+            seconds, blocks, peak, characters = measure(build, scan)
+            assert expected is None or characters == expected, name
+            expected = characters
+            print(
+                f"{name:20s}{seconds:9.3f}с{seconds / len(rows) * 1e6:12.2f}"
+                f"{blocks:12,d}{peak / 1024 / 1024:12.1f}МБ"
+            )
+
+        print("\nполный запрос к SQLite за весь диапазон:")
+        queries = (
+            ('UserMessage + dict', lambda: _legacy_query(backend, first_day, last_day)),
+            ('MessageRow', lambda: _rows_query(backend, first_day, last_day)),
+            ('колонки', lambda: _columns_query(backend, first_day, last_day)),
+        )
+        for name, factory in queries:
+            seconds = min(timed(factory) for _ in range(3))
+            print(f"{name:20s}{seconds:9.3f}с{seconds / len(rows) * 1e6:12.2f} мкс/строку")
+
+
+async def _legacy_query(backend: SQLiteBackend, start: str, end: str):
+    import aiosqlite
+
+    async with aiosqlite.connect(backend.db_path) as db:
+        cursor = await db.execute(backend.SELECT_MESSAGES_BY_DATE_RANGE, (USER_ID, start, end))
+        scan_dicts(legacy_models(await cursor.fetchall()))
+
+
+async def _rows_query(backend: SQLiteBackend, start: str, end: str):
+    scan_rows(await backend.get_user_messages_by_date_range(USER_ID, start, end))
+
+
+async def _columns_query(backend: SQLiteBackend, start: str, end: str):
+    scan_columns(await backend.fetch_message_columns(USER_ID, start, end, ('timestamp', 'transcription')))
+
+
+if __name__ == '__main__':
+    main()
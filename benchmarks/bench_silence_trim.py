@@ -0,0 +1,124 @@
+"""Экономия на распознавании от сжатия тишины на наборе записей
+
+Для каждой записи из папки (*.ogg, *.oga, *.wav) считается длительность до и
+после сжатия тишины и число тарифицируемых отрезков синхронного распознавания
+(15 с, округление вверх). С флагом --transcribe обе версии отправляются в
+SpeechKit (или в заглушку tools.fake_speechkit через YANDEX_STT_URL) и
+сравниваются задержка и WER. Эталоном служит текст из файла с тем же именем и
+расширением .txt, а при его отсутствии - распознавание исходной записи.
+
+    python -m benchmarks.bench_silence_trim <папка с записями> [--transcribe]
+"""
+import asyncio
+import math
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from src.config.settings import (
+    STT_SILENCE_MIN_MS,
+    STT_SILENCE_KEEP_MS,
+    STT_SILENCE_THRESHOLD_DB,
+    STT_SILENCE_MIN_SAVED_SECONDS
+)
+from src.services.audio_processing import trim_silence
+
+# Синхронное распознавание тарифицируется отрезками по 15 секунд
+BILLING_UNIT_SECONDS = 15
+EXTENSIONS = {'.ogg': 'ogg', '.oga': 'ogg', '.wav': 'wav'}
+
+
+def billing_units(seconds: float) -> int:
+    return max(1, math.ceil(seconds / BILLING_UNIT_SECONDS))
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER по словам: расстояние Левенштейна, деленное на длину эталона"""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            ))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+async def transcribe(audio_data: bytes) -> Tuple[str, float]:
+    from src.services.voice_processor import VoiceProcessor
+
+    started = time.perf_counter()
+    text = await VoiceProcessor.transcribe_voice(audio_data)
+    return text, time.perf_counter() - started
+
+
+async def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    samples = sorted(path for path in Path(sys.argv[1]).iterdir() if path.suffix.lower() in EXTENSIONS)
+    with_stt = '--transcribe' in sys.argv
+
+    totals = {'before': 0.0, 'after': 0.0, 'units_before': 0, 'units_after': 0, 'trim_seconds': 0.0}
+    latencies: List[float] = []
+    errors: List[float] = []
+
+    for path in samples:
+        audio_data = path.read_bytes()
+        started = time.perf_counter()
+        result = trim_silence(
+            audio_data,
+            EXTENSIONS[path.suffix.lower()],
+            STT_SILENCE_MIN_MS,
+            STT_SILENCE_KEEP_MS,
+            STT_SILENCE_THRESHOLD_DB,
+            STT_SILENCE_MIN_SAVED_SECONDS
+        )
+        totals['trim_seconds'] += time.perf_counter() - started
+
+        before = result['duration_seconds']
+        after = before - result['seconds_saved']
+        totals['before'] += before
+        totals['after'] += after
+        totals['units_before'] += billing_units(before)
+        totals['units_after'] += billing_units(after)
+        line = f"{path.name:30s} {before:6.1f} с -> {after:6.1f} с (сэкономлено {result['seconds_saved']:5.1f} с)"
+
+        if with_stt:
+            original_text, original_latency = await transcribe(audio_data)
+            trimmed_text, trimmed_latency = await transcribe(result['audio'])
+            reference_path = path.with_suffix('.txt')
+            reference = reference_path.read_text(encoding='utf-8') if reference_path.exists() else original_text
+            wer_before, wer_after = word_error_rate(reference, original_text), word_error_rate(reference, trimmed_text)
+            latencies.append(original_latency - trimmed_latency)
+            errors.append(wer_after - wer_before)
+            line += (
+                f"  STT {original_latency * 1000:5.0f} -> {trimmed_latency * 1000:5.0f} мс"
+                f"  WER {wer_before:.3f} -> {wer_after:.3f}"
+            )
+        print(line)
+
+    if not samples:
+        print("В папке нет записей")
+        return
+
+    saved = totals['before'] - totals['after']
+    print(f"\nзаписей: {len(samples)}")
+    print(f"аудио: {totals['before']:.1f} с -> {totals['after']:.1f} с, сэкономлено {saved:.1f} с "
+          f"({saved / totals['before'] * 100 if totals['before'] else 0:.1f}%)")
+    print(f"тарифицируемых отрезков по {BILLING_UNIT_SECONDS} с: {totals['units_before']} -> {totals['units_after']}")
+    print(f"обработка: {totals['trim_seconds'] / len(samples) * 1000:.0f} мс на запись")
+    if with_stt:
+        print(f"задержка STT: в среднем на {sum(latencies) / len(latencies) * 1000:.0f} мс меньше")
+        print(f"изменение WER: в среднем {sum(errors) / len(errors):+.3f}, худшее {max(errors):+.3f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
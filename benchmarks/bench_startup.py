@@ -0,0 +1,44 @@
+"""Замер времени запуска бота: импорт src.main и создание сервисов
+
+Запуск: python -m benchmarks.bench_startup [повторы]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+SNIPPET = """
+import time
+started = time.perf_counter()
+import src.main
+imported = time.perf_counter()
+from src.services.s3_uploader import s3_uploader
+print(imported - started, s3_uploader.is_initialized)
+"""
+
+
+def measure(runs: int):
+    """Запускает импорт в отдельных процессах и возвращает время в секундах"""
+    env = dict(os.environ)
+    for key in ('TELEGRAM_TOKEN', 'YANDEX_API_KEY', 'YANDEX_FOLDER_ID', 'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+        env.setdefault(key, 'bench')
+
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', SNIPPET], env=env, text=True)
+        seconds, s3_initialized = output.split()
+        if s3_initialized != 'False':
+            raise RuntimeError("S3 клиент создан при импорте")
+        timings.append(float(seconds))
+    return timings
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    timings = measure(runs)
+    print(f"Импорт src.main: медиана {statistics.median(timings) * 1000:.1f} мс, "
+          f"мин {min(timings) * 1000:.1f} мс, макс {max(timings) * 1000:.1f} мс (запусков: {runs})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Время до первого текста: потоковое распознавание против ожидания полного результата
+
+Используется локальная заглушка tools.fake_stt_grpc, которая тратит
+--chunk-delay секунд на каждую часть аудио (имитация распознавания в реальном времени).
+
+Запуск: python -m benchmarks.bench_stt_streaming [размер аудио, КБ]
+"""
+import asyncio
+import sys
+import time
+
+from src.services.stt_streaming import StreamingRecognizer, iter_chunks
+from tools.fake_stt_grpc import start_fake_recognizer
+
+CHUNK_SIZE = 16384
+CHUNK_DELAY = 0.05
+
+
+async def main():
+    size_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    audio_data = bytes(size_kb * 1024)
+
+    server, _, port = start_fake_recognizer(0, chunks_per_phrase=8, chunk_delay=CHUNK_DELAY)
+    recognizer = StreamingRecognizer(f'127.0.0.1:{port}', insecure=True, partial_interval=0)
+    try:
+        first_text_at = None
+        started = time.perf_counter()
+
+        async def on_partial(text: str):
+            nonlocal first_text_at
+            if first_text_at is None:
+                first_text_at = time.perf_counter() - started
+
+        await recognizer.recognize(iter_chunks(audio_data, CHUNK_SIZE), on_partial)
+        total = time.perf_counter() - started
+
+        print(f"аудио {size_kb} КБ, частей: {len(audio_data) // CHUNK_SIZE}")
+        print(f"  первый текст: {first_text_at * 1000:.0f} мс")
+        print(f"  полный результат (время до первого текста без потокового режима): {total * 1000:.0f} мс")
+    finally:
+        await recognizer.close()
+        server.stop(0)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
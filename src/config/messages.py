@@ -36,6 +36,18 @@ PROCESSING_VOICE = "🎵 Обрабатываю голосовое сообще
 CREATING_SUMMARY = "🤔 Создаю суммаризацию..."
 VOICE_PROCESSED = "✅ Сообщение обработано!"
 VOICE_ERROR = "❌ Ошибка при обработке голосового сообщения"
+PARTIAL_TRANSCRIPTION = "🎙️ {text}…"
+VOICE_TOO_LARGE = "❌ Голосовое сообщение слишком большое (больше {limit_mb} МБ)"
+VOICE_BUSY = "⏳ Сейчас слишком много сообщений в обработке, отправьте голосовое чуть позже"
+VOICE_USER_BUSY = "⏳ У вас уже {limit} сообщений в обработке, дождитесь результатов и отправьте снова"
+SUMMARY_POSTPONED = "⏳ Суммаризация временно недоступна из-за нагрузки, попробуйте через пару минут"
+
+
+# Профилирование
+ADMIN_ONLY = "⛔ Команда доступна только администраторам"
+PROFILE_STARTED = "⏱️ Профилирование запущено на {seconds} с..."
+PROFILE_FINISHED = "✅ Профиль записан: {path}"
+PROFILE_ALREADY_RUNNING = "⚠️ Профилирование уже запущено"
 
 
 # Команды помощи
@@ -44,7 +56,8 @@ HELP_MESSAGE = (
     "🎵 Отправить голосовое - отправьте голосовое сообщение для обработки\n"
     "📝 Транскрипции - просмотрите все распознанные тексты за сегодня\n"
     "📊 Суммаризация - получите краткую сводку по всем сообщениям за день\n"
-    "📋 Мои сообщения - просмотрите все ваши сообщения с метками времени\n\n"
+    "📋 Мои сообщения - просмотрите все ваши сообщения с метками времени\n"
+    "📈 /stats - статистика за день, неделю, месяц и все время\n\n"
     "Бот автоматически сохраняет все голосовые сообщения в облаке и распознает речь!"
 )
 
@@ -54,6 +67,12 @@ TRANSCRIPTION_ITEM = "📝 {transcription}"
 SUMMARY_HEADER = "📊 Суммаризация за {date}:\n\n"
 MESSAGES_HEADER = "📋 Сообщения за {date}:\n\n"
 MESSAGE_ITEM = "{index}. {timestamp}\n📝 {transcription}\n\n"
+STATS_HEADER = "📈 Ваша статистика:\n\n"
+STATS_PERIOD = (
+    "{title}: {messages} сообщ., {minutes:.1f} мин аудио, {megabytes:.2f} МБ, "
+    "{chars} символов текста, суммаризаций: {summaries}\n"
+)
+NO_STATS = "Статистики пока нет: отправьте первое голосовое сообщение"
 
 # Промпт для суммаризации
 SUMMARIZATION_PROMPT = """
@@ -17,15 +17,20 @@ from ..config.messages import (
     SUMMARY_HEADER,
     MESSAGES_HEADER,
     MESSAGE_ITEM,
-    HELP_MESSAGE
+    HELP_MESSAGE,
+    SUMMARY_POSTPONED
 )
 from ..utils.keyboards import get_main_menu_keyboard
-from ..utils.storage import get_user_messages, get_user_transcriptions, has_user_messages
+from ..utils.tracing import trace_handler
+from ..utils.storage import get_message_columns, get_user_transcriptions, has_user_messages, record_summary
+from ..services.admission import admission
 from ..services.message_summarizer import MessageSummarizer
+from ..services.send_scheduler import send_scheduler
 
 logger = logging.getLogger(__name__)
 
 
+@trace_handler
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик нажатий на кнопки меню"""
     query = update.callback_query
@@ -35,42 +40,46 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     today = date.today().strftime('%Y-%m-%d')
     
     if query.data == "voice_info":
-        await query.edit_message_text(
+        await send_scheduler.edit_text(
+            query.message,
             VOICE_INFO_MESSAGE,
             reply_markup=get_main_menu_keyboard()
         )
     
     elif query.data == "transcribe":
-        if not has_user_messages(user_id, today):
-            await query.edit_message_text(
+        if not await has_user_messages(user_id, today):
+            await send_scheduler.edit_text(
+                query.message,
                 NO_MESSAGES_TODAY,
                 reply_markup=get_main_menu_keyboard()
             )
             return
         
-        messages = get_user_messages(user_id, today)
-        
-        # Получаем транскрипции
-        transcriptions = []
-        for msg in messages:
-            if 'transcription' in msg:
-                transcriptions.append(TRANSCRIPTION_ITEM.format(transcription=msg['transcription']))
+        # Получаем транскрипции (читается только их колонка)
+        transcriptions = [
+            TRANSCRIPTION_ITEM.format(transcription=transcription)
+            for transcription in await get_user_transcriptions(user_id, today)
+            if transcription
+        ]
         
         if transcriptions:
             result = TRANSCRIPTIONS_HEADER + "\n\n".join(transcriptions)
-            await query.edit_message_text(
+            await send_scheduler.edit_text(
+                query.message,
                 result,
                 reply_markup=get_main_menu_keyboard()
             )
         else:
-            await query.edit_message_text(
+            await send_scheduler.edit_text(
+                query.message,
                 NO_TRANSCRIPTIONS,
                 reply_markup=get_main_menu_keyboard()
             )
     
     elif query.data == "summary":
-        if not has_user_messages(user_id, today):
-            await query.edit_message_text(
+        if not await has_user_messages(user_id, today):
+            await send_scheduler.edit_text(
+                query.message,
                 NO_MESSAGES_FOR_SUMMARY,
                 reply_markup=get_main_menu_keyboard()
             )
@@ -79,54 +88,74 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         transcriptions = await get_user_transcriptions(user_id, today)
         
         if not transcriptions:
-            await query.edit_message_text(
+            await send_scheduler.edit_text(
+                query.message,
                 NO_TRANSCRIPTIONS_FOR_SUMMARY,
                 reply_markup=get_main_menu_keyboard()
             )
             return
         
-        # Показываем индикатор загрузки
-        await query.edit_message_text(
-            CREATING_SUMMARY,
-            reply_markup=get_main_menu_keyboard()
-        )
+        # При перегрузке суммаризация откладывается
+        if not await admission.admit_summary():
+            await send_scheduler.edit_text(
+                query.message,
+                SUMMARY_POSTPONED,
+                reply_markup=get_main_menu_keyboard()
+            )
+            return
         
-        # Создаем суммаризацию
-        summary = await MessageSummarizer.summarize_messages(transcriptions)
+        try:
+            # Показываем индикатор загрузки
+            await send_scheduler.edit_text(
+                query.message,
+                CREATING_SUMMARY,
+                reply_markup=get_main_menu_keyboard()
+            )
+            
+            # Создаем суммаризацию
+            summary = await MessageSummarizer.summarize_messages(transcriptions)
+        finally:
+            admission.release_summary()
+        if not MessageSummarizer.is_error(summary):
+            await record_summary(user_id, today)
         
         # Отправляем результат
-        await query.edit_message_text(
+        await send_scheduler.edit_text(
+            query.message,
             SUMMARY_HEADER.format(date=today) + summary,
             reply_markup=get_main_menu_keyboard()
         )
     
     elif query.data == "messages":
-        if not has_user_messages(user_id, today):
-            await query.edit_message_text(
+        if not await has_user_messages(user_id, today):
+            await send_scheduler.edit_text(
+                query.message,
                 NO_MESSAGES_FOR_DISPLAY,
                 reply_markup=get_main_menu_keyboard()
             )
             return
         
-        messages = get_user_messages(user_id, today)
+        columns = await get_message_columns(user_id, ('timestamp', 'transcription'), today)
         messages_text = MESSAGES_HEADER.format(date=today)
         
-        for i, msg in enumerate(messages, 1):
-            timestamp = msg.get('timestamp', 'Неизвестно')
-            transcription = msg.get('transcription', 'Не распознано')
+        for i, (timestamp, transcription) in enumerate(zip(columns['timestamp'], columns['transcription']), 1):
+            timestamp = timestamp or 'Неизвестно'
+            transcription = transcription or 'Не распознано'
             messages_text += MESSAGE_ITEM.format(
                 index=i, 
                 timestamp=timestamp, 
                 transcription=transcription
             )
         
-        await query.edit_message_text(
+        await send_scheduler.edit_text(
+            query.message,
             messages_text,
             reply_markup=get_main_menu_keyboard()
         )
     
     elif query.data == "help":
-        await query.edit_message_text(
+        await send_scheduler.edit_text(
+            query.message,
             HELP_MESSAGE,
             reply_markup=get_main_menu_keyboard()
         )
@@ -1,7 +1,9 @@
 """Обработчики команд бота"""
+import asyncio
 import logging
+import threading
 from datetime import date
-from telegram import Update
+from telegram import Message, Update
 from telegram.ext import ContextTypes
 
 from ..config.messages import (
@@ -16,93 +18,194 @@ from ..config.messages import (
     TRANSCRIPTION_ITEM,
     SUMMARY_HEADER,
     MESSAGES_HEADER,
-    MESSAGE_ITEM
+    MESSAGE_ITEM,
+    ADMIN_ONLY,
+    PROFILE_STARTED,
+    PROFILE_FINISHED,
+    PROFILE_ALREADY_RUNNING,
+    SUMMARY_POSTPONED,
+    STATS_HEADER,
+    STATS_PERIOD,
+    NO_STATS
 )
+from ..config.settings import ADMIN_USER_IDS, PROFILE_MAX_SECONDS
 from ..utils.keyboards import get_main_menu_keyboard
-from ..utils.storage import get_user_messages, get_user_transcriptions, has_user_messages
+from ..utils.tracing import trace_handler
+from ..utils.profiling import profiler
+from ..utils.storage import (
+    get_message_columns,
+    get_user_transcriptions,
+    get_user_stats,
+    has_user_messages,
+    record_summary
+)
+from ..services.admission import admission
 from ..services.message_summarizer import MessageSummarizer
+from ..services.send_scheduler import send_scheduler
 
 logger = logging.getLogger(__name__)
 
 
+@trace_handler
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /start"""
-    await update.message.reply_text(
+    await send_scheduler.reply_text(
+        update.message,
         WELCOME_MESSAGE,
         reply_markup=get_main_menu_keyboard()
     )
 
 
+@trace_handler
 async def transcribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /transcribe"""
     user_id = str(update.effective_user.id)
     today = date.today().strftime('%Y-%m-%d')
     
     if not await has_user_messages(user_id, today):
-        await update.message.reply_text(NO_MESSAGES_TODAY)
+        await send_scheduler.reply_text(update.message, NO_MESSAGES_TODAY)
         return
     
-    messages = await get_user_messages(user_id, today)
-    
-    # Получаем транскрипции
-    transcriptions = []
-    for msg in messages:
-        if 'transcription' in msg:
-            transcriptions.append(TRANSCRIPTION_ITEM.format(transcription=msg['transcription']))
+    # Получаем транскрипции (читается только их колонка)
+    transcriptions = [
+        TRANSCRIPTION_ITEM.format(transcription=transcription)
+        for transcription in await get_user_transcriptions(user_id, today)
+        if transcription
+    ]
     
     if transcriptions:
         result = TRANSCRIPTIONS_HEADER + "\n\n".join(transcriptions)
-        await update.message.reply_text(result)
+        await send_scheduler.reply_text(update.message, result)
     else:
-        await update.message.reply_text(NO_TRANSCRIPTIONS)
+        await send_scheduler.reply_text(update.message, NO_TRANSCRIPTIONS)
 
 
+@trace_handler
 async def summary_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /summary"""
     user_id = str(update.effective_user.id)
     today = date.today().strftime('%Y-%m-%d')
     
     if not await has_user_messages(user_id, today):
-        await update.message.reply_text(NO_MESSAGES_FOR_SUMMARY)
+        await send_scheduler.reply_text(update.message, NO_MESSAGES_FOR_SUMMARY)
         return
     
     transcriptions = await get_user_transcriptions(user_id, today)
     
     if not transcriptions:
-        await update.message.reply_text(NO_TRANSCRIPTIONS_FOR_SUMMARY)
+        await send_scheduler.reply_text(update.message, NO_TRANSCRIPTIONS_FOR_SUMMARY)
         return
     
-    # Показываем индикатор загрузки
-    processing_msg = await update.message.reply_text(CREATING_SUMMARY)
+    # При перегрузке суммаризация откладывается
+    if not await admission.admit_summary():
+        await send_scheduler.reply_text(update.message, SUMMARY_POSTPONED)
+        return
     
-    summary = await MessageSummarizer.summarize_messages(transcriptions)
+    try:
+        # Показываем индикатор загрузки
+        processing_msg = await send_scheduler.reply_text(update.message, CREATING_SUMMARY)
+        
+        summary = await MessageSummarizer.summarize_messages(transcriptions)
+    finally:
+        admission.release_summary()
+    if not MessageSummarizer.is_error(summary):
+        await record_summary(user_id, today)
     
     # Удаляем индикатор загрузки
-    await processing_msg.delete()
+    await send_scheduler.delete(processing_msg)
     
     # Отправляем результат
-    await update.message.reply_text(SUMMARY_HEADER.format(date=today) + summary)
+    await send_scheduler.reply_text(update.message, SUMMARY_HEADER.format(date=today) + summary)
 
 
+@trace_handler
 async def messages_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /messages"""
     user_id = str(update.effective_user.id)
     today = date.today().strftime('%Y-%m-%d')
     
     if not await has_user_messages(user_id, today):
-        await update.message.reply_text(NO_MESSAGES_FOR_DISPLAY)
+        await send_scheduler.reply_text(update.message, NO_MESSAGES_FOR_DISPLAY)
         return
     
-    messages = await get_user_messages(user_id, today)
+    columns = await get_message_columns(user_id, ('timestamp', 'transcription'), today)
     messages_text = MESSAGES_HEADER.format(date=today)
     
-    for i, msg in enumerate(messages, 1):
-        timestamp = msg.get('timestamp', 'Неизвестно')
-        transcription = msg.get('transcription', 'Не распознано')
+    for i, (timestamp, transcription) in enumerate(zip(columns['timestamp'], columns['transcription']), 1):
+        timestamp = timestamp or 'Неизвестно'
+        transcription = transcription or 'Не распознано'
         messages_text += MESSAGE_ITEM.format(
             index=i, 
             timestamp=timestamp, 
             transcription=transcription
         )
     
-    await update.message.reply_text(messages_text)
+    await send_scheduler.reply_text(update.message, messages_text)
+
+
+@trace_handler
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /stats (читает только дневные агрегаты)"""
+    user_id = str(update.effective_user.id)
+    
+    total = await get_user_stats(user_id)
+    if not total.days:
+        await send_scheduler.reply_text(update.message, NO_STATS)
+        return
+    
+    periods = [
+        ('Сегодня', await get_user_stats(user_id, 1)),
+        ('7 дней', await get_user_stats(user_id, 7)),
+        ('30 дней', await get_user_stats(user_id, 30)),
+        ('Все время', total)
+    ]
+    text = STATS_HEADER
+    for title, stats in periods:
+        text += STATS_PERIOD.format(
+            title=title,
+            messages=stats.messages,
+            minutes=stats.audio_seconds / 60,
+            megabytes=stats.audio_bytes / 1024 / 1024,
+            chars=stats.transcription_chars,
+            summaries=stats.summaries
+        )
+    
+    await send_scheduler.reply_text(update.message, text)
+
+
+@trace_handler
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /profile [секунды] (только для администраторов)"""
+    if update.effective_user.id not in ADMIN_USER_IDS:
+        await send_scheduler.reply_text(update.message, ADMIN_ONLY)
+        return
+    
+    if profiler.is_running:
+        await send_scheduler.reply_text(update.message, PROFILE_ALREADY_RUNNING)
+        return
+    
+    seconds = 30
+    if context.args:
+        try:
+            seconds = int(context.args[0])
+        except ValueError:
+            pass
+    seconds = max(1, min(seconds, PROFILE_MAX_SECONDS))
+    
+    await send_scheduler.reply_text(update.message, PROFILE_STARTED.format(seconds=seconds))
+    
+    # Обновления обрабатываются по одному: если ждать профилировщик здесь, бот
+    # простаивал бы все время записи, поэтому сэмплирование идет в фоновой задаче
+    context.application.create_task(
+        _run_profile(update.message, threading.get_ident(), seconds), update=update
+    )
+
+
+async def _run_profile(message: Message, thread_id: int, seconds: int):
+    """Сэмплирует поток event loop из отдельного потока и присылает путь к профилю"""
+    path = await asyncio.to_thread(profiler.run, thread_id, seconds)
+    
+    if path is None:
+        await send_scheduler.reply_text(message, PROFILE_ALREADY_RUNNING)
+    else:
+        await send_scheduler.reply_text(message, PROFILE_FINISHED.format(path=path))
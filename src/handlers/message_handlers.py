@@ -1,69 +1,71 @@
 """Обработчики сообщений бота"""
 import logging
-from datetime import datetime
+from datetime import date
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from ..config.messages import (
     TEXT_MESSAGE_RESPONSE,
     PROCESSING_VOICE,
-    VOICE_ERROR
+    VOICE_ERROR,
+    VOICE_TOO_LARGE
 )
+from ..config.settings import TELEGRAM_API_URL, TELEGRAM_LOCAL_MODE
+from ..models.voice_job import VoiceJob
 from ..utils.keyboards import get_main_menu_keyboard
-from ..utils.storage import add_user_message
-from ..services.voice_processor import VoiceProcessor
-from ..services.s3_uploader import S3Uploader
+from ..utils.tracing import trace_handler
+from ..services.admission import admission
+from ..services.send_scheduler import send_scheduler
+from ..services.voice_queue import voice_queue
 
 logger = logging.getLogger(__name__)
 
-# Инициализируем S3 загрузчик
-s3_uploader = S3Uploader()
+# Ограничение на скачивание файлов: 20 МБ для api.telegram.org, 2000 МБ для локального сервера Bot API
+MAX_VOICE_FILE_SIZE = (2000 if TELEGRAM_LOCAL_MODE and TELEGRAM_API_URL else 20) * 1024 * 1024
 
 
+@trace_handler
 async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработчик голосовых сообщений"""
+    """Обработчик голосовых сообщений: ставит задание в очередь и сразу возвращается"""
     user_id = str(update.effective_user.id)
     message_id = update.message.message_id
     
+    file_size = update.message.voice.file_size or 0
+    if file_size > MAX_VOICE_FILE_SIZE:
+        await send_scheduler.reply_text(update.message, VOICE_TOO_LARGE.format(limit_mb=MAX_VOICE_FILE_SIZE // (1024 * 1024)))
+        return
+    
+    # При перегрузке или исчерпанной квоте пользователя не принимаем новую работу
+    rejection = await admission.admit_voice(user_id)
+    if rejection:
+        await send_scheduler.reply_text(update.message, rejection)
+        return
+    
     # Показываем индикатор обработки
-    processing_msg = await update.message.reply_text(PROCESSING_VOICE)
+    processing_msg = await send_scheduler.reply_text(update.message, PROCESSING_VOICE)
     
     try:
-        # Скачиваем голосовое сообщение
-        audio_data = await VoiceProcessor.download_voice_file(update.message.voice, context)
-        
-        # Загружаем в S3
-        s3_key = await s3_uploader.upload_voice_file(audio_data, update.effective_user.id, message_id)
-        
-        # Транскрибируем
-        transcription = await VoiceProcessor.transcribe_voice(audio_data)
-        
-        # Сохраняем в базе данных
-        message_data = {
-            'message_id': message_id,
-            'timestamp': datetime.now().isoformat(),
-            's3_key': s3_key,
-            'transcription': transcription
-        }
-        await add_user_message(user_id, message_data)
-        
-        # Удаляем индикатор загрузки
-        await processing_msg.delete()
-        
-        # Отправляем результат
-        await update.message.reply_text(
-            transcription,
-            reply_markup=get_main_menu_keyboard()
-        )
+        # Сохраняем задание до начала обработки, чтобы оно пережило перезапуск
+        await voice_queue.enqueue(VoiceJob(
+            user_id=user_id,
+            chat_id=update.effective_chat.id,
+            message_id=message_id,
+            file_id=update.message.voice.file_id,
+            processing_message_id=processing_msg.message_id,
+            date=date.today().strftime('%Y-%m-%d'),
+            duration=update.message.voice.duration
+        ))
         
     except Exception as e:
-        logger.error(f"Ошибка обработки голосового сообщения: {e}")
-        await processing_msg.edit_text(VOICE_ERROR)
+        logger.error(f"Ошибка постановки голосового сообщения в очередь: {e}")
+        await send_scheduler.edit_text(processing_msg, VOICE_ERROR)
 
 
+@trace_handler
 async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик текстовых сообщений"""
-    await update.message.reply_text(
+    await send_scheduler.reply_text(
+        update.message,
         TEXT_MESSAGE_RESPONSE,
         reply_markup=get_main_menu_keyboard()
     )
@@ -1,12 +1,41 @@
 """Основной файл запуска бота"""
+import asyncio
 import logging
+import signal
+
+# Сервис готовности импортируется первым: от него отсчитывается время запуска
+from .services.health import health_service
+
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 
-from .config.settings import TELEGRAM_TOKEN
-from .handlers.command_handlers import start_command, transcribe_command, summary_command, messages_command
+from .config.settings import (
+    TELEGRAM_TOKEN,
+    TELEGRAM_API_URL,
+    TELEGRAM_LOCAL_MODE,
+    DEBUG_LOOP_STALLS,
+    HEALTH_PORT,
+    validate_settings
+)
+from .handlers.command_handlers import (
+    start_command,
+    transcribe_command,
+    summary_command,
+    messages_command,
+    stats_command,
+    profile_command
+)
 from .handlers.message_handlers import handle_voice_message, handle_text_message
 from .handlers.callback_handlers import button_callback
+from .services.admission import admission
+from .services.audio_executor import audio_executor
 from .services.database import db_service
+from .services.http_client import is_http_session_initialized
+from .services.s3_uploader import s3_uploader
+from .services.stt_poller import recognition_poller
+from .services.stt_streaming import streaming_recognizer
+from .services.voice_queue import voice_queue
+from .utils.event_loop import loop_bridge, run
+from .utils.profiling import LoopStallDetector
 
 # Настройка логирования
 logging.basicConfig(
@@ -16,13 +45,53 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def on_startup(application: Application):
+    """Вызывается перед началом опроса обновлений"""
+    loop_bridge.attach(asyncio.get_running_loop())
+    # Воркеры подхватят и задания, не завершенные до перезапуска
+    await voice_queue.start(application.bot)
+    recognition_poller.start(application.bot)
+    health_service.mark_ready()
+
+
+async def on_shutdown(application: Application):
+    """Вызывается после остановки опроса обновлений"""
+    loop_bridge.detach()
+    await voice_queue.stop()
+    await recognition_poller.stop()
+    await streaming_recognizer.close()
+    audio_executor.shutdown()
+
+
 async def main():
     """Основная функция запуска бота"""
+    # Эндпоинты проверки готовности поднимаем первыми, чтобы видеть весь запуск
+    health_service.add_check('database', lambda: db_service.is_initialized)
+    health_service.add_info('clients', lambda: {
+        's3': s3_uploader.is_initialized,
+        'http': is_http_session_initialized()
+    })
+    health_service.add_info('admission', admission.report)
+    health_service.add_info('voice_queue', lambda: voice_queue.stats)
+    await health_service.start_server(HEALTH_PORT)
+    
     # Инициализируем базу данных
     await db_service.initialize()
     
-    # Создаем приложение
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    # В режиме отладки следим за блокировками event loop
+    stall_detector = LoopStallDetector() if DEBUG_LOOP_STALLS else None
+    if stall_detector is not None:
+        stall_detector.start()
+    
+    # Создаем приложение (клиенты S3, STT и GPT создаются при первом обращении)
+    builder = Application.builder().token(TELEGRAM_TOKEN)
+    if TELEGRAM_API_URL:
+        # Собственный сервер Bot API
+        api_url = TELEGRAM_API_URL.rstrip('/')
+        builder = builder.base_url(f"{api_url}/bot").base_file_url(f"{api_url}/file/bot")
+        builder = builder.local_mode(TELEGRAM_LOCAL_MODE)
+        logger.info(f"Используется сервер Bot API {api_url} (локальный режим: {TELEGRAM_LOCAL_MODE})")
+    application = builder.build()
     
     # Добавляем обработчики команд
     application.add_handler(CommandHandler("start", start_command))
@@ -30,6 +99,8 @@ async def main():
     application.add_handler(CommandHandler("transcribe", transcribe_command))
     application.add_handler(CommandHandler("summary", summary_command))
     application.add_handler(CommandHandler("messages", messages_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("profile", profile_command))
     
     # Добавляем обработчики callback запросов
     application.add_handler(CallbackQueryHandler(button_callback))
@@ -38,21 +109,51 @@ async def main():
     application.add_handler(MessageHandler(filters.VOICE, handle_voice_message))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message))
     
-    # Запускаем бота
+    # Запускаем бота в уже работающем event loop и ждем сигнала остановки
     logger.info("Запуск бота...")
-    await application.run_polling()
+    stop = asyncio.Event()
+    _add_stop_signal_handlers(stop)
+    try:
+        async with application:
+            await on_startup(application)
+            try:
+                await application.start()
+                await application.updater.start_polling()
+                
+                await stop.wait()
+                logger.info("Остановка бота...")
+            finally:
+                if application.updater.running:
+                    await application.updater.stop()
+                if application.running:
+                    await application.stop()
+                await on_shutdown(application)
+    finally:
+        if stall_detector is not None:
+            stall_detector.stop()
+        await health_service.stop_server()
+        await db_service.close()
+
+
+def _add_stop_signal_handlers(stop: asyncio.Event):
+    """Останавливает бота по SIGINT/SIGTERM (в Windows остановка по Ctrl+C через KeyboardInterrupt)"""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
 
 
 def run_bot():
     """Запуск бота в синхронном режиме"""
-    import asyncio
-    import nest_asyncio
-    
-    # Разрешаем вложенные event loops
-    nest_asyncio.apply()
+    validate_settings()
     
-    # Запускаем бота
-    asyncio.run(main())
+    # Event loop создается и закрывается здесь (uvloop при USE_UVLOOP=1)
+    try:
+        run(main())
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == '__main__':
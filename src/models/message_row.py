@@ -0,0 +1,88 @@
+"""Легкое представление строки user_messages для чтения"""
+from datetime import datetime
+from typing import Any, Iterator, Optional, Sequence, Tuple
+
+from ..utils.compression import transcription_codec
+from .user_message import UserMessage
+
+# Порядок совпадает с StorageBackend.MESSAGE_COLUMNS
+MESSAGE_FIELDS = (
+    'id', 'user_id', 'message_id', 'date', 'timestamp', 's3_key',
+    'transcription', 'created_at', 'audio_seconds', 'audio_bytes',
+    'archive_codec', 'archive_bytes'
+)
+
+_UNSET = object()
+
+
+def _column(index: int) -> property:
+    return property(lambda self: self._row[index], doc=f"Колонка {MESSAGE_FIELDS[index]}")
+
+
+class MessageRow:
+    """Строка сообщения только для чтения
+
+    Хранит кортеж, полученный от драйвера базы, без копирования. Транскрипция
+    распаковывается, а created_at разбирается при первом обращении к полю.
+    Поддерживает протокол словаря (row['transcription'], row.get(...),
+    'transcription' in row, dict(row)), как словари, которые раньше
+    возвращал storage.get_user_messages.
+    """
+
+    __slots__ = ('_row', '_transcription', '_created_at')
+
+    def __init__(self, row: Sequence):
+        self._row = row
+        self._transcription = _UNSET
+        self._created_at = _UNSET
+
+    id = _column(0)
+    user_id = _column(1)
+    message_id = _column(2)
+    date = _column(3)
+    timestamp = _column(4)
+    s3_key = _column(5)
+    audio_seconds = _column(8)
+    audio_bytes = _column(9)
+    archive_codec = _column(10)
+    archive_bytes = _column(11)
+
+    @property
+    def transcription(self) -> Optional[str]:
+        if self._transcription is _UNSET:
+            self._transcription = transcription_codec.decompress(self._row[6])
+        return self._transcription
+
+    @property
+    def created_at(self) -> Optional[datetime]:
+        if self._created_at is _UNSET:
+            value = self._row[7]
+            self._created_at = datetime.fromisoformat(value) if isinstance(value, str) else value
+        return self._created_at
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in MESSAGE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in MESSAGE_FIELDS else default
+
+    def __contains__(self, key: object) -> bool:
+        return key in MESSAGE_FIELDS
+
+    def keys(self) -> Tuple[str, ...]:
+        return MESSAGE_FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(MESSAGE_FIELDS)
+
+    def __len__(self) -> int:
+        return len(MESSAGE_FIELDS)
+
+    def to_model(self) -> UserMessage:
+        """Изменяемая модель, например для повторного сохранения"""
+        return UserMessage(**{field: getattr(self, field) for field in MESSAGE_FIELDS})
+
+    def __repr__(self) -> str:
+        return f"MessageRow(id={self.id!r}, user_id={self.user_id!r}, message_id={self.message_id!r}, date={self.date!r})"
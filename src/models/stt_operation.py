@@ -0,0 +1,16 @@
+"""Модель операции асинхронного распознавания"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RecognitionOperation:
+    """Операция SpeechKit, результат которой еще не записан в user_messages"""
+    operation_id: str = ""
+    user_id: str = ""
+    chat_id: int = 0
+    message_id: int = 0
+    date: str = ""
+    processing_message_id: Optional[int] = None
+    polls: int = 0
+    next_poll_at: float = 0.0
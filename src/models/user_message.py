@@ -15,6 +15,12 @@ class UserMessage:
     s3_key: Optional[str] = None
     transcription: Optional[str] = None
     created_at: Optional[datetime] = None
+    # Длительность и размер исходной записи (None для сообщений до их учета)
+    audio_seconds: Optional[float] = None
+    audio_bytes: Optional[int] = None
+    # Кодек и размер копии в S3 (None - хранится исходная запись)
+    archive_codec: Optional[str] = None
+    archive_bytes: Optional[int] = None
     
     def __post_init__(self):
         """Инициализация после создания объекта"""
@@ -0,0 +1,13 @@
+"""Модель агрегированной статистики пользователя"""
+from dataclasses import dataclass
+
+
+@dataclass
+class UserStats:
+    """Суммы по дневным агрегатам пользователя за период"""
+    days: int = 0
+    messages: int = 0
+    audio_seconds: float = 0.0
+    audio_bytes: int = 0
+    transcription_chars: int = 0
+    summaries: int = 0
@@ -0,0 +1,23 @@
+"""Модель задания на обработку голосового сообщения"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class VoiceJob:
+    """Задание очереди голосовых сообщений"""
+    id: Optional[int] = None
+    user_id: str = ""
+    chat_id: int = 0
+    message_id: int = 0
+    file_id: str = ""
+    processing_message_id: Optional[int] = None
+    date: str = ""
+    status: str = "pending"
+    attempts: int = 0
+    available_at: float = 0.0
+    lease_owner: Optional[str] = None
+    lease_until: Optional[float] = None
+    error: Optional[str] = None
+    # Длительность из Telegram (voice.duration), чтобы не декодировать запись ради нее
+    duration: Optional[float] = None
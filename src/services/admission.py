@@ -0,0 +1,142 @@
+"""Контроль допуска нагрузки и постепенная деградация при перегрузке"""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from ..config.settings import (
+    ADMISSION_USER_MAX_PENDING,
+    ADMISSION_DEFER_ARCHIVE_DEPTH,
+    ADMISSION_DEFER_SUMMARIES_DEPTH,
+    ADMISSION_REJECT_DEPTH,
+    ADMISSION_MAX_SUMMARIES,
+    ADMISSION_REFRESH_INTERVAL
+)
+from ..config.messages import VOICE_BUSY, VOICE_USER_BUSY
+from .database import db_service
+from .send_scheduler import send_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """Решает, принимать ли новую работу, исходя из глубины очередей
+
+    Уровни деградации включаются по очереди по мере роста очереди голосовых
+    или исходящих сообщений:
+
+    - NORMAL: обычная работа;
+    - DEFER_ARCHIVE: загрузка в S3 выполняется после ответа пользователю;
+    - DEFER_SUMMARIES: суммаризация откладывается, пользователь просит повторить позже;
+    - REJECT: новые голосовые сообщения отклоняются с просьбой повторить позже.
+
+    Независимо от уровня действует квота на число необработанных сообщений
+    одного пользователя и на число одновременных суммаризаций.
+    """
+
+    NORMAL = 0
+    DEFER_ARCHIVE = 1
+    DEFER_SUMMARIES = 2
+    REJECT = 3
+
+    LEVEL_NAMES = {
+        NORMAL: 'normal',
+        DEFER_ARCHIVE: 'defer_archive',
+        DEFER_SUMMARIES: 'defer_summaries',
+        REJECT: 'reject'
+    }
+
+    def __init__(
+        self,
+        user_max_pending: int = ADMISSION_USER_MAX_PENDING,
+        defer_archive_depth: int = ADMISSION_DEFER_ARCHIVE_DEPTH,
+        defer_summaries_depth: int = ADMISSION_DEFER_SUMMARIES_DEPTH,
+        reject_depth: int = ADMISSION_REJECT_DEPTH,
+        max_summaries: int = ADMISSION_MAX_SUMMARIES,
+        refresh_interval: float = ADMISSION_REFRESH_INTERVAL
+    ):
+        self.user_max_pending = user_max_pending
+        self.thresholds = (
+            (reject_depth, self.REJECT),
+            (defer_summaries_depth, self.DEFER_SUMMARIES),
+            (defer_archive_depth, self.DEFER_ARCHIVE)
+        )
+        self.max_summaries = max_summaries
+        self.refresh_interval = refresh_interval
+        self.level = self.NORMAL
+        self.voice_depth = 0
+        self.send_depth = 0
+        self.summaries_in_flight = 0
+        self._refreshed_at = 0.0
+        self.stats = {'rejected_voice': 0, 'rejected_user': 0, 'postponed_summaries': 0}
+
+    def _level_for(self, depth: int) -> int:
+        for threshold, level in self.thresholds:
+            if threshold and depth >= threshold:
+                return level
+        return self.NORMAL
+
+    async def refresh(self, force: bool = False) -> int:
+        """Пересчитывает уровень деградации не чаще refresh_interval"""
+        now = time.monotonic()
+        if not force and now - self._refreshed_at < self.refresh_interval:
+            return self.level
+        self._refreshed_at = now
+
+        self.voice_depth = await db_service.count_voice_jobs()
+        self.send_depth = send_scheduler.queue_depth()
+        level = max(self._level_for(self.voice_depth), self._level_for(self.send_depth))
+
+        if level != self.level:
+            log = logger.warning if level > self.level else logger.info
+            log(
+                f"Уровень нагрузки: {self.LEVEL_NAMES[self.level]} -> {self.LEVEL_NAMES[level]} "
+                f"(голосовых в очереди: {self.voice_depth}, исходящих: {self.send_depth})"
+            )
+            self.level = level
+        return level
+
+    async def admit_voice(self, user_id: str) -> Optional[str]:
+        """Проверяет, можно ли принять голосовое сообщение
+
+        Возвращает None, если можно, иначе текст отказа для пользователя.
+        """
+        if await self.refresh() >= self.REJECT:
+            self.stats['rejected_voice'] += 1
+            return VOICE_BUSY
+
+        if self.user_max_pending and await db_service.count_voice_jobs(user_id) >= self.user_max_pending:
+            self.stats['rejected_user'] += 1
+            return VOICE_USER_BUSY.format(limit=self.user_max_pending)
+
+        return None
+
+    async def admit_summary(self) -> bool:
+        """Занимает место для суммаризации; после нее нужно вызвать release_summary()"""
+        level = await self.refresh()
+        if level >= self.DEFER_SUMMARIES or (self.max_summaries and self.summaries_in_flight >= self.max_summaries):
+            self.stats['postponed_summaries'] += 1
+            return False
+        self.summaries_in_flight += 1
+        return True
+
+    def release_summary(self):
+        """Освобождает место суммаризации"""
+        self.summaries_in_flight = max(0, self.summaries_in_flight - 1)
+
+    async def defer_archive(self) -> bool:
+        """Нужно ли откладывать загрузку в S3 до ответа пользователю"""
+        return await self.refresh() >= self.DEFER_ARCHIVE
+
+    def report(self) -> Dict[str, Any]:
+        """Текущее состояние для эндпоинта /health"""
+        return {
+            'level': self.LEVEL_NAMES[self.level],
+            'voice_queue': self.voice_depth,
+            'send_queue': self.send_depth,
+            'summaries_in_flight': self.summaries_in_flight,
+            **self.stats
+        }
+
+
+# Глобальный экземпляр контроля нагрузки
+admission = AdmissionController()
@@ -0,0 +1,68 @@
+"""Пул процессов для CPU-нагруженной обработки аудио"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from ..config.settings import AUDIO_WORKERS
+from ..utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """Количество ядер, доступных процессу"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class AudioExecutor:
+    """Шардированный пул процессов для обработки аудио
+
+    Каждый шард - отдельный процесс; задания одного пользователя всегда
+    попадают в один шард, поэтому его данные остаются в кэше этого процесса,
+    а тяжелые задания одного пользователя не занимают весь пул.
+    """
+    
+    def __init__(self, workers: int = 0):
+        self.workers = workers or available_cpus()
+        self._shards: Optional[List[ProcessPoolExecutor]] = None
+    
+    def _get_shards(self) -> List[ProcessPoolExecutor]:
+        """Создает процессы при первом обращении, чтобы не замедлять запуск бота"""
+        if self._shards is None:
+            # spawn не копирует потоки и event loop родительского процесса
+            context = multiprocessing.get_context('spawn')
+            self._shards = [
+                ProcessPoolExecutor(max_workers=1, mp_context=context)
+                for _ in range(self.workers)
+            ]
+            logger.info(f"Пул обработки аудио запущен: {self.workers} процессов")
+        return self._shards
+    
+    def shard_for(self, user_id: str) -> int:
+        """Номер шарда пользователя (стабилен между перезапусками)"""
+        return zlib.crc32(str(user_id).encode('utf-8')) % self.workers
+    
+    async def submit(self, user_id: str, func: Callable[..., Any], *args) -> Any:
+        """Выполняет func(*args) в процессе шарда пользователя, не блокируя event loop"""
+        shard = self.shard_for(user_id)
+        with span(f"audio.{func.__name__}", shard=shard):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_shards()[shard], func, *args)
+    
+    def shutdown(self):
+        """Останавливает процессы пула"""
+        if self._shards is not None:
+            for shard in self._shards:
+                shard.shutdown(wait=False, cancel_futures=True)
+            self._shards = None
+
+
+# Глобальный экземпляр пула обработки аудио
+audio_executor = AudioExecutor(AUDIO_WORKERS)
@@ -0,0 +1,117 @@
+"""CPU-нагруженные операции над аудио (выполняются в пуле процессов)
+
+Функции этого модуля вызываются в дочерних процессах, поэтому принимают и
+возвращают только сериализуемые значения и не зависят от настроек бота.
+"""
+import io
+from typing import Any, Dict, List, Tuple
+
+from pydub import AudioSegment
+from pydub.silence import detect_nonsilent
+
+
+def decode_audio(audio_data: bytes, audio_format: str = 'ogg') -> AudioSegment:
+    """Декодирует аудио через ffmpeg"""
+    return AudioSegment.from_file(io.BytesIO(audio_data), format=audio_format)
+
+
+def _describe(audio: AudioSegment, audio_data: bytes) -> Dict[str, Any]:
+    return {
+        'duration_seconds': len(audio) / 1000,
+        'sample_rate': audio.frame_rate,
+        'channels': audio.channels,
+        'dbfs': audio.dBFS if audio.rms else None,
+        'size_bytes': len(audio_data)
+    }
+
+
+def analyze_voice(audio_data: bytes, audio_format: str = 'ogg') -> Dict[str, Any]:
+    """Декодирует голосовое сообщение и возвращает его параметры"""
+    return _describe(decode_audio(audio_data, audio_format), audio_data)
+
+
+def encode_archive(audio_data: bytes, audio_format: str = 'ogg', bitrate: str = '16k') -> Dict[str, Any]:
+    """Перекодирует запись для архива в Opus с профилем для речи
+
+    Моно 16 кГц, режим voip кодека Opus, контейнер OGG (как у голосовых
+    Telegram). Возвращает параметры исходной записи (как analyze_voice) и
+    дополнительно: audio - байты для архива, codec - их кодек. Если
+    перекодированная запись не меньше исходной, возвращается исходная и
+    codec равен None.
+    """
+    audio = decode_audio(audio_data, audio_format)
+    result = _describe(audio, audio_data)
+
+    buffer = io.BytesIO()
+    audio.set_channels(1).set_frame_rate(16000).export(
+        buffer, format='ogg', codec='libopus', bitrate=bitrate, parameters=['-application', 'voip']
+    )
+    encoded = buffer.getvalue()
+    if len(encoded) < len(audio_data):
+        result.update(audio=encoded, codec=f'opus/{bitrate}')
+    else:
+        result.update(audio=audio_data, codec=None)
+    return result
+
+
+def speech_ranges(
+    audio: AudioSegment,
+    min_silence_ms: int,
+    keep_silence_ms: int,
+    threshold_db: float
+) -> List[Tuple[int, int]]:
+    """Участки речи в миллисекундах с запасом keep_silence_ms по краям
+
+    Тишиной считается звук тише средней громкости записи на threshold_db
+    децибел; паузы короче min_silence_ms остаются внутри участков речи.
+    """
+    ranges: List[Tuple[int, int]] = []
+    for start, end in detect_nonsilent(
+        audio, min_silence_len=min_silence_ms, silence_thresh=audio.dBFS - threshold_db, seek_step=10
+    ):
+        start, end = max(0, start - keep_silence_ms), min(len(audio), end + keep_silence_ms)
+        if ranges and start <= ranges[-1][1]:
+            # Запасы соседних участков перекрываются - объединяем их
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def trim_silence(
+    audio_data: bytes,
+    audio_format: str = 'ogg',
+    min_silence_ms: int = 700,
+    keep_silence_ms: int = 250,
+    threshold_db: float = 16.0,
+    min_saved_seconds: float = 1.0
+) -> Dict[str, Any]:
+    """Обрезает тишину в начале и конце записи и сжимает длинные паузы перед распознаванием
+
+    Возвращает параметры исходной записи (как analyze_voice) и дополнительно:
+    audio - запись для распознавания в OGG/Opus, seconds_saved - сколько секунд
+    аудио не придется отправлять в SpeechKit. Если экономия меньше
+    min_saved_seconds, возвращаются исходные байты без перекодирования.
+    """
+    audio = decode_audio(audio_data, audio_format)
+    result = _describe(audio, audio_data)
+    result.update(audio=audio_data, seconds_saved=0.0)
+
+    if not audio.rms:
+        # Запись без звука: распознавать нечего, отдаем как есть
+        return result
+
+    ranges = speech_ranges(audio, min_silence_ms, keep_silence_ms, threshold_db)
+    kept_ms = sum(end - start for start, end in ranges)
+    seconds_saved = (len(audio) - kept_ms) / 1000
+    if not ranges or seconds_saved < min_saved_seconds:
+        return result
+
+    compact = AudioSegment.empty()
+    for start, end in ranges:
+        compact += audio[start:end]
+
+    buffer = io.BytesIO()
+    compact.export(buffer, format='ogg', codec='libopus', bitrate='32k')
+    result.update(audio=buffer.getvalue(), seconds_saved=seconds_saved)
+    return result
@@ -0,0 +1,224 @@
+"""Базовый интерфейс хранилища сообщений"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ...models.message_row import MESSAGE_FIELDS, MessageRow
+from ...models.user_message import UserMessage
+from ...models.user_stats import UserStats
+from ...models.stt_operation import RecognitionOperation
+from ...models.voice_job import VoiceJob
+from ...utils.compression import transcription_codec
+
+
+@dataclass(frozen=True)
+class Migration:
+    """Шаг версионированной миграции схемы
+
+    Шаги с transactional=False выполняются вне транзакции: так создаются индексы
+    без блокировки записи (CREATE INDEX CONCURRENTLY в PostgreSQL).
+    """
+    version: int
+    description: str
+    statements: Tuple[str, ...]
+    transactional: bool = True
+
+
+class StorageBackend(ABC):
+    """Интерфейс хранилища, общий для всех бэкендов"""
+    
+    # Колонки, которые читаются при выборке сообщений
+    MESSAGE_COLUMNS = (
+        "id, user_id, message_id, date, timestamp, s3_key, transcription, created_at, "
+        "audio_seconds, audio_bytes, archive_codec, archive_bytes"
+    )
+    
+    # Колонки таблицы очереди голосовых сообщений
+    VOICE_JOB_COLUMNS = (
+        "id, user_id, chat_id, message_id, file_id, processing_message_id, date, "
+        "status, attempts, available_at, lease_owner, lease_until, error, duration"
+    )
+    
+    # Колонки таблицы операций асинхронного распознавания
+    STT_OPERATION_COLUMNS = "operation_id, user_id, chat_id, message_id, date, processing_message_id, polls, next_poll_at"
+    
+    # Миграции схемы по возрастанию версии
+    MIGRATIONS: Tuple[Migration, ...] = ()
+    
+    @property
+    def schema_version(self) -> int:
+        """Версия схемы, которую ожидает код"""
+        return self.MIGRATIONS[-1].version if self.MIGRATIONS else 0
+    
+    @abstractmethod
+    async def initialize(self):
+        """Применяет недостающие миграции и подготавливает подключения"""
+    
+    async def close(self):
+        """Освобождает подключения"""
+    
+    @abstractmethod
+    async def add_user_message(self, message: UserMessage) -> int:
+        """Добавляет или обновляет сообщение пользователя, возвращает id строки"""
+    
+    @abstractmethod
+    async def get_user_messages(self, user_id: str, date: str) -> List[MessageRow]:
+        """Получает сообщения пользователя за определенную дату"""
+    
+    @abstractmethod
+    async def get_user_transcriptions(self, user_id: str, date: str) -> List[str]:
+        """Получает транскрипции пользователя за определенную дату"""
+    
+    @abstractmethod
+    async def has_user_messages(self, user_id: str, date: str) -> bool:
+        """Проверяет, есть ли у пользователя сообщения за определенную дату (по дневным агрегатам)"""
+    
+    @abstractmethod
+    async def record_summary(self, user_id: str, date: str):
+        """Учитывает построенную суммаризацию в дневных агрегатах"""
+    
+    @abstractmethod
+    async def get_user_stats(self, user_id: str, start_date: str, end_date: str) -> UserStats:
+        """Суммирует дневные агрегаты пользователя за диапазон дат"""
+    
+    @abstractmethod
+    async def get_user_messages_by_date_range(self, user_id: str, start_date: str, end_date: str) -> List[MessageRow]:
+        """Получает сообщения пользователя за диапазон дат"""
+    
+    @abstractmethod
+    async def get_messages_page(
+        self,
+        start_date: str,
+        end_date: str,
+        after_id: int = 0,
+        limit: int = 500,
+        user_id: Optional[str] = None
+    ) -> List[MessageRow]:
+        """Сообщения всех пользователей (или одного) за диапазон дат с id больше after_id по возрастанию id"""
+    
+    @abstractmethod
+    async def fetch_message_columns(
+        self,
+        user_id: str,
+        start_date: str,
+        end_date: str,
+        columns: Sequence[str]
+    ) -> Dict[str, tuple]:
+        """Только запрошенные колонки сообщений за диапазон дат (имена из MESSAGE_FIELDS), по колонке на ключ"""
+    
+    @abstractmethod
+    async def delete_old_messages(self, days_to_keep: int = 30) -> int:
+        """Удаляет сообщения старше указанного количества дней"""
+    
+    @abstractmethod
+    async def update_transcription(self, user_id: str, message_id: int, date: str, transcription: str):
+        """Записывает транскрипцию в уже сохраненное сообщение"""
+    
+    @abstractmethod
+    async def enqueue_voice_job(self, job: VoiceJob) -> int:
+        """Сохраняет задание в очередь, возвращает его id"""
+    
+    @abstractmethod
+    async def claim_voice_job(self, worker_id: str, lease_seconds: float, max_attempts: int) -> Optional[VoiceJob]:
+        """Атомарно захватывает готовое задание (новое или с истекшей арендой)"""
+    
+    @abstractmethod
+    async def extend_voice_job_lease(self, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Продлевает аренду задания; False, если задание уже не принадлежит воркеру"""
+    
+    @abstractmethod
+    async def complete_voice_job(self, job_id: int, worker_id: str) -> bool:
+        """Удаляет выполненное задание из очереди, если воркер все еще владеет им"""
+    
+    @abstractmethod
+    async def fail_voice_job(self, job_id: int, worker_id: str, error: str, max_attempts: int, retry_delay: float) -> bool:
+        """Возвращает задание в очередь с задержкой или помечает его проваленным
+
+        Возвращает True, если попытки исчерпаны и задание провалено окончательно.
+        Задание, которое уже не принадлежит воркеру, не изменяется.
+        """
+    
+    @abstractmethod
+    async def expire_voice_jobs(self, max_attempts: int) -> List[VoiceJob]:
+        """Помечает проваленными задания, чья последняя попытка прервалась вместе с процессом"""
+    
+    @abstractmethod
+    async def count_voice_jobs(self, user_id: Optional[str] = None) -> int:
+        """Количество заданий в очереди, ожидающих или выполняющихся (всех или одного пользователя)"""
+    
+    @abstractmethod
+    async def add_stt_operation(self, operation: RecognitionOperation):
+        """Сохраняет операцию асинхронного распознавания"""
+    
+    @abstractmethod
+    async def claim_due_stt_operations(self, limit: int, poll_interval: float) -> List[RecognitionOperation]:
+        """Выбирает операции, которые пора опросить, и откладывает их следующий опрос
+
+        Интервал опроса растет с числом опросов (до 6 * poll_interval), чтобы
+        длинные записи не опрашивались впустую.
+        """
+    
+    @abstractmethod
+    async def delete_stt_operation(self, operation_id: str):
+        """Удаляет завершенную операцию"""
+    
+    @staticmethod
+    def _row_to_voice_job(row: Sequence) -> VoiceJob:
+        """Собирает задание из строки с колонками VOICE_JOB_COLUMNS"""
+        return VoiceJob(*row)
+    
+    @staticmethod
+    def _row_to_stt_operation(row: Sequence) -> RecognitionOperation:
+        """Собирает операцию из строки с колонками STT_OPERATION_COLUMNS"""
+        return RecognitionOperation(*row)
+    
+    @staticmethod
+    def _message_totals(message: UserMessage) -> Tuple[float, int, int]:
+        """Вклад сообщения в дневные агрегаты: секунды аудио, байты, символы транскрипции"""
+        return (
+            message.audio_seconds or 0.0,
+            message.audio_bytes or 0,
+            len(message.transcription or '')
+        )
+    
+    @staticmethod
+    def _row_to_stats(row: Optional[Sequence]) -> UserStats:
+        """Собирает статистику из строки SELECT_DAILY_STATS_RANGE"""
+        if row is None or not row[0]:
+            return UserStats()
+        # PostgreSQL возвращает суммы BIGINT как Decimal
+        return UserStats(
+            days=int(row[0]),
+            messages=int(row[1]),
+            audio_seconds=float(row[2]),
+            audio_bytes=int(row[3]),
+            transcription_chars=int(row[4]),
+            summaries=int(row[5])
+        )
+    
+    @staticmethod
+    def _row_to_message(row: Sequence) -> MessageRow:
+        """Строка с колонками MESSAGE_COLUMNS без копирования и разбора полей"""
+        return MessageRow(row)
+    
+    @staticmethod
+    def _select_list(columns: Sequence[str]) -> str:
+        """Список колонок для SELECT; имена проверяются, так как подставляются в SQL"""
+        unknown = [column for column in columns if column not in MESSAGE_FIELDS]
+        if unknown or not columns:
+            raise ValueError(f"Неизвестные колонки сообщений: {', '.join(unknown) or '-'}")
+        return ', '.join(columns)
+    
+    @staticmethod
+    def _rows_to_columns(columns: Sequence[str], rows: Sequence[Sequence]) -> Dict[str, tuple]:
+        """Транспонирует строки в кортежи колонок и декодирует только запрошенные поля"""
+        result = dict(zip(columns, zip(*rows))) if rows else {column: () for column in columns}
+        if 'transcription' in result:
+            result['transcription'] = tuple(map(transcription_codec.decompress, result['transcription']))
+        if 'created_at' in result:
+            result['created_at'] = tuple(
+                datetime.fromisoformat(value) if isinstance(value, str) else value
+                for value in result['created_at']
+            )
+        return result
@@ -0,0 +1,559 @@
+"""Хранилище сообщений в PostgreSQL"""
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from ...models.message_row import MessageRow
+from ...models.user_message import UserMessage
+from ...models.user_stats import UserStats
+from ...models.stt_operation import RecognitionOperation
+from ...models.voice_job import VoiceJob
+from .base import Migration, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresBackend(StorageBackend):
+    """Бэкенд хранилища на PostgreSQL с асинхронным пулом соединений
+
+    Позволяет нескольким процессам и хостам бота работать с общим состоянием.
+    """
+    
+    MIGRATIONS = (
+        Migration(1, 'базовая схема', (
+            """
+            CREATE TABLE IF NOT EXISTS user_messages (
+                id BIGSERIAL PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                message_id BIGINT NOT NULL,
+                date TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                s3_key TEXT,
+                transcription TEXT,
+                created_at TIMESTAMP DEFAULT LOCALTIMESTAMP,
+                UNIQUE(user_id, message_id, date)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_messages_user_date 
+            ON user_messages(user_id, date)
+            """,
+            # Очередь голосовых сообщений, общая для всех процессов бота
+            """
+            CREATE TABLE IF NOT EXISTS voice_jobs (
+                id BIGSERIAL PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                chat_id BIGINT NOT NULL,
+                message_id BIGINT NOT NULL,
+                file_id TEXT NOT NULL,
+                processing_message_id BIGINT,
+                date TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at DOUBLE PRECISION NOT NULL,
+                lease_owner TEXT,
+                lease_until DOUBLE PRECISION,
+                error TEXT,
+                UNIQUE(chat_id, message_id)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_voice_jobs_status 
+            ON voice_jobs(status, available_at)
+            """,
+            # Операции асинхронного распознавания, ожидающие результата
+            """
+            CREATE TABLE IF NOT EXISTS stt_operations (
+                operation_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                chat_id BIGINT NOT NULL,
+                message_id BIGINT NOT NULL,
+                date TEXT NOT NULL,
+                processing_message_id BIGINT,
+                polls INTEGER NOT NULL DEFAULT 0,
+                next_poll_at DOUBLE PRECISION NOT NULL
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_stt_operations_next_poll 
+            ON stt_operations(next_poll_at)
+            """,
+        )),
+        # Индекс строится без блокировки записи; transcription хранится в листьях
+        # индекса, поэтому выборка транскрипций за день читает только индекс
+        Migration(2, 'покрывающий индекс сообщений за день', (
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_messages_user_date_created 
+            ON user_messages(user_id, date, created_at) INCLUDE (transcription)
+            """,
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_user_messages_user_date",
+        ), transactional=False),
+        # Дневные агрегаты обновляются вместе с сообщениями в одной транзакции;
+        # в сообщении хранится его вклад, чтобы вычесть его при удалении
+        Migration(3, 'дневные агрегаты пользователей', (
+            "ALTER TABLE user_messages ADD COLUMN IF NOT EXISTS audio_seconds DOUBLE PRECISION",
+            "ALTER TABLE user_messages ADD COLUMN IF NOT EXISTS audio_bytes BIGINT",
+            "ALTER TABLE user_messages ADD COLUMN IF NOT EXISTS transcription_chars INTEGER NOT NULL DEFAULT 0",
+            """
+            UPDATE user_messages SET transcription_chars = char_length(transcription)
+            WHERE transcription IS NOT NULL
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_daily_stats (
+                user_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                audio_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+                audio_bytes BIGINT NOT NULL DEFAULT 0,
+                transcription_chars BIGINT NOT NULL DEFAULT 0,
+                summary_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, date)
+            )
+            """,
+            """
+            INSERT INTO user_daily_stats (user_id, date, message_count, transcription_chars)
+            SELECT user_id, date, COUNT(*), SUM(transcription_chars)
+            FROM user_messages
+            GROUP BY user_id, date
+            ON CONFLICT (user_id, date) DO NOTHING
+            """,
+        )),
+        Migration(4, 'кодек и размер архивной копии', (
+            "ALTER TABLE user_messages ADD COLUMN IF NOT EXISTS archive_codec TEXT",
+            "ALTER TABLE user_messages ADD COLUMN IF NOT EXISTS archive_bytes BIGINT",
+        )),
+        Migration(5, 'длительность записи в задании очереди', (
+            "ALTER TABLE voice_jobs ADD COLUMN IF NOT EXISTS duration DOUBLE PRECISION",
+        )),
+    )
+    
+    # Ключ advisory-блокировки, под которой выполняются миграции
+    MIGRATION_LOCK_ID = 0x5355_4D42
+    
+    # Частые запросы; их планы проверяет python -m src.utils.query_plans
+    SELECT_MESSAGES_BY_DATE = f"""
+        SELECT {StorageBackend.MESSAGE_COLUMNS}
+        FROM user_messages 
+        WHERE user_id = $1 AND date = $2
+        ORDER BY created_at ASC
+    """
+    
+    SELECT_TRANSCRIPTIONS_BY_DATE = """
+        SELECT transcription
+        FROM user_messages 
+        WHERE user_id = $1 AND date = $2 AND transcription IS NOT NULL
+        ORDER BY created_at ASC
+    """
+    
+    HAS_MESSAGES_BY_DATE = """
+        SELECT EXISTS(
+            SELECT 1 FROM user_daily_stats WHERE user_id = $1 AND date = $2 AND message_count > 0
+        )
+    """
+    
+    SELECT_DAILY_STATS_RANGE = """
+        SELECT COUNT(*), SUM(message_count), SUM(audio_seconds), SUM(audio_bytes),
+               SUM(transcription_chars), SUM(summary_count)
+        FROM user_daily_stats
+        WHERE user_id = $1 AND date BETWEEN $2 AND $3
+    """
+    
+    SELECT_MESSAGES_BY_DATE_RANGE = f"""
+        SELECT {StorageBackend.MESSAGE_COLUMNS}
+        FROM user_messages 
+        WHERE user_id = $1 AND date BETWEEN $2 AND $3
+        ORDER BY date ASC, created_at ASC
+    """
+    
+    # Прибавляет к агрегатам дня разницу; отрицательная - при удалении и перезаписи
+    ADD_DAILY_STATS = """
+        INSERT INTO user_daily_stats AS s
+        (user_id, date, message_count, audio_seconds, audio_bytes, transcription_chars, summary_count)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ON CONFLICT (user_id, date) DO UPDATE SET
+            message_count = s.message_count + EXCLUDED.message_count,
+            audio_seconds = s.audio_seconds + EXCLUDED.audio_seconds,
+            audio_bytes = s.audio_bytes + EXCLUDED.audio_bytes,
+            transcription_chars = s.transcription_chars + EXCLUDED.transcription_chars,
+            summary_count = s.summary_count + EXCLUDED.summary_count
+    """
+    
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool = None
+    
+    @property
+    def pool(self):
+        """Пул соединений, доступен после initialize()"""
+        if self._pool is None:
+            raise RuntimeError("PostgresBackend не инициализирован")
+        return self._pool
+    
+    async def initialize(self):
+        """Создание пула соединений и применение недостающих миграций"""
+        if self._pool is None:
+            import asyncpg
+            
+            self._pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        
+        async with self.pool.acquire() as conn:
+            # Процессы бота, запущенные одновременно, применяют миграции по очереди
+            await conn.execute("SELECT pg_advisory_lock($1)", self.MIGRATION_LOCK_ID)
+            try:
+                await self._migrate(conn)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", self.MIGRATION_LOCK_ID)
+    
+    async def _migrate(self, conn):
+        """Применяет миграции новее версии из таблицы schema_migrations"""
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP
+            )
+        """)
+        current = await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        
+        for migration in self.MIGRATIONS:
+            if migration.version <= current:
+                continue
+            
+            logger.info(f"Миграция PostgreSQL {migration.version}: {migration.description}")
+            if migration.transactional:
+                async with conn.transaction():
+                    for statement in migration.statements:
+                        await conn.execute(statement)
+                    await self._record_migration(conn, migration)
+            else:
+                # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс,
+                # который IF NOT EXISTS пропустил бы
+                await self._drop_invalid_indexes(conn)
+                for statement in migration.statements:
+                    await conn.execute(statement)
+                await self._record_migration(conn, migration)
+    
+    @staticmethod
+    async def _record_migration(conn, migration: Migration):
+        await conn.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES ($1, $2)",
+            migration.version, migration.description
+        )
+    
+    @staticmethod
+    async def _drop_invalid_indexes(conn):
+        """Удаляет индексы, оставшиеся невалидными после прерванного построения"""
+        names = await conn.fetch("""
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE NOT i.indisvalid AND n.nspname = current_schema()
+        """)
+        for row in names:
+            logger.warning(f"Удаляем невалидный индекс {row[0]}")
+            await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{row[0]}"')
+    
+    async def close(self):
+        """Закрывает пул соединений"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+    
+    async def add_user_message(self, message: UserMessage) -> int:
+        """Добавляет сообщение пользователя (upsert на стороне сервера)"""
+        audio_seconds, audio_bytes, transcription_chars = self._message_totals(message)
+        async with self.pool.acquire() as conn, conn.transaction():
+            previous = await conn.fetchrow("""
+                SELECT audio_seconds, audio_bytes, transcription_chars
+                FROM user_messages
+                WHERE user_id = $1 AND message_id = $2 AND date = $3
+                FOR UPDATE
+            """, message.user_id, message.message_id, message.date)
+            
+            # xmax = 0 только у только что вставленной строки
+            row = await conn.fetchrow("""
+                INSERT INTO user_messages 
+                (user_id, message_id, date, timestamp, s3_key, transcription, created_at,
+                 audio_seconds, audio_bytes, transcription_chars, archive_codec, archive_bytes)
+                VALUES ($1, $2, $3, $4, $5, $6, COALESCE($7::timestamp, LOCALTIMESTAMP), $8, $9, $10, $11, $12)
+                ON CONFLICT (user_id, message_id, date) DO UPDATE SET
+                    timestamp = EXCLUDED.timestamp,
+                    s3_key = EXCLUDED.s3_key,
+                    transcription = EXCLUDED.transcription,
+                    created_at = EXCLUDED.created_at,
+                    audio_seconds = EXCLUDED.audio_seconds,
+                    audio_bytes = EXCLUDED.audio_bytes,
+                    transcription_chars = EXCLUDED.transcription_chars,
+                    archive_codec = EXCLUDED.archive_codec,
+                    archive_bytes = EXCLUDED.archive_bytes
+                RETURNING id, xmax = 0 AS inserted
+            """,
+                message.user_id,
+                message.message_id,
+                message.date,
+                message.timestamp,
+                message.s3_key,
+                message.transcription,
+                self._naive(message.created_at),
+                message.audio_seconds,
+                message.audio_bytes,
+                transcription_chars,
+                message.archive_codec,
+                message.archive_bytes
+            )
+            
+            # Перезапись сообщения заменяет его прежний вклад
+            if previous is not None:
+                audio_seconds -= previous['audio_seconds'] or 0.0
+                audio_bytes -= previous['audio_bytes'] or 0
+                transcription_chars -= previous['transcription_chars']
+            await conn.execute(
+                self.ADD_DAILY_STATS,
+                message.user_id, message.date, int(row['inserted']),
+                audio_seconds, audio_bytes, transcription_chars, 0
+            )
+            return row['id']
+    
+    @staticmethod
+    def _naive(value: Optional[datetime]) -> Optional[datetime]:
+        """Колонка TIMESTAMP без часового пояса, как и в SQLite"""
+        if value is not None and value.tzinfo is not None:
+            return value.replace(tzinfo=None)
+        return value
+    
+    async def get_user_messages(self, user_id: str, date: str) -> List[MessageRow]:
+        """Получает сообщения пользователя за определенную дату"""
+        rows = await self.pool.fetch(self.SELECT_MESSAGES_BY_DATE, user_id, date)
+        return [self._row_to_message(row) for row in rows]
+    
+    async def get_user_transcriptions(self, user_id: str, date: str) -> List[str]:
+        """Получает транскрипции пользователя за определенную дату"""
+        rows = await self.pool.fetch(self.SELECT_TRANSCRIPTIONS_BY_DATE, user_id, date)
+        return [row[0] for row in rows]
+    
+    async def has_user_messages(self, user_id: str, date: str) -> bool:
+        """Проверяет, есть ли у пользователя сообщения за определенную дату"""
+        return await self.pool.fetchval(self.HAS_MESSAGES_BY_DATE, user_id, date)
+    
+    async def record_summary(self, user_id: str, date: str):
+        """Учитывает построенную суммаризацию в дневных агрегатах"""
+        await self.pool.execute(self.ADD_DAILY_STATS, user_id, date, 0, 0.0, 0, 0, 1)
+    
+    async def get_user_stats(self, user_id: str, start_date: str, end_date: str) -> UserStats:
+        """Суммирует дневные агрегаты пользователя за диапазон дат"""
+        return self._row_to_stats(await self.pool.fetchrow(self.SELECT_DAILY_STATS_RANGE, user_id, start_date, end_date))
+    
+    async def get_user_messages_by_date_range(self, user_id: str, start_date: str, end_date: str) -> List[MessageRow]:
+        """Получает сообщения пользователя за диапазон дат"""
+        rows = await self.pool.fetch(self.SELECT_MESSAGES_BY_DATE_RANGE, user_id, start_date, end_date)
+        return [self._row_to_message(row) for row in rows]
+    
+    async def fetch_message_columns(
+        self,
+        user_id: str,
+        start_date: str,
+        end_date: str,
+        columns: Sequence[str]
+    ) -> Dict[str, tuple]:
+        """Только запрошенные колонки сообщений за диапазон дат, по колонке на ключ"""
+        rows = await self.pool.fetch(f"""
+            SELECT {self._select_list(columns)}
+            FROM user_messages 
+            WHERE user_id = $1 AND date BETWEEN $2 AND $3
+            ORDER BY date ASC, created_at ASC
+        """, user_id, start_date, end_date)
+        return self._rows_to_columns(columns, rows)
+    
+    async def get_messages_page(
+        self,
+        start_date: str,
+        end_date: str,
+        after_id: int = 0,
+        limit: int = 500,
+        user_id: Optional[str] = None
+    ) -> List[MessageRow]:
+        """Сообщения всех пользователей (или одного) за диапазон дат с id больше after_id по возрастанию id"""
+        rows = await self.pool.fetch(f"""
+            SELECT {self.MESSAGE_COLUMNS}
+            FROM user_messages
+            WHERE id > $1 AND date BETWEEN $2 AND $3 AND ($4::text IS NULL OR user_id = $4)
+            ORDER BY id ASC
+            LIMIT $5
+        """, after_id, start_date, end_date, user_id, limit)
+        return [self._row_to_message(row) for row in rows]
+    
+    async def delete_old_messages(self, days_to_keep: int = 30) -> int:
+        """Удаляет старые сообщения (старше указанного количества дней)"""
+        async with self.pool.acquire() as conn, conn.transaction():
+            # Удаленные строки сразу вычитаются из агрегатов их дней
+            deleted_count = await conn.fetchval("""
+                WITH deleted AS (
+                    DELETE FROM user_messages 
+                    WHERE created_at < LOCALTIMESTAMP - make_interval(days => $1)
+                    RETURNING user_id, date, audio_seconds, audio_bytes, transcription_chars
+                ), expired AS (
+                    SELECT user_id, date, COUNT(*) AS message_count,
+                           COALESCE(SUM(audio_seconds), 0) AS audio_seconds,
+                           COALESCE(SUM(audio_bytes), 0) AS audio_bytes,
+                           SUM(transcription_chars) AS transcription_chars
+                    FROM deleted
+                    GROUP BY user_id, date
+                ), updated AS (
+                    UPDATE user_daily_stats AS s SET
+                        message_count = s.message_count - e.message_count,
+                        audio_seconds = s.audio_seconds - e.audio_seconds,
+                        audio_bytes = s.audio_bytes - e.audio_bytes,
+                        transcription_chars = s.transcription_chars - e.transcription_chars
+                    FROM expired AS e
+                    WHERE s.user_id = e.user_id AND s.date = e.date
+                )
+                SELECT COALESCE(SUM(message_count), 0) FROM expired
+            """, int(days_to_keep))
+            # Счетчик суммаризаций остается в статистике и после удаления сообщений дня
+            await conn.execute("DELETE FROM user_daily_stats WHERE message_count <= 0 AND summary_count = 0")
+        return int(deleted_count)
+    
+    async def update_transcription(self, user_id: str, message_id: int, date: str, transcription: str):
+        """Записывает транскрипцию в уже сохраненное сообщение"""
+        transcription_chars = len(transcription or '')
+        async with self.pool.acquire() as conn, conn.transaction():
+            previous = await conn.fetchval("""
+                SELECT transcription_chars FROM user_messages
+                WHERE user_id = $1 AND message_id = $2 AND date = $3
+                FOR UPDATE
+            """, user_id, message_id, date)
+            if previous is None:
+                return
+            await conn.execute("""
+                UPDATE user_messages SET transcription = $1, transcription_chars = $2
+                WHERE user_id = $3 AND message_id = $4 AND date = $5
+            """, transcription, transcription_chars, user_id, message_id, date)
+            await conn.execute(
+                self.ADD_DAILY_STATS, user_id, date, 0, 0.0, 0, transcription_chars - previous, 0
+            )
+    
+    async def enqueue_voice_job(self, job: VoiceJob) -> int:
+        """Сохраняет задание в очередь, возвращает его id"""
+        return await self.pool.fetchval("""
+            INSERT INTO voice_jobs 
+            (user_id, chat_id, message_id, file_id, processing_message_id, date, status, attempts, available_at, duration)
+            VALUES ($1, $2, $3, $4, $5, $6, 'pending', 0, $7, $8)
+            ON CONFLICT (chat_id, message_id) DO NOTHING
+            RETURNING id
+        """,
+            job.user_id,
+            job.chat_id,
+            job.message_id,
+            job.file_id,
+            job.processing_message_id,
+            job.date,
+            job.available_at or time.time(),
+            job.duration
+        )
+    
+    async def claim_voice_job(self, worker_id: str, lease_seconds: float, max_attempts: int) -> Optional[VoiceJob]:
+        """Атомарно захватывает готовое задание, не блокируясь на чужих захватах"""
+        now = time.time()
+        row = await self.pool.fetchrow(f"""
+            UPDATE voice_jobs
+            SET status = 'processing', lease_owner = $1, lease_until = $2, attempts = attempts + 1
+            WHERE id = (
+                SELECT id FROM voice_jobs
+                WHERE (status = 'pending' AND available_at <= $3)
+                   OR (status = 'processing' AND lease_until < $3 AND attempts < $4)
+                ORDER BY available_at ASC
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {self.VOICE_JOB_COLUMNS}
+        """, worker_id, now + lease_seconds, now, max_attempts)
+        return self._row_to_voice_job(row) if row else None
+    
+    async def extend_voice_job_lease(self, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Продлевает аренду задания; False, если задание уже не принадлежит воркеру"""
+        result = await self.pool.execute("""
+            UPDATE voice_jobs SET lease_until = $1
+            WHERE id = $2 AND lease_owner = $3 AND status = 'processing'
+        """, time.time() + lease_seconds, job_id, worker_id)
+        return result != 'UPDATE 0'
+    
+    async def complete_voice_job(self, job_id: int, worker_id: str) -> bool:
+        """Удаляет выполненное задание из очереди, если воркер все еще владеет им"""
+        result = await self.pool.execute(
+            "DELETE FROM voice_jobs WHERE id = $1 AND lease_owner = $2", job_id, worker_id
+        )
+        return result != 'DELETE 0'
+    
+    async def fail_voice_job(self, job_id: int, worker_id: str, error: str, max_attempts: int, retry_delay: float) -> bool:
+        """Возвращает задание в очередь с задержкой или помечает его проваленным"""
+        status = await self.pool.fetchval("""
+            UPDATE voice_jobs
+            SET status = CASE WHEN attempts >= $1 THEN 'failed' ELSE 'pending' END,
+                available_at = $2,
+                lease_owner = NULL,
+                lease_until = NULL,
+                error = $3
+            WHERE id = $4 AND lease_owner = $5
+            RETURNING status
+        """, max_attempts, time.time() + retry_delay, error, job_id, worker_id)
+        return status == 'failed'
+    
+    async def expire_voice_jobs(self, max_attempts: int) -> List[VoiceJob]:
+        """Помечает проваленными задания, чья последняя попытка прервалась вместе с процессом"""
+        rows = await self.pool.fetch(f"""
+            UPDATE voice_jobs
+            SET status = 'failed', lease_owner = NULL, lease_until = NULL,
+                error = COALESCE(error, 'lease expired')
+            WHERE status = 'processing' AND lease_until < $1 AND attempts >= $2
+            RETURNING {self.VOICE_JOB_COLUMNS}
+        """, time.time(), max_attempts)
+        return [self._row_to_voice_job(row) for row in rows]
+    
+    async def count_voice_jobs(self, user_id: Optional[str] = None) -> int:
+        """Количество заданий в очереди, ожидающих или выполняющихся (всех или одного пользователя)"""
+        return await self.pool.fetchval("""
+            SELECT COUNT(*) FROM voice_jobs
+            WHERE status IN ('pending', 'processing') AND ($1::text IS NULL OR user_id = $1)
+        """, user_id)
+    
+    async def add_stt_operation(self, operation: RecognitionOperation):
+        """Сохраняет операцию асинхронного распознавания"""
+        await self.pool.execute(f"""
+            INSERT INTO stt_operations ({self.STT_OPERATION_COLUMNS})
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            ON CONFLICT (operation_id) DO NOTHING
+        """,
+            operation.operation_id,
+            operation.user_id,
+            operation.chat_id,
+            operation.message_id,
+            operation.date,
+            operation.processing_message_id,
+            operation.polls,
+            operation.next_poll_at or time.time()
+        )
+    
+    async def claim_due_stt_operations(self, limit: int, poll_interval: float) -> List[RecognitionOperation]:
+        """Выбирает операции, которые пора опросить, не пересекаясь с другими процессами"""
+        now = time.time()
+        rows = await self.pool.fetch(f"""
+            UPDATE stt_operations
+            SET polls = polls + 1, next_poll_at = $1 + $2::double precision * LEAST(polls + 1, 6)
+            WHERE operation_id IN (
+                SELECT operation_id FROM stt_operations
+                WHERE next_poll_at <= $1
+                ORDER BY next_poll_at ASC
+                LIMIT $3
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {self.STT_OPERATION_COLUMNS}
+        """, now, poll_interval, limit)
+        return [self._row_to_stt_operation(row) for row in rows]
+    
+    async def delete_stt_operation(self, operation_id: str):
+        """Удаляет завершенную операцию"""
+        await self.pool.execute("DELETE FROM stt_operations WHERE operation_id = $1", operation_id)
@@ -0,0 +1,648 @@
+"""Хранилище сообщений в локальной базе SQLite"""
+import aiosqlite
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ...models.message_row import MessageRow
+from ...models.user_message import UserMessage
+from ...models.user_stats import UserStats
+from ...models.stt_operation import RecognitionOperation
+from ...models.voice_job import VoiceJob
+from ...utils.compression import transcription_codec
+from .base import Migration, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteBackend(StorageBackend):
+    """Бэкенд хранилища на SQLite (используется по умолчанию)"""
+    
+    MIGRATIONS = (
+        Migration(1, 'базовая схема', (
+            """
+            CREATE TABLE IF NOT EXISTS user_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                s3_key TEXT,
+                transcription TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(user_id, message_id, date)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_messages_user_date 
+            ON user_messages(user_id, date)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_messages_user_id 
+            ON user_messages(user_id)
+            """,
+            # Очередь голосовых сообщений, переживающая перезапуск бота
+            """
+            CREATE TABLE IF NOT EXISTS voice_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                file_id TEXT NOT NULL,
+                processing_message_id INTEGER,
+                date TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_until REAL,
+                error TEXT,
+                UNIQUE(chat_id, message_id)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_voice_jobs_status 
+            ON voice_jobs(status, available_at)
+            """,
+            # Операции асинхронного распознавания, ожидающие результата
+            """
+            CREATE TABLE IF NOT EXISTS stt_operations (
+                operation_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                processing_message_id INTEGER,
+                polls INTEGER NOT NULL DEFAULT 0,
+                next_poll_at REAL NOT NULL
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_stt_operations_next_poll 
+            ON stt_operations(next_poll_at)
+            """,
+        )),
+        # Выборки за день сортируются по created_at и читают transcription:
+        # индекс отдает строки в нужном порядке и покрывает выборку транскрипций.
+        # Старые индексы - его префиксы и больше не нужны.
+        Migration(2, 'покрывающий индекс сообщений за день', (
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_messages_user_date_created 
+            ON user_messages(user_id, date, created_at, transcription)
+            """,
+            "DROP INDEX IF EXISTS idx_user_messages_user_date",
+            "DROP INDEX IF EXISTS idx_user_messages_user_id",
+        )),
+        # Словари zstd для транскрипций; новые строки сжимаются последним
+        Migration(3, 'словари сжатия транскрипций', (
+            """
+            CREATE TABLE IF NOT EXISTS compression_dicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dict_id INTEGER NOT NULL UNIQUE,
+                data BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        )),
+        # Дневные агрегаты обновляются вместе с сообщениями в одной транзакции;
+        # в сообщении хранится его вклад, чтобы вычесть его при удалении.
+        # transcription_length - функция, регистрируемая в initialize (транскрипции бывают сжаты)
+        Migration(4, 'дневные агрегаты пользователей', (
+            "ALTER TABLE user_messages ADD COLUMN audio_seconds REAL",
+            "ALTER TABLE user_messages ADD COLUMN audio_bytes INTEGER",
+            "ALTER TABLE user_messages ADD COLUMN transcription_chars INTEGER NOT NULL DEFAULT 0",
+            """
+            UPDATE user_messages SET transcription_chars = transcription_length(transcription)
+            WHERE transcription IS NOT NULL
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_daily_stats (
+                user_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                audio_seconds REAL NOT NULL DEFAULT 0,
+                audio_bytes INTEGER NOT NULL DEFAULT 0,
+                transcription_chars INTEGER NOT NULL DEFAULT 0,
+                summary_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, date)
+            ) WITHOUT ROWID
+            """,
+            """
+            INSERT INTO user_daily_stats (user_id, date, message_count, audio_seconds, audio_bytes, transcription_chars)
+            SELECT user_id, date, COUNT(*), 0, 0, SUM(transcription_chars)
+            FROM user_messages
+            GROUP BY user_id, date
+            """,
+        )),
+        Migration(5, 'кодек и размер архивной копии', (
+            "ALTER TABLE user_messages ADD COLUMN archive_codec TEXT",
+            "ALTER TABLE user_messages ADD COLUMN archive_bytes INTEGER",
+        )),
+        Migration(6, 'длительность записи в задании очереди', (
+            "ALTER TABLE voice_jobs ADD COLUMN duration REAL",
+        )),
+    )
+    
+    # Частые запросы; их планы проверяет python -m src.utils.query_plans
+    SELECT_MESSAGES_BY_DATE = f"""
+        SELECT {StorageBackend.MESSAGE_COLUMNS}
+        FROM user_messages 
+        WHERE user_id = ? AND date = ?
+        ORDER BY created_at ASC
+    """
+    
+    SELECT_TRANSCRIPTIONS_BY_DATE = """
+        SELECT transcription
+        FROM user_messages 
+        WHERE user_id = ? AND date = ? AND transcription IS NOT NULL
+        ORDER BY created_at ASC
+    """
+    
+    HAS_MESSAGES_BY_DATE = """
+        SELECT message_count
+        FROM user_daily_stats
+        WHERE user_id = ? AND date = ?
+    """
+    
+    SELECT_DAILY_STATS_RANGE = """
+        SELECT COUNT(*), SUM(message_count), SUM(audio_seconds), SUM(audio_bytes),
+               SUM(transcription_chars), SUM(summary_count)
+        FROM user_daily_stats
+        WHERE user_id = ? AND date BETWEEN ? AND ?
+    """
+    
+    SELECT_MESSAGES_BY_DATE_RANGE = f"""
+        SELECT {StorageBackend.MESSAGE_COLUMNS}
+        FROM user_messages 
+        WHERE user_id = ? AND date BETWEEN ? AND ?
+        ORDER BY date ASC, created_at ASC
+    """
+    
+    CLAIM_VOICE_JOB = f"""
+        UPDATE voice_jobs
+        SET status = 'processing', lease_owner = ?, lease_until = ?, attempts = attempts + 1
+        WHERE id = (
+            SELECT id FROM voice_jobs
+            WHERE (status = 'pending' AND available_at <= ?)
+               OR (status = 'processing' AND lease_until < ? AND attempts < ?)
+            ORDER BY available_at ASC
+            LIMIT 1
+        )
+        RETURNING {StorageBackend.VOICE_JOB_COLUMNS}
+    """
+    
+    CLAIM_DUE_STT_OPERATIONS = f"""
+        UPDATE stt_operations
+        SET polls = polls + 1, next_poll_at = ? + ? * MIN(polls + 1, 6)
+        WHERE operation_id IN (
+            SELECT operation_id FROM stt_operations
+            WHERE next_poll_at <= ?
+            ORDER BY next_poll_at ASC
+            LIMIT ?
+        )
+        RETURNING {StorageBackend.STT_OPERATION_COLUMNS}
+    """
+    
+    # Прибавляет к агрегатам дня разницу; отрицательная - при удалении и перезаписи
+    ADD_DAILY_STATS = """
+        INSERT INTO user_daily_stats
+        (user_id, date, message_count, audio_seconds, audio_bytes, transcription_chars, summary_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, date) DO UPDATE SET
+            message_count = message_count + excluded.message_count,
+            audio_seconds = audio_seconds + excluded.audio_seconds,
+            audio_bytes = audio_bytes + excluded.audio_bytes,
+            transcription_chars = transcription_chars + excluded.transcription_chars,
+            summary_count = summary_count + excluded.summary_count
+    """
+    
+    def __init__(self, db_path: str = "summary_bot.db"):
+        self.db_path = db_path
+    
+    async def initialize(self):
+        """Применяет недостающие миграции схемы (версия хранится в PRAGMA user_version)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            # Словари нужны уже миграциям, читающим сжатые транскрипции
+            cursor = await db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'compression_dicts'"
+            )
+            if await cursor.fetchone():
+                await self._load_dictionaries(db)
+            transcription_codec.set_loader(self._read_dictionaries)
+            await db.create_function('transcription_length', 1, self._transcription_length, deterministic=True)
+            
+            for migration in self.MIGRATIONS:
+                # Блокировка записи на время шага: другой процесс бота дождется
+                # ее и увидит уже примененную миграцию
+                await db.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor = await db.execute("PRAGMA user_version")
+                    if (await cursor.fetchone())[0] >= migration.version:
+                        await db.rollback()
+                        continue
+                    
+                    logger.info(f"Миграция SQLite {migration.version}: {migration.description}")
+                    for statement in migration.statements:
+                        await db.execute(statement)
+                    await db.execute(f"PRAGMA user_version = {migration.version:d}")
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+    
+    @staticmethod
+    async def _load_dictionaries(db):
+        cursor = await db.execute("SELECT data FROM compression_dicts ORDER BY id ASC")
+        for (data,) in await cursor.fetchall():
+            transcription_codec.add_dictionary(data)
+    
+    def _read_dictionaries(self) -> List[bytes]:
+        """Синхронное чтение словарей для TranscriptionCodec
+
+        Вызывается из распаковки (в том числе в потоке aiosqlite), поэтому
+        открывает отдельное соединение sqlite3. Происходит один раз на словарь,
+        обученный другим процессом.
+        """
+        with closing(sqlite3.connect(self.db_path)) as db:
+            try:
+                rows = db.execute("SELECT data FROM compression_dicts ORDER BY id ASC").fetchall()
+            except sqlite3.OperationalError:
+                return []
+        return [data for (data,) in rows]
+    
+    @staticmethod
+    def _transcription_length(value) -> int:
+        """Число символов в транскрипции, сохраненной как текст или zstd фрейм"""
+        return len(transcription_codec.decompress(value) or '')
+    
+    async def add_user_message(self, message: UserMessage) -> int:
+        """Добавляет сообщение пользователя в базу данных"""
+        audio_seconds, audio_bytes, transcription_chars = self._message_totals(message)
+        async with aiosqlite.connect(self.db_path) as db:
+            # Блокировка записи сразу: старая версия строки и агрегаты читаются согласованно
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = await db.execute("""
+                    SELECT audio_seconds, audio_bytes, transcription_chars
+                    FROM user_messages
+                    WHERE user_id = ? AND message_id = ? AND date = ?
+                """, (message.user_id, message.message_id, message.date))
+                previous = await cursor.fetchone()
+                
+                cursor = await db.execute("""
+                    INSERT OR REPLACE INTO user_messages 
+                    (user_id, message_id, date, timestamp, s3_key, transcription, created_at,
+                     audio_seconds, audio_bytes, transcription_chars, archive_codec, archive_bytes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    message.user_id,
+                    message.message_id,
+                    message.date,
+                    message.timestamp,
+                    message.s3_key,
+                    transcription_codec.compress(message.transcription),
+                    message.created_at.isoformat() if message.created_at else None,
+                    message.audio_seconds,
+                    message.audio_bytes,
+                    transcription_chars,
+                    message.archive_codec,
+                    message.archive_bytes
+                ))
+                row_id = cursor.lastrowid
+                
+                # Перезапись сообщения заменяет его прежний вклад
+                if previous is None:
+                    delta = (1, audio_seconds, audio_bytes, transcription_chars)
+                else:
+                    delta = (
+                        0,
+                        audio_seconds - (previous[0] or 0.0),
+                        audio_bytes - (previous[1] or 0),
+                        transcription_chars - previous[2]
+                    )
+                await db.execute(self.ADD_DAILY_STATS, (message.user_id, message.date, *delta, 0))
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+            return row_id
+    
+    async def get_user_messages(self, user_id: str, date: str) -> List[MessageRow]:
+        """Получает сообщения пользователя за определенную дату"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(self.SELECT_MESSAGES_BY_DATE, (user_id, date))
+            
+            rows = await cursor.fetchall()
+            return [self._row_to_message(row) for row in rows]
+    
+    async def get_user_transcriptions(self, user_id: str, date: str) -> List[str]:
+        """Получает транскрипции пользователя за определенную дату"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(self.SELECT_TRANSCRIPTIONS_BY_DATE, (user_id, date))
+            
+            rows = await cursor.fetchall()
+            return [transcription_codec.decompress(row[0]) for row in rows]
+    
+    async def has_user_messages(self, user_id: str, date: str) -> bool:
+        """Проверяет, есть ли у пользователя сообщения за определенную дату"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(self.HAS_MESSAGES_BY_DATE, (user_id, date))
+            
+            row = await cursor.fetchone()
+            return row is not None and row[0] > 0
+    
+    async def record_summary(self, user_id: str, date: str):
+        """Учитывает построенную суммаризацию в дневных агрегатах"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(self.ADD_DAILY_STATS, (user_id, date, 0, 0.0, 0, 0, 1))
+            await db.commit()
+    
+    async def get_user_stats(self, user_id: str, start_date: str, end_date: str) -> UserStats:
+        """Суммирует дневные агрегаты пользователя за диапазон дат"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(self.SELECT_DAILY_STATS_RANGE, (user_id, start_date, end_date))
+            return self._row_to_stats(await cursor.fetchone())
+    
+    async def get_user_messages_by_date_range(self, user_id: str, start_date: str, end_date: str) -> List[MessageRow]:
+        """Получает сообщения пользователя за диапазон дат"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(self.SELECT_MESSAGES_BY_DATE_RANGE, (user_id, start_date, end_date))
+            
+            rows = await cursor.fetchall()
+            return [self._row_to_message(row) for row in rows]
+    
+    async def fetch_message_columns(
+        self,
+        user_id: str,
+        start_date: str,
+        end_date: str,
+        columns: Sequence[str]
+    ) -> Dict[str, tuple]:
+        """Только запрошенные колонки сообщений за диапазон дат, по колонке на ключ"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(f"""
+                SELECT {self._select_list(columns)}
+                FROM user_messages 
+                WHERE user_id = ? AND date BETWEEN ? AND ?
+                ORDER BY date ASC, created_at ASC
+            """, (user_id, start_date, end_date))
+            
+            return self._rows_to_columns(columns, await cursor.fetchall())
+    
+    async def get_messages_page(
+        self,
+        start_date: str,
+        end_date: str,
+        after_id: int = 0,
+        limit: int = 500,
+        user_id: Optional[str] = None
+    ) -> List[MessageRow]:
+        """Сообщения всех пользователей (или одного) за диапазон дат с id больше after_id по возрастанию id"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(f"""
+                SELECT {self.MESSAGE_COLUMNS}
+                FROM user_messages
+                WHERE id > ? AND date BETWEEN ? AND ? AND (? IS NULL OR user_id = ?)
+                ORDER BY id ASC
+                LIMIT ?
+            """, (after_id, start_date, end_date, user_id, user_id, limit))
+            
+            rows = await cursor.fetchall()
+            return [self._row_to_message(row) for row in rows]
+    
+    async def delete_old_messages(self, days_to_keep: int = 30) -> int:
+        """Удаляет старые сообщения (старше указанного количества дней)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = await db.execute("SELECT datetime('now', ?)", (f'-{int(days_to_keep)} days',))
+                cutoff = (await cursor.fetchone())[0]
+                
+                # Вычитаем вклад удаляемых сообщений из агрегатов их дней
+                cursor = await db.execute("""
+                    SELECT user_id, date, -COUNT(*), -COALESCE(SUM(audio_seconds), 0),
+                           -COALESCE(SUM(audio_bytes), 0), -SUM(transcription_chars), 0
+                    FROM user_messages
+                    WHERE created_at < ?
+                    GROUP BY user_id, date
+                """, (cutoff,))
+                await db.executemany(self.ADD_DAILY_STATS, await cursor.fetchall())
+                
+                cursor = await db.execute("DELETE FROM user_messages WHERE created_at < ?", (cutoff,))
+                deleted_count = cursor.rowcount
+                # Счетчик суммаризаций остается в статистике и после удаления сообщений дня
+                await db.execute("DELETE FROM user_daily_stats WHERE message_count <= 0 AND summary_count = 0")
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+            return deleted_count
+    
+    async def update_transcription(self, user_id: str, message_id: int, date: str, transcription: str):
+        """Записывает транскрипцию в уже сохраненное сообщение"""
+        transcription_chars = len(transcription or '')
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = await db.execute("""
+                    SELECT transcription_chars FROM user_messages
+                    WHERE user_id = ? AND message_id = ? AND date = ?
+                """, (user_id, message_id, date))
+                row = await cursor.fetchone()
+                if row is not None:
+                    await db.execute("""
+                        UPDATE user_messages SET transcription = ?, transcription_chars = ?
+                        WHERE user_id = ? AND message_id = ? AND date = ?
+                    """, (transcription_codec.compress(transcription), transcription_chars, user_id, message_id, date))
+                    await db.execute(
+                        self.ADD_DAILY_STATS, (user_id, date, 0, 0.0, 0, transcription_chars - row[0], 0)
+                    )
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+    
+    async def enqueue_voice_job(self, job: VoiceJob) -> int:
+        """Сохраняет задание в очередь, возвращает его id"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                INSERT OR IGNORE INTO voice_jobs 
+                (user_id, chat_id, message_id, file_id, processing_message_id, date, status, attempts, available_at, duration)
+                VALUES (?, ?, ?, ?, ?, ?, 'pending', 0, ?, ?)
+            """, (
+                job.user_id,
+                job.chat_id,
+                job.message_id,
+                job.file_id,
+                job.processing_message_id,
+                job.date,
+                job.available_at or time.time(),
+                job.duration
+            ))
+            await db.commit()
+            return cursor.lastrowid
+    
+    async def claim_voice_job(self, worker_id: str, lease_seconds: float, max_attempts: int) -> Optional[VoiceJob]:
+        """Атомарно захватывает готовое задание (новое или с истекшей арендой)"""
+        now = time.time()
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                self.CLAIM_VOICE_JOB, (worker_id, now + lease_seconds, now, now, max_attempts)
+            )
+            row = await cursor.fetchone()
+            await db.commit()
+            return self._row_to_voice_job(row) if row else None
+    
+    async def extend_voice_job_lease(self, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Продлевает аренду задания; False, если задание уже не принадлежит воркеру"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                UPDATE voice_jobs SET lease_until = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'processing'
+            """, (time.time() + lease_seconds, job_id, worker_id))
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def complete_voice_job(self, job_id: int, worker_id: str) -> bool:
+        """Удаляет выполненное задание из очереди, если воркер все еще владеет им"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "DELETE FROM voice_jobs WHERE id = ? AND lease_owner = ?", (job_id, worker_id)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def fail_voice_job(self, job_id: int, worker_id: str, error: str, max_attempts: int, retry_delay: float) -> bool:
+        """Возвращает задание в очередь с задержкой или помечает его проваленным"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                UPDATE voice_jobs
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    available_at = ?,
+                    lease_owner = NULL,
+                    lease_until = NULL,
+                    error = ?
+                WHERE id = ? AND lease_owner = ?
+                RETURNING status
+            """, (max_attempts, time.time() + retry_delay, error, job_id, worker_id))
+            row = await cursor.fetchone()
+            await db.commit()
+            return row is not None and row[0] == 'failed'
+    
+    async def expire_voice_jobs(self, max_attempts: int) -> List[VoiceJob]:
+        """Помечает проваленными задания, чья последняя попытка прервалась вместе с процессом"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(f"""
+                UPDATE voice_jobs
+                SET status = 'failed', lease_owner = NULL, lease_until = NULL,
+                    error = COALESCE(error, 'lease expired')
+                WHERE status = 'processing' AND lease_until < ? AND attempts >= ?
+                RETURNING {self.VOICE_JOB_COLUMNS}
+            """, (time.time(), max_attempts))
+            rows = await cursor.fetchall()
+            await db.commit()
+            return [self._row_to_voice_job(row) for row in rows]
+    
+    async def count_voice_jobs(self, user_id: Optional[str] = None) -> int:
+        """Количество заданий в очереди, ожидающих или выполняющихся (всех или одного пользователя)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT COUNT(*) FROM voice_jobs
+                WHERE status IN ('pending', 'processing') AND (? IS NULL OR user_id = ?)
+            """, (user_id, user_id))
+            row = await cursor.fetchone()
+            return row[0]
+    
+    async def add_stt_operation(self, operation: RecognitionOperation):
+        """Сохраняет операцию асинхронного распознавания"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(f"""
+                INSERT OR REPLACE INTO stt_operations ({self.STT_OPERATION_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                operation.operation_id,
+                operation.user_id,
+                operation.chat_id,
+                operation.message_id,
+                operation.date,
+                operation.processing_message_id,
+                operation.polls,
+                operation.next_poll_at or time.time()
+            ))
+            await db.commit()
+    
+    async def claim_due_stt_operations(self, limit: int, poll_interval: float) -> List[RecognitionOperation]:
+        """Выбирает операции, которые пора опросить, и откладывает их следующий опрос"""
+        now = time.time()
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(self.CLAIM_DUE_STT_OPERATIONS, (now, poll_interval, now, limit))
+            rows = await cursor.fetchall()
+            await db.commit()
+            return [self._row_to_stt_operation(row) for row in rows]
+    
+    async def delete_stt_operation(self, operation_id: str):
+        """Удаляет завершенную операцию"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM stt_operations WHERE operation_id = ?", (operation_id,))
+            await db.commit()
+    
+    async def add_compression_dictionary(self, data: bytes) -> int:
+        """Сохраняет словарь сжатия транскрипций и делает его текущим"""
+        dict_id = transcription_codec.add_dictionary(data)
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                INSERT OR IGNORE INTO compression_dicts (dict_id, data) VALUES (?, ?)
+            """, (dict_id, data))
+            await db.commit()
+        return dict_id
+    
+    async def get_all_transcriptions(self, limit: int = 100000) -> List[str]:
+        """Последние транскрипции всех пользователей (выборка для обучения словаря)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT transcription FROM user_messages
+                WHERE transcription IS NOT NULL
+                ORDER BY id DESC
+                LIMIT ?
+            """, (limit,))
+            rows = await cursor.fetchall()
+            return [transcription_codec.decompress(row[0]) for row in rows]
+    
+    async def recompress_transcriptions(self, batch_size: int = 1000) -> Tuple[int, int, int]:
+        """Пересжимает все транскрипции текущим словарем
+
+        Возвращает размер транскрипций до и после в байтах и число измененных строк.
+        """
+        before = after = changed = 0
+        last_id = 0
+        async with aiosqlite.connect(self.db_path) as db:
+            while True:
+                cursor = await db.execute("""
+                    SELECT id, transcription FROM user_messages
+                    WHERE id > ? AND transcription IS NOT NULL
+                    ORDER BY id ASC
+                    LIMIT ?
+                """, (last_id, batch_size))
+                rows = await cursor.fetchall()
+                if not rows:
+                    break
+                
+                updates = []
+                for row_id, stored in rows:
+                    recompressed = transcription_codec.compress(transcription_codec.decompress(stored))
+                    before += self._stored_size(stored)
+                    after += self._stored_size(recompressed)
+                    if recompressed != stored:
+                        updates.append((recompressed, row_id))
+                
+                await db.executemany("UPDATE user_messages SET transcription = ? WHERE id = ?", updates)
+                await db.commit()
+                changed += len(updates)
+                last_id = rows[-1][0]
+        return before, after, changed
+    
+    @staticmethod
+    def _stored_size(value) -> int:
+        return len(value.encode('utf-8')) if isinstance(value, str) else len(value)
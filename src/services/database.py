@@ -1,184 +1,179 @@
 """Сервис для работы с базой данных"""
-import aiosqlite
 import logging
-from datetime import datetime
-from typing import List, Optional
-from pathlib import Path
+from typing import Dict, List, Optional, Sequence
 
+from ..config.settings import DATABASE_URL
+from ..models.message_row import MessageRow
 from ..models.user_message import UserMessage
+from ..models.user_stats import UserStats
+from ..models.stt_operation import RecognitionOperation
+from ..models.voice_job import VoiceJob
+from ..utils.tracing import trace_span
+from .backends import StorageBackend, SQLiteBackend, create_backend
 
 logger = logging.getLogger(__name__)
 
 
 class DatabaseService:
-    """Сервис для работы с базой данных SQLite"""
+    """Сервис для работы с базой данных через подключаемый бэкенд хранилища"""
     
-    def __init__(self, db_path: str = "summary_bot.db"):
+    def __init__(self, db_path: str = "summary_bot.db", backend: Optional[StorageBackend] = None):
         self.db_path = db_path
+        self.backend = backend if backend is not None else SQLiteBackend(db_path)
         self._initialized = False
     
+    @property
+    def is_initialized(self) -> bool:
+        """Инициализирована ли база данных"""
+        return self._initialized
+    
     async def initialize(self):
         """Инициализация базы данных и создание таблиц"""
         if self._initialized:
             return
-            
-        async with aiosqlite.connect(self.db_path) as db:
-            # Создаем таблицу для сообщений пользователей
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS user_messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    message_id INTEGER NOT NULL,
-                    date TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    s3_key TEXT,
-                    transcription TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user_id, message_id, date)
-                )
-            """)
-            
-            # Создаем индексы для быстрого поиска
-            await db.execute("""
-                CREATE INDEX IF NOT EXISTS idx_user_messages_user_date 
-                ON user_messages(user_id, date)
-            """)
-            
-            await db.execute("""
-                CREATE INDEX IF NOT EXISTS idx_user_messages_user_id 
-                ON user_messages(user_id)
-            """)
-            
-            await db.commit()
+        
+        await self.backend.initialize()
         
         self._initialized = True
-        logger.info("База данных инициализирована")
+        logger.info(f"База данных инициализирована ({type(self.backend).__name__})")
+    
+    async def close(self):
+        """Закрывает подключения бэкенда"""
+        await self.backend.close()
+        self._initialized = False
     
+    @trace_span('db.add_user_message')
     async def add_user_message(self, message: UserMessage) -> int:
         """Добавляет сообщение пользователя в базу данных"""
         await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                INSERT OR REPLACE INTO user_messages 
-                (user_id, message_id, date, timestamp, s3_key, transcription, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                message.user_id,
-                message.message_id,
-                message.date,
-                message.timestamp,
-                message.s3_key,
-                message.transcription,
-                message.created_at.isoformat() if message.created_at else None
-            ))
-            await db.commit()
-            return cursor.lastrowid
-    
-    async def get_user_messages(self, user_id: str, date: str) -> List[UserMessage]:
+        return await self.backend.add_user_message(message)
+    
+    @trace_span('db.get_user_messages')
+    async def get_user_messages(self, user_id: str, date: str) -> List[MessageRow]:
         """Получает сообщения пользователя за определенную дату"""
         await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT id, user_id, message_id, date, timestamp, s3_key, transcription, created_at
-                FROM user_messages 
-                WHERE user_id = ? AND date = ?
-                ORDER BY created_at ASC
-            """, (user_id, date))
-            
-            rows = await cursor.fetchall()
-            messages = []
-            
-            for row in rows:
-                message = UserMessage(
-                    id=row[0],
-                    user_id=row[1],
-                    message_id=row[2],
-                    date=row[3],
-                    timestamp=row[4],
-                    s3_key=row[5],
-                    transcription=row[6],
-                    created_at=datetime.fromisoformat(row[7]) if row[7] else None
-                )
-                messages.append(message)
-            
-            return messages
+        return await self.backend.get_user_messages(user_id, date)
     
+    @trace_span('db.get_user_transcriptions')
     async def get_user_transcriptions(self, user_id: str, date: str) -> List[str]:
         """Получает транскрипции пользователя за определенную дату"""
         await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT transcription
-                FROM user_messages 
-                WHERE user_id = ? AND date = ? AND transcription IS NOT NULL
-                ORDER BY created_at ASC
-            """, (user_id, date))
-            
-            rows = await cursor.fetchall()
-            return [row[0] for row in rows]
+        return await self.backend.get_user_transcriptions(user_id, date)
     
+    @trace_span('db.has_user_messages')
     async def has_user_messages(self, user_id: str, date: str) -> bool:
         """Проверяет, есть ли у пользователя сообщения за определенную дату"""
         await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT COUNT(*) 
-                FROM user_messages 
-                WHERE user_id = ? AND date = ?
-            """, (user_id, date))
-            
-            count = await cursor.fetchone()
-            return count[0] > 0
-    
-    async def get_user_messages_by_date_range(self, user_id: str, start_date: str, end_date: str) -> List[UserMessage]:
+        return await self.backend.has_user_messages(user_id, date)
+    
+    async def record_summary(self, user_id: str, date: str):
+        """Учитывает построенную суммаризацию в дневных агрегатах"""
+        await self.initialize()
+        await self.backend.record_summary(user_id, date)
+    
+    @trace_span('db.get_user_stats')
+    async def get_user_stats(self, user_id: str, start_date: str, end_date: str) -> UserStats:
+        """Статистика пользователя за диапазон дат (только по дневным агрегатам)"""
+        await self.initialize()
+        return await self.backend.get_user_stats(user_id, start_date, end_date)
+    
+    @trace_span('db.get_user_messages_by_date_range')
+    async def get_user_messages_by_date_range(self, user_id: str, start_date: str, end_date: str) -> List[MessageRow]:
         """Получает сообщения пользователя за диапазон дат"""
         await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT id, user_id, message_id, date, timestamp, s3_key, transcription, created_at
-                FROM user_messages 
-                WHERE user_id = ? AND date BETWEEN ? AND ?
-                ORDER BY created_at ASC
-            """, (user_id, start_date, end_date))
-            
-            rows = await cursor.fetchall()
-            messages = []
-            
-            for row in rows:
-                message = UserMessage(
-                    id=row[0],
-                    user_id=row[1],
-                    message_id=row[2],
-                    date=row[3],
-                    timestamp=row[4],
-                    s3_key=row[5],
-                    transcription=row[6],
-                    created_at=datetime.fromisoformat(row[7]) if row[7] else None
-                )
-                messages.append(message)
-            
-            return messages
+        return await self.backend.get_user_messages_by_date_range(user_id, start_date, end_date)
+    
+    @trace_span('db.fetch_message_columns')
+    async def fetch_message_columns(
+        self,
+        user_id: str,
+        start_date: str,
+        end_date: str,
+        columns: Sequence[str]
+    ) -> Dict[str, tuple]:
+        """Только запрошенные колонки сообщений пользователя за диапазон дат (по колонке на ключ)"""
+        await self.initialize()
+        return await self.backend.fetch_message_columns(user_id, start_date, end_date, columns)
     
+    async def get_messages_page(
+        self,
+        start_date: str,
+        end_date: str,
+        after_id: int = 0,
+        limit: int = 500,
+        user_id: Optional[str] = None
+    ) -> List[MessageRow]:
+        """Страница сообщений за диапазон дат для пакетной обработки (по возрастанию id)"""
+        await self.initialize()
+        return await self.backend.get_messages_page(start_date, end_date, after_id, limit, user_id)
+    
+    @trace_span('db.delete_old_messages')
     async def delete_old_messages(self, days_to_keep: int = 30):
         """Удаляет старые сообщения (старше указанного количества дней)"""
         await self.initialize()
         
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                DELETE FROM user_messages 
-                WHERE created_at < datetime('now', '-{} days')
-            """.format(days_to_keep))
-            
-            deleted_count = cursor.rowcount
-            await db.commit()
-            logger.info(f"Удалено {deleted_count} старых сообщений")
-            return deleted_count
+        deleted_count = await self.backend.delete_old_messages(days_to_keep)
+        logger.info(f"Удалено {deleted_count} старых сообщений")
+        return deleted_count
+
+    
+    @trace_span('db.update_transcription')
+    async def update_transcription(self, user_id: str, message_id: int, date: str, transcription: str):
+        """Записывает транскрипцию в уже сохраненное сообщение"""
+        await self.initialize()
+        await self.backend.update_transcription(user_id, message_id, date, transcription)
+    
+    async def enqueue_voice_job(self, job: VoiceJob) -> int:
+        """Сохраняет задание на обработку голосового сообщения"""
+        await self.initialize()
+        return await self.backend.enqueue_voice_job(job)
+    
+    async def claim_voice_job(self, worker_id: str, lease_seconds: float, max_attempts: int) -> Optional[VoiceJob]:
+        """Захватывает задание из очереди"""
+        await self.initialize()
+        return await self.backend.claim_voice_job(worker_id, lease_seconds, max_attempts)
+    
+    async def extend_voice_job_lease(self, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Продлевает аренду выполняющегося задания"""
+        await self.initialize()
+        return await self.backend.extend_voice_job_lease(job_id, worker_id, lease_seconds)
+    
+    async def complete_voice_job(self, job_id: int, worker_id: str) -> bool:
+        """Отмечает задание выполненным"""
+        await self.initialize()
+        return await self.backend.complete_voice_job(job_id, worker_id)
+    
+    async def fail_voice_job(self, job_id: int, worker_id: str, error: str, max_attempts: int, retry_delay: float) -> bool:
+        """Отмечает неудачную попытку выполнения задания"""
+        await self.initialize()
+        return await self.backend.fail_voice_job(job_id, worker_id, error, max_attempts, retry_delay)
+    
+    async def expire_voice_jobs(self, max_attempts: int) -> List[VoiceJob]:
+        """Проваливает задания с исчерпанными попытками и истекшей арендой"""
+        await self.initialize()
+        return await self.backend.expire_voice_jobs(max_attempts)
+    
+    async def count_voice_jobs(self, user_id: Optional[str] = None) -> int:
+        """Глубина очереди голосовых сообщений (всей или одного пользователя)"""
+        await self.initialize()
+        return await self.backend.count_voice_jobs(user_id)
+
+    
+    async def add_stt_operation(self, operation: RecognitionOperation):
+        """Сохраняет операцию асинхронного распознавания"""
+        await self.initialize()
+        await self.backend.add_stt_operation(operation)
+    
+    async def claim_due_stt_operations(self, limit: int, poll_interval: float) -> List[RecognitionOperation]:
+        """Выбирает операции распознавания, которые пора опросить"""
+        await self.initialize()
+        return await self.backend.claim_due_stt_operations(limit, poll_interval)
+    
+    async def delete_stt_operation(self, operation_id: str):
+        """Удаляет завершенную операцию распознавания"""
+        await self.initialize()
+        await self.backend.delete_stt_operation(operation_id)
 
 
 # Глобальный экземпляр сервиса базы данных
-db_service = DatabaseService()
+db_service = DatabaseService(backend=create_backend(DATABASE_URL))
@@ -0,0 +1,113 @@
+"""Сервис проверки живости и готовности бота"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HealthService:
+    """Отслеживает этапы запуска и отдает состояние по HTTP"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.ready_at: Optional[float] = None
+        self._checks: Dict[str, Callable[[], bool]] = {}
+        self._info: Dict[str, Callable[[], Any]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def add_check(self, name: str, check: Callable[[], bool]):
+        """Регистрирует проверку, от которой зависит готовность"""
+        self._checks[name] = check
+
+    def add_info(self, name: str, provider: Callable[[], Any]):
+        """Регистрирует дополнительные сведения для отчета (не влияют на готовность)"""
+        self._info[name] = provider
+
+    def mark_ready(self):
+        """Отмечает окончание запуска"""
+        self.ready_at = time.perf_counter()
+        logger.info(f"Бот готов к работе через {self.startup_seconds:.3f} с после запуска")
+
+    @property
+    def startup_seconds(self) -> Optional[float]:
+        """Время от запуска процесса до готовности"""
+        if self.ready_at is None:
+            return None
+        return self.ready_at - self.started_at
+
+    def is_ready(self) -> bool:
+        """Готов ли бот обрабатывать обновления"""
+        return self.ready_at is not None and all(self._safe_check(check) for check in self._checks.values())
+
+    @staticmethod
+    def _safe_check(check: Callable[[], bool]) -> bool:
+        try:
+            return bool(check())
+        except Exception as e:
+            logger.error(f"Ошибка проверки готовности: {e}")
+            return False
+
+    def report(self) -> Dict[str, Any]:
+        """Состояние для эндпоинтов /health и /ready"""
+        info = {}
+        for name, provider in self._info.items():
+            try:
+                info[name] = provider()
+            except Exception as e:
+                info[name] = f"error: {e}"
+        return {
+            'ready': self.is_ready(),
+            'startup_seconds': round(self.startup_seconds, 3) if self.startup_seconds is not None else None,
+            'uptime_seconds': round(time.perf_counter() - self.started_at, 3),
+            'checks': {name: self._safe_check(check) for name, check in self._checks.items()},
+            **info
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Минимальный HTTP обработчик для /health и /ready"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            parts = request_line.decode('latin-1').split()
+            path = parts[1] if len(parts) > 1 else '/'
+
+            if path == '/health':
+                status = 200
+            elif path == '/ready':
+                status = 200 if self.is_ready() else 503
+            else:
+                status = 404
+
+            body = json.dumps(self.report(), ensure_ascii=False).encode('utf-8')
+            reason = {200: 'OK', 404: 'Not Found', 503: 'Service Unavailable'}[status]
+            writer.write(
+                f"HTTP/1.1 {status} {reason}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.error(f"Ошибка обработки запроса проверки готовности: {e}")
+        finally:
+            writer.close()
+
+    async def start_server(self, port: int, host: str = '0.0.0.0'):
+        """Запускает HTTP эндпоинт проверки готовности"""
+        if self._server is not None or not port:
+            return
+        self._server = await asyncio.start_server(self._handle, host, port)
+        logger.info(f"Эндпоинты /health и /ready доступны на порту {port}")
+
+    async def stop_server(self):
+        """Останавливает HTTP эндпоинт"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+# Глобальный экземпляр сервиса проверки готовности
+health_service = HealthService()
@@ -0,0 +1,26 @@
+"""Общая HTTP сессия для обращений к Yandex Cloud API"""
+import threading
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_http_session():
+    """Возвращает HTTP сессию, создавая ее при первом обращении
+
+    requests импортируется лениво, чтобы не замедлять запуск бота, а общая
+    сессия переиспользует соединения между запросами к STT и GPT.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests
+                
+                _session = requests.Session()
+    return _session
+
+
+def is_http_session_initialized() -> bool:
+    """Создана ли уже HTTP сессия"""
+    return _session is not None
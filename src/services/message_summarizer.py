@@ -1,10 +1,12 @@
 """Сервис для суммаризации сообщений"""
+import asyncio
 import logging
-import requests
 from typing import List
 
 from ..config.settings import YANDEX_API_KEY, YANDEX_FOLDER_ID, YANDEX_GPT_URL
 from ..config.messages import SUMMARIZATION_PROMPT, GPT_ERROR, SUMMARIZATION_ERROR
+from ..utils.tracing import trace_span
+from .http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +15,12 @@ class MessageSummarizer:
     """Класс для суммаризации сообщений через Yandex GPT"""
     
     @staticmethod
+    def is_error(summary: str) -> bool:
+        """Вместо суммаризации вернулось сообщение об ошибке"""
+        return summary in (GPT_ERROR, SUMMARIZATION_ERROR)
+    
+    @staticmethod
+    @trace_span('gpt.summarize')
     async def summarize_messages(messages: List[str]) -> str:
         """Создает суммаризацию сообщений через Yandex GPT HTTP API"""
         try:
@@ -53,7 +61,10 @@ class MessageSummarizer:
             }
             
             # Выполняем HTTP запрос
-            response = requests.post(YANDEX_GPT_URL, headers=headers, json=data)
+            # requests блокирующий, поэтому запрос выполняется вне event loop
+            response = await asyncio.to_thread(
+                get_http_session().post, YANDEX_GPT_URL, headers=headers, json=data
+            )
             response.raise_for_status()
             
             # Извлекаем текст из ответа
@@ -1,6 +1,6 @@
 """Сервис для загрузки файлов в S3"""
+import asyncio
 import logging
-import boto3
 from datetime import date
 from typing import Optional
 
@@ -8,9 +8,11 @@ from ..config.settings import (
     AWS_ACCESS_KEY_ID, 
     AWS_SECRET_ACCESS_KEY, 
     AWS_REGION, 
-    S3_BUCKET_NAME
+    S3_BUCKET_NAME,
+    S3_ENDPOINT_URL
 )
 from ..config.messages import S3_ERROR
+from ..utils.tracing import trace_span
 
 logger = logging.getLogger(__name__)
 
@@ -19,25 +21,47 @@ class S3Uploader:
     """Класс для загрузки файлов в S3"""
     
     def __init__(self):
-        """Инициализация S3 клиента"""
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_REGION,
-            endpoint_url='https://storage.yandexcloud.net'
-        )
+        """Клиент S3 создается при первом обращении"""
+        self._s3_client = None
     
+    @property
+    def s3_client(self):
+        """Ленивая инициализация S3 клиента (boto3 импортируется только здесь)"""
+        if self._s3_client is None:
+            import boto3
+            
+            self._s3_client = boto3.client(
+                's3',
+                aws_access_key_id=AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                region_name=AWS_REGION,
+                endpoint_url=S3_ENDPOINT_URL
+            )
+        return self._s3_client
+    
+    @property
+    def is_initialized(self) -> bool:
+        """Создан ли уже S3 клиент"""
+        return self._s3_client is not None
+    
+    @staticmethod
+    def object_uri(key: str) -> str:
+        """HTTPS адрес объекта в бакете (используется SpeechKit для чтения файла)"""
+        return f"{S3_ENDPOINT_URL.rstrip('/')}/{S3_BUCKET_NAME}/{key}"
+    
+    @trace_span('s3.upload')
     async def upload_voice_file(self, audio_data: bytes, user_id: int, message_id: int) -> str:
         """Загружает голосовое сообщение в S3"""
         try:
             today = date.today().strftime('%Y-%m-%d')
             key = f"voice_messages/{user_id}/{today}/{message_id}.ogg"
             
-            self.s3_client.put_object(
+            # boto3 блокирующий, поэтому загрузка выполняется вне event loop
+            await asyncio.to_thread(
+                self.s3_client.put_object,
                 Bucket=S3_BUCKET_NAME,
                 Key=key,
-                Body=audio_data,
+                Body=bytes(audio_data),
                 ContentType='audio/ogg'
             )
             
@@ -45,3 +69,17 @@ class S3Uploader:
         except Exception as e:
             logger.error(f"Ошибка загрузки в S3: {e}")
             return ""
+
+    
+    @trace_span('s3.download')
+    async def download_voice_file(self, key: str) -> bytes:
+        """Скачивает голосовое сообщение из S3 по ключу"""
+        def read() -> bytes:
+            response = self.s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=key)
+            return response['Body'].read()
+        
+        return await asyncio.to_thread(read)
+
+
+# Глобальный экземпляр загрузчика S3
+s3_uploader = S3Uploader()
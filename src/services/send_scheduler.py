@@ -0,0 +1,291 @@
+"""Планировщик исходящих сообщений с учетом ограничений Telegram"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+import httpx
+from telegram import Bot, Chat, Message, ReplyParameters
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+from ..config.settings import (
+    SEND_GLOBAL_RATE,
+    SEND_CHAT_RATE,
+    SEND_CHAT_BURST,
+    SEND_GROUP_RATE_PER_MINUTE,
+    SEND_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Ведро токенов с резервированием: возвращает, сколько ждать до отправки"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Резервирует токен и возвращает задержку до его появления"""
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds: float):
+        """Запрещает отправку на seconds секунд (после flood wait от Telegram)"""
+        self._refill()
+        # Следующий reserve() вернет задержку ровно seconds
+        self.tokens = min(self.tokens, 0) - seconds * self.rate + 1
+
+
+class OutboundRequest:
+    """Отложенный вызов Bot API"""
+
+    __slots__ = ('kind', 'message_id', 'call', 'future')
+
+    def __init__(self, kind: str, message_id: Optional[int], call: Callable[[], Any]):
+        self.kind = kind
+        self.message_id = message_id
+        self.call = call
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class ChatQueue:
+    """Очередь исходящих запросов одного чата"""
+
+    __slots__ = ('requests', 'bucket', 'task', 'last_used')
+
+    def __init__(self, bucket: TokenBucket):
+        self.requests: Deque[OutboundRequest] = deque()
+        self.bucket = bucket
+        self.task: Optional[asyncio.Task] = None
+        self.last_used = time.monotonic()
+
+
+class OutboundScheduler:
+    """Отправляет сообщения через очереди чатов
+
+    - глобальное ограничение и ограничение на чат (для групп строже);
+    - подряд идущие правки одного сообщения объединяются, выполняется последняя;
+    - удаление сообщения отменяет ожидающие правки этого сообщения;
+    - при 429 (RetryAfter) чат ставится на паузу на указанное Telegram время и запрос повторяется;
+    - после сетевой ошибки правка и удаление повторяются, а отправка - только если запрос не ушел.
+    """
+
+    # Чаты без запросов дольше этого времени забываются
+    IDLE_CHAT_TTL = 60.0
+
+    def __init__(
+        self,
+        global_rate: float = SEND_GLOBAL_RATE,
+        chat_rate: float = SEND_CHAT_RATE,
+        chat_burst: int = SEND_CHAT_BURST,
+        group_rate_per_minute: float = SEND_GROUP_RATE_PER_MINUTE,
+        max_retries: int = SEND_MAX_RETRIES
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate_per_minute / 60
+        self.max_retries = max_retries
+        self._chats: Dict[int, ChatQueue] = {}
+        self.stats = {'sent': 0, 'merged': 0, 'dropped': 0, 'flood_waits': 0}
+
+    def _get_chat(self, chat_id: int) -> ChatQueue:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            self._forget_idle_chats()
+            # Отрицательные id - группы и каналы
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            chat = ChatQueue(TokenBucket(rate, self.chat_burst))
+            self._chats[chat_id] = chat
+        chat.last_used = time.monotonic()
+        return chat
+
+    def _forget_idle_chats(self):
+        now = time.monotonic()
+        for chat_id in [
+            chat_id for chat_id, chat in self._chats.items()
+            if not chat.requests and chat.task is None and now - chat.last_used > self.IDLE_CHAT_TTL
+        ]:
+            del self._chats[chat_id]
+
+    def _submit(self, chat_id: int, request: OutboundRequest) -> asyncio.Future:
+        chat = self._get_chat(chat_id)
+        last = chat.requests[-1] if chat.requests else None
+
+        if request.kind == 'edit' and last is not None and last.kind == 'edit' and last.message_id == request.message_id:
+            # Вытесненная правка получит результат новой
+            chat.requests[-1] = request
+            request.future.add_done_callback(lambda done: self._chain(done, last.future))
+            self.stats['merged'] += 1
+        else:
+            if request.kind == 'delete':
+                self._drop_edits(chat, request.message_id)
+            chat.requests.append(request)
+
+        if chat.task is None:
+            chat.task = asyncio.create_task(self._drain(chat_id, chat))
+        return request.future
+
+    def _drop_edits(self, chat: ChatQueue, message_id: int):
+        """Отменяет ожидающие правки удаляемого сообщения"""
+        if any(pending.kind == 'edit' and pending.message_id == message_id for pending in chat.requests):
+            kept = deque()
+            for pending in chat.requests:
+                if pending.kind == 'edit' and pending.message_id == message_id:
+                    pending.future.set_result(True)
+                    self.stats['dropped'] += 1
+                else:
+                    kept.append(pending)
+            chat.requests = kept
+
+    @staticmethod
+    def _chain(source: asyncio.Future, target: asyncio.Future):
+        if target.done():
+            return
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    async def _drain(self, chat_id: int, chat: ChatQueue):
+        """Выполняет запросы чата по очереди с учетом ограничений"""
+        try:
+            while chat.requests:
+                request = chat.requests.popleft()
+                if request.future.done():
+                    continue
+                try:
+                    result = await self._execute(chat, request)
+                except Exception as e:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                else:
+                    if not request.future.done():
+                        request.future.set_result(result)
+        finally:
+            chat.task = None
+            chat.last_used = time.monotonic()
+
+    async def _execute(self, chat: ChatQueue, request: OutboundRequest) -> Any:
+        """Вызов Bot API с ожиданием лимитов и повтором после flood wait"""
+        attempt = 0
+        while True:
+            delay = chat.bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            delay = self.global_bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                result = await request.call()
+                self.stats['sent'] += 1
+                return result
+            except RetryAfter as e:
+                attempt += 1
+                retry_after = e.retry_after
+                wait = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+                self.stats['flood_waits'] += 1
+                logger.warning(f"Flood wait {wait:.0f} с от Telegram (попытка {attempt})")
+                if attempt > self.max_retries:
+                    raise
+                chat.bucket.pause(wait)
+            except (TimedOut, NetworkError) as e:
+                if isinstance(e, BadRequest):
+                    raise
+                # Отправку повторяем, только если запрос точно не ушел: иначе
+                # Telegram мог принять сообщение, и пользователь получит его дважды.
+                # Правка и удаление идемпотентны и повторяются всегда
+                if request.kind == 'send' and not self._not_sent(e):
+                    raise
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+    @staticmethod
+    def _not_sent(error: NetworkError) -> bool:
+        """Ошибка возникла до отправки запроса (нет соединения или свободного соединения в пуле)"""
+        return isinstance(error.__cause__, (httpx.PoolTimeout, httpx.ConnectTimeout, httpx.ConnectError))
+
+    async def send_message(self, bot: Bot, chat_id: int, text: str, **kwargs) -> Message:
+        """Отправляет сообщение"""
+        return await self._submit(chat_id, OutboundRequest(
+            'send', None, lambda: bot.send_message(chat_id, text, **kwargs)
+        ))
+
+    @staticmethod
+    def _edit_request(bot: Bot, chat_id: int, message_id: int, text: str, **kwargs) -> OutboundRequest:
+        async def call():
+            try:
+                return await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, **kwargs)
+            except BadRequest as e:
+                # Текст не изменился - правка уже применена
+                if 'not modified' in str(e).lower():
+                    return True
+                raise
+
+        return OutboundRequest('edit', message_id, call)
+
+    async def edit_message_text(self, bot: Bot, chat_id: int, message_id: int, text: str, **kwargs) -> Any:
+        """Редактирует текст сообщения; подряд идущие правки объединяются"""
+        return await self._submit(chat_id, self._edit_request(bot, chat_id, message_id, text, **kwargs))
+
+    def schedule_edit_message_text(self, bot: Bot, chat_id: int, message_id: int, text: str, **kwargs) -> asyncio.Future:
+        """Ставит правку в очередь без ожидания (для частых обновлений вроде промежуточного текста)"""
+        future = self._submit(chat_id, self._edit_request(bot, chat_id, message_id, text, **kwargs))
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Не удалось отредактировать сообщение: {future.exception()}")
+
+    async def delete_message(self, bot: Bot, chat_id: int, message_id: int) -> bool:
+        """Удаляет сообщение и отменяет ожидающие правки этого сообщения"""
+        return await self._submit(chat_id, OutboundRequest(
+            'delete', message_id, lambda: bot.delete_message(chat_id, message_id)
+        ))
+
+    async def reply_text(self, message: Message, text: str, do_quote: Optional[bool] = None, **kwargs) -> Message:
+        """Отвечает в чат сообщения (аналог Message.reply_text)
+
+        Как и в PTB, без do_quote ответ цитирует сообщение везде, кроме личных
+        чатов; явные reply_parameters или reply_to_message_id важнее do_quote.
+        """
+        if 'reply_parameters' not in kwargs and 'reply_to_message_id' not in kwargs:
+            if do_quote is None:
+                do_quote = message.chat.type != Chat.PRIVATE
+            if do_quote:
+                kwargs['reply_parameters'] = ReplyParameters(message.message_id)
+        return await self.send_message(message.get_bot(), message.chat_id, text, **kwargs)
+
+    async def edit_text(self, message: Message, text: str, **kwargs) -> Any:
+        """Редактирует сообщение (аналог Message.edit_text)"""
+        return await self.edit_message_text(message.get_bot(), message.chat_id, message.message_id, text, **kwargs)
+
+    async def delete(self, message: Message) -> bool:
+        """Удаляет сообщение (аналог Message.delete)"""
+        return await self.delete_message(message.get_bot(), message.chat_id, message.message_id)
+
+    def queue_depth(self) -> int:
+        """Количество ожидающих исходящих запросов"""
+        return sum(len(chat.requests) for chat in self._chats.values())
+
+
+# Глобальный экземпляр планировщика исходящих сообщений
+send_scheduler = OutboundScheduler()
@@ -0,0 +1,155 @@
+"""Опрос операций асинхронного распознавания SpeechKit"""
+import asyncio
+import logging
+from typing import Optional
+
+from telegram import Bot
+
+from ..config.messages import STT_ERROR, VOICE_ERROR
+from ..config.settings import STT_POLL_INTERVAL, STT_POLL_BATCH_SIZE, STT_OPERATION_MAX_AGE
+from ..models.stt_operation import RecognitionOperation
+from ..utils.keyboards import get_main_menu_keyboard
+from ..utils.tracing import root_trace
+from .database import db_service
+from .send_scheduler import send_scheduler
+from .voice_processor import VoiceProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class RecognitionPoller:
+    """Опрашивает незавершенные операции пачками и записывает результаты в user_messages
+
+    Операции хранятся в таблице stt_operations, поэтому после перезапуска бота
+    опрос продолжается с того же места. Операция, не завершившаяся за max_age
+    секунд по расписанию опросов, считается проваленной.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = STT_POLL_INTERVAL,
+        batch_size: int = STT_POLL_BATCH_SIZE,
+        max_age: float = STT_OPERATION_MAX_AGE
+    ):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_polls = self._polls_within(max_age, poll_interval)
+        self._task: Optional[asyncio.Task] = None
+        self._bot: Optional[Bot] = None
+
+    @staticmethod
+    def _polls_within(max_age: float, poll_interval: float) -> int:
+        """Число опросов, укладывающихся в max_age при растущем интервале (до 6 * poll_interval)
+
+        В stt_operations нет времени создания, поэтому возраст операции
+        оценивается по числу опросов (снизу: опрос может задержаться).
+        """
+        polls, elapsed = 0, 0.0
+        while True:
+            step = max(poll_interval, 0.001) * min(polls + 1, 6)
+            if elapsed + step > max_age:
+                return max(polls, 1)
+            elapsed += step
+            polls += 1
+
+    async def register(self, operation: RecognitionOperation):
+        """Сохраняет операцию для опроса"""
+        await db_service.add_stt_operation(operation)
+
+    def start(self, bot: Bot):
+        """Запускает фоновый опрос"""
+        if self._task is None:
+            self._bot = bot
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновый опрос"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Пока есть готовые к опросу операции, опрашиваем их без паузы
+                if await self.poll_once() < self.batch_size:
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка опроса операций распознавания: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def poll_once(self) -> int:
+        """Опрашивает одну пачку операций параллельно, возвращает ее размер"""
+        operations = await db_service.claim_due_stt_operations(self.batch_size, self.poll_interval)
+        if operations:
+            with root_trace('stt_poll', batch=len(operations)):
+                await asyncio.gather(*(self._poll(operation) for operation in operations))
+        return len(operations)
+
+    async def _poll(self, operation: RecognitionOperation):
+        """Проверяет одну операцию и, если она завершена, доставляет результат"""
+        try:
+            result = await VoiceProcessor.get_recognition_operation(operation.operation_id)
+        except Exception as e:
+            # Операция будет опрошена повторно по расписанию
+            logger.warning(f"Не удалось получить операцию {operation.operation_id}: {e}")
+            result = {}
+
+        transcription = VoiceProcessor.extract_operation_text(result)
+        if transcription is None:
+            if operation.polls >= self.max_polls:
+                await self._expire(operation)
+            return
+
+        await db_service.update_transcription(
+            operation.user_id, operation.message_id, operation.date, transcription
+        )
+        await db_service.delete_stt_operation(operation.operation_id)
+        await self._deliver(operation, transcription)
+
+    async def _expire(self, operation: RecognitionOperation):
+        """Проваливает операцию, которая так и не завершилась"""
+        logger.error(f"Операция распознавания {operation.operation_id} не завершилась за {operation.polls} опросов")
+        await db_service.update_transcription(
+            operation.user_id, operation.message_id, operation.date, STT_ERROR
+        )
+        await db_service.delete_stt_operation(operation.operation_id)
+        try:
+            if operation.processing_message_id is not None:
+                await send_scheduler.edit_message_text(
+                    self._bot, operation.chat_id, operation.processing_message_id, VOICE_ERROR
+                )
+            else:
+                await send_scheduler.send_message(
+                    self._bot, operation.chat_id, VOICE_ERROR, reply_to_message_id=operation.message_id
+                )
+        except Exception as e:
+            logger.error(f"Не удалось сообщить об ошибке операции {operation.operation_id}: {e}")
+
+    async def _deliver(self, operation: RecognitionOperation, transcription: str):
+        """Заменяет индикатор обработки результатом распознавания"""
+        try:
+            if operation.processing_message_id is not None:
+                try:
+                    await send_scheduler.delete_message(
+                        self._bot, operation.chat_id, operation.processing_message_id
+                    )
+                except Exception as e:
+                    logger.warning(f"Не удалось удалить индикатор обработки: {e}")
+
+            await send_scheduler.send_message(
+                self._bot,
+                operation.chat_id,
+                transcription,
+                reply_to_message_id=operation.message_id,
+                reply_markup=get_main_menu_keyboard()
+            )
+        except Exception as e:
+            logger.error(f"Не удалось отправить результат операции {operation.operation_id}: {e}")
+
+
+# Глобальный экземпляр опроса операций распознавания
+recognition_poller = RecognitionPoller()
@@ -0,0 +1,140 @@
+"""Потоковое распознавание речи через gRPC API SpeechKit v3"""
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from ..config.settings import (
+    YANDEX_API_KEY,
+    YANDEX_FOLDER_ID,
+    YANDEX_STT_GRPC_ENDPOINT,
+    YANDEX_STT_GRPC_INSECURE,
+    STT_PARTIAL_UPDATE_INTERVAL
+)
+from ..utils.tracing import trace_span
+
+logger = logging.getLogger(__name__)
+
+PartialCallback = Callable[[str], Awaitable[None]]
+
+
+class StreamingRecognizer:
+    """Отправляет аудио по частям и получает промежуточные и финальные результаты
+
+    Используются сгенерированные stub'ы из пакета yandexcloud поверх асинхронного
+    канала grpc.aio. Канал и модули gRPC создаются при первом обращении.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = YANDEX_STT_GRPC_ENDPOINT,
+        insecure: bool = YANDEX_STT_GRPC_INSECURE,
+        partial_interval: float = STT_PARTIAL_UPDATE_INTERVAL
+    ):
+        self.endpoint = endpoint
+        self.insecure = insecure
+        self.partial_interval = partial_interval
+        self._channel = None
+        self._stub = None
+
+    def _get_stub(self):
+        """Ленивое создание gRPC канала и stub'а"""
+        if self._stub is None:
+            import grpc
+            from yandex.cloud.ai.stt.v3 import stt_service_pb2_grpc
+
+            if self.insecure:
+                self._channel = grpc.aio.insecure_channel(self.endpoint)
+            else:
+                self._channel = grpc.aio.secure_channel(self.endpoint, grpc.ssl_channel_credentials())
+            self._stub = stt_service_pb2_grpc.RecognizerStub(self._channel)
+        return self._stub
+
+    async def close(self):
+        """Закрывает gRPC канал"""
+        if self._channel is not None:
+            await self._channel.close()
+            self._channel = None
+            self._stub = None
+
+    @staticmethod
+    async def _requests(chunks: AsyncIterator[bytes]):
+        """Поток запросов: настройки сессии, затем части аудио по мере чтения"""
+        from yandex.cloud.ai.stt.v3 import stt_pb2
+
+        yield stt_pb2.StreamingRequest(
+            session_options=stt_pb2.StreamingOptions(
+                recognition_model=stt_pb2.RecognitionModelOptions(
+                    audio_format=stt_pb2.AudioFormatOptions(
+                        container_audio=stt_pb2.ContainerAudio(
+                            container_audio_type=stt_pb2.ContainerAudio.OGG_OPUS
+                        )
+                    ),
+                    text_normalization=stt_pb2.TextNormalizationOptions(
+                        text_normalization=stt_pb2.TextNormalizationOptions.TEXT_NORMALIZATION_ENABLED
+                    ),
+                    language_restriction=stt_pb2.LanguageRestrictionOptions(
+                        restriction_type=stt_pb2.LanguageRestrictionOptions.WHITELIST,
+                        language_code=['ru-RU']
+                    )
+                )
+            )
+        )
+
+        async for chunk in chunks:
+            yield stt_pb2.StreamingRequest(chunk=stt_pb2.AudioChunk(data=chunk))
+
+    @trace_span('stt.stream')
+    async def recognize(self, chunks: AsyncIterator[bytes], on_partial: Optional[PartialCallback] = None) -> str:
+        """Распознает поток аудио, вызывая on_partial с текущим текстом не чаще partial_interval"""
+        metadata = (
+            ('authorization', f'Api-Key {YANDEX_API_KEY}'),
+            ('x-folder-id', YANDEX_FOLDER_ID or ''),
+        )
+        call = self._get_stub().RecognizeStreaming(self._requests(chunks), metadata=metadata)
+
+        # Финальные результаты по номеру фразы; нормализованный текст заменяет сырой
+        finals: Dict[int, str] = {}
+        last_partial_at = 0.0
+        last_partial_text = ''
+
+        async for response in call:
+            event = response.WhichOneof('Event')
+            final_index = response.audio_cursors.final_index
+
+            if event == 'final' and response.final.alternatives:
+                finals[final_index] = response.final.alternatives[0].text
+            elif event == 'final_refinement':
+                alternatives = response.final_refinement.normalized_text.alternatives
+                if alternatives:
+                    finals[response.final_refinement.final_index] = alternatives[0].text
+            elif event == 'partial' and response.partial.alternatives and on_partial is not None:
+                text = self._join(finals, response.partial.alternatives[0].text)
+                now = time.monotonic()
+                if text and text != last_partial_text and now - last_partial_at >= self.partial_interval:
+                    last_partial_at = now
+                    last_partial_text = text
+                    try:
+                        await on_partial(text)
+                    except Exception as e:
+                        logger.warning(f"Не удалось показать промежуточный результат: {e}")
+
+        return self._join(finals)
+
+    @staticmethod
+    def _join(finals: Dict[int, str], partial: str = '') -> str:
+        """Собирает текст из финальных фраз и текущей незавершенной"""
+        parts = [finals[index] for index in sorted(finals) if finals[index]]
+        if partial:
+            parts.append(partial)
+        return ' '.join(parts)
+
+
+async def iter_chunks(data: bytes, chunk_size: int) -> AsyncIterator[bytes]:
+    """Отдает уже загруженные байты частями"""
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
+
+
+# Глобальный экземпляр потокового распознавания
+streaming_recognizer = StreamingRecognizer()
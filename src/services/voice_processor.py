@@ -1,12 +1,21 @@
 """Сервис для обработки голосовых сообщений"""
+import asyncio
 import logging
-import requests
-from typing import Optional
-from telegram import Voice
+import os
+from typing import Any, Dict, Optional
+from telegram import Bot, Voice
 from telegram.ext import ContextTypes
 
-from ..config.settings import YANDEX_API_KEY, YANDEX_STT_URL
+from ..config.settings import (
+    YANDEX_API_KEY,
+    YANDEX_STT_URL,
+    YANDEX_STT_ASYNC_URL,
+    YANDEX_OPERATION_URL,
+    TELEGRAM_LOCAL_MODE
+)
 from ..config.messages import STT_ERROR
+from ..utils.tracing import trace_span
+from .http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -17,28 +26,129 @@ class VoiceProcessor:
     @staticmethod
     async def download_voice_file(voice: Voice, context: ContextTypes.DEFAULT_TYPE) -> bytes:
         """Скачивает голосовое сообщение"""
-        file = await context.bot.get_file(voice.file_id)
+        return await VoiceProcessor.download_file(context.bot, voice.file_id)
+    
+    @staticmethod
+    @trace_span('voice.download')
+    async def download_file(bot: Bot, file_id: str) -> bytes:
+        """Скачивает файл по file_id (file_id остается действительным после перезапуска)
+
+        С локальным сервером Bot API файл читается прямо с общего диска.
+        """
+        file = await bot.get_file(file_id)
+        local_path = VoiceProcessor.get_local_path(file.file_path)
+        if local_path is not None:
+            return await asyncio.to_thread(VoiceProcessor.read_local_file, local_path)
         return await file.download_as_bytearray()
     
+    @staticmethod
+    def get_local_path(file_path: Optional[str]) -> Optional[str]:
+        """Путь к файлу на диске, если сервер Bot API работает в локальном режиме"""
+        if not TELEGRAM_LOCAL_MODE or not file_path:
+            return None
+        if os.path.isabs(file_path) and os.path.isfile(file_path):
+            return file_path
+        return None
+    
+    @staticmethod
+    def read_local_file(path: str) -> bytes:
+        """Читает файл с диска, без HTTP запроса к серверу Bot API
+
+        Дальше запись уходит в пул процессов, S3 и SpeechKit как bytes, поэтому
+        отображение в память не избавило бы от копии, а обычное чтение одно.
+        """
+        with open(path, 'rb') as f:
+            return f.read()
+    
     @staticmethod
     async def transcribe_voice(audio_data: bytes) -> str:
-        """Транскрибирует голосовое сообщение через Yandex SpeechKit HTTP API"""
+        """Транскрибирует голосовое сообщение, при ошибке возвращает STT_ERROR"""
         try:
-            headers = {
-                'Authorization': f'Api-Key {YANDEX_API_KEY}',
-                'Content-Type': 'application/json'
-            }
-
-            response = requests.post(YANDEX_STT_URL, headers=headers, data=audio_data)
-            logger.info(f"STT Response: {response.json()}")
-            response.raise_for_status()
-            
-            # Извлекаем текст из ответа
-            result = response.json()
-            if 'result' in result:
-                return result['result']
-            else:
-                return STT_ERROR
+            return await VoiceProcessor.request_transcription(audio_data)
         except Exception as e:
             logger.error(f"Ошибка транскрибации: {e}")
             return STT_ERROR
+    
+    @staticmethod
+    @trace_span('stt.transcribe')
+    async def request_transcription(audio_data: bytes) -> str:
+        """Транскрибирует голосовое сообщение через Yandex SpeechKit HTTP API
+
+        В отличие от transcribe_voice ошибки пробрасываются, чтобы очередь
+        могла повторить задание.
+        """
+        headers = {
+            'Authorization': f'Api-Key {YANDEX_API_KEY}',
+            'Content-Type': 'application/json'
+        }
+
+        # requests блокирующий, поэтому запрос выполняется вне event loop
+        response = await asyncio.to_thread(
+            get_http_session().post, YANDEX_STT_URL, headers=headers, data=audio_data
+        )
+        logger.info(f"STT Response: {response.json()}")
+        response.raise_for_status()
+        
+        # Извлекаем текст из ответа
+        result = response.json()
+        if 'result' not in result:
+            raise RuntimeError(f"В ответе SpeechKit нет результата: {result}")
+        return result['result']
+    
+    @staticmethod
+    @trace_span('stt.start_long_running')
+    async def start_long_running_recognition(audio_uri: str) -> str:
+        """Запускает асинхронное распознавание файла из Object Storage, возвращает id операции"""
+        headers = {
+            'Authorization': f'Api-Key {YANDEX_API_KEY}',
+            'Content-Type': 'application/json'
+        }
+        data = {
+            "config": {
+                "specification": {
+                    "languageCode": "ru-RU",
+                    "audioEncoding": "OGG_OPUS"
+                }
+            },
+            "audio": {
+                "uri": audio_uri
+            }
+        }
+        
+        response = await asyncio.to_thread(
+            get_http_session().post, YANDEX_STT_ASYNC_URL, headers=headers, json=data
+        )
+        response.raise_for_status()
+        return response.json()['id']
+    
+    @staticmethod
+    async def get_recognition_operation(operation_id: str) -> Dict[str, Any]:
+        """Получает состояние операции асинхронного распознавания"""
+        headers = {'Authorization': f'Api-Key {YANDEX_API_KEY}'}
+        
+        response = await asyncio.to_thread(
+            get_http_session().get, f"{YANDEX_OPERATION_URL}/{operation_id}", headers=headers
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    @staticmethod
+    def extract_operation_text(operation: Dict[str, Any]) -> Optional[str]:
+        """Текст из завершенной операции; None, если операция еще выполняется"""
+        if not operation.get('done'):
+            return None
+        
+        if 'error' in operation:
+            logger.error(f"Ошибка асинхронного распознавания {operation.get('id')}: {operation['error']}")
+            return STT_ERROR
+        
+        texts = []
+        for chunk in operation.get('response', {}).get('chunks', []):
+            # Для моно-записей SpeechKit возвращает один канал
+            if chunk.get('channelTag', '1') != '1':
+                continue
+            alternatives = chunk.get('alternatives') or []
+            if alternatives:
+                texts.append(alternatives[0]['text'])
+        
+        return ' '.join(texts) if texts else STT_ERROR
@@ -0,0 +1,405 @@
+"""Надежная очередь обработки голосовых сообщений"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram import Bot
+
+from ..config.settings import (
+    VOICE_WORKERS,
+    VOICE_JOB_LEASE_SECONDS,
+    VOICE_JOB_MAX_ATTEMPTS,
+    VOICE_JOB_RETRY_DELAY,
+    VOICE_JOB_POLL_INTERVAL,
+    STT_MODE,
+    STT_STREAM_CHUNK_SIZE,
+    STT_TRIM_SILENCE,
+    STT_SILENCE_MIN_MS,
+    STT_SILENCE_KEEP_MS,
+    STT_SILENCE_THRESHOLD_DB,
+    STT_SILENCE_MIN_SAVED_SECONDS,
+    S3_ARCHIVE_REENCODE,
+    S3_ARCHIVE_BITRATE
+)
+from ..config.messages import VOICE_ERROR, PARTIAL_TRANSCRIPTION
+from ..models.stt_operation import RecognitionOperation
+from ..models.voice_job import VoiceJob
+from ..utils.keyboards import get_main_menu_keyboard
+from ..utils.storage import add_user_message
+from ..utils.tracing import root_trace
+from .audio_executor import audio_executor
+from .admission import admission
+from .audio_processing import encode_archive, trim_silence
+from .database import db_service
+from .s3_uploader import s3_uploader
+from .send_scheduler import send_scheduler
+from .stt_poller import recognition_poller
+from .stt_streaming import PartialCallback, streaming_recognizer, iter_chunks
+from .voice_processor import VoiceProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceJobQueue:
+    """Очередь голосовых сообщений поверх таблицы voice_jobs
+
+    Задание сохраняется до начала обработки, воркеры захватывают его с арендой,
+    поэтому после перезапуска бота незавершенные задания подхватываются снова.
+    """
+
+    def __init__(
+        self,
+        workers: int = VOICE_WORKERS,
+        lease_seconds: float = VOICE_JOB_LEASE_SECONDS,
+        max_attempts: int = VOICE_JOB_MAX_ATTEMPTS,
+        retry_delay: float = VOICE_JOB_RETRY_DELAY,
+        poll_interval: float = VOICE_JOB_POLL_INTERVAL
+    ):
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self._instance_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._bot: Optional[Bot] = None
+        self.stats = {
+            'audio_seconds': 0.0,
+            'seconds_saved': 0.0,
+            'archive_bytes_in': 0,
+            'archive_bytes_out': 0,
+            'archive_encode_seconds': 0.0
+        }
+
+    async def enqueue(self, job: VoiceJob) -> int:
+        """Сохраняет задание и будит воркеры"""
+        job_id = await db_service.enqueue_voice_job(job)
+        self._wakeup.set()
+        return job_id
+
+    async def start(self, bot: Bot):
+        """Запускает воркеры"""
+        if self._tasks:
+            return
+        self._bot = bot
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(f"{self._instance_id}:{index}")))
+        logger.info(f"Запущено {self.workers} воркеров очереди голосовых сообщений")
+
+    async def stop(self):
+        """Останавливает воркеры; захваченные задания вернутся в очередь по истечении аренды"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _wait_for_work(self):
+        """Ждет нового задания или очередного опроса таблицы"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self, worker_id: str):
+        """Цикл воркера: захватить задание, выполнить, отметить результат"""
+        while True:
+            try:
+                for job in await db_service.expire_voice_jobs(self.max_attempts):
+                    logger.error(f"Задание {job.id} провалено: процесс прервался на последней попытке")
+                    await self._notify_failure(job)
+
+                job = await db_service.claim_voice_job(worker_id, self.lease_seconds, self.max_attempts)
+                if job is None:
+                    await self._wait_for_work()
+                    continue
+
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка воркера очереди {worker_id}: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job: VoiceJob):
+        """Выполняет задание, продлевая аренду, и отмечает результат в очереди"""
+        heartbeat = asyncio.create_task(self._keep_lease(job))
+        try:
+            with root_trace('voice_job', job_id=job.id, user_id=job.user_id, attempt=job.attempts):
+                await self._process(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка обработки задания {job.id} (попытка {job.attempts}): {e}")
+            failed = await db_service.fail_voice_job(
+                job.id, job.lease_owner, str(e), self.max_attempts, self.retry_delay
+            )
+            if failed:
+                await self._notify_failure(job)
+            return
+        finally:
+            heartbeat.cancel()
+
+        if not await db_service.complete_voice_job(job.id, job.lease_owner):
+            logger.warning(f"Задание {job.id} выполнено после потери аренды, его мог выполнить другой воркер")
+
+    async def _keep_lease(self, job: VoiceJob):
+        """Продлевает аренду задания каждую треть ее срока, пока оно выполняется"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await db_service.extend_voice_job_lease(job.id, job.lease_owner, self.lease_seconds):
+                    logger.warning(f"Аренда задания {job.id} потеряна, оно передано другому воркеру")
+                    return
+            except Exception as e:
+                logger.warning(f"Не удалось продлить аренду задания {job.id}: {e}")
+
+    async def _process(self, job: VoiceJob):
+        """Обработка голосового сообщения: скачивание, S3, распознавание, сохранение, ответ"""
+        # Скачиваем голосовое сообщение
+        audio_data = await VoiceProcessor.download_file(self._bot, job.file_id)
+
+        # Сжатие тишины выполняется в пуле процессов, event loop не блокируется
+        stt_audio, audio_info = await self.prepare_audio(job.user_id, job.message_id, audio_data, job.duration)
+        audio_stats = {'audio_seconds': audio_info.get('duration_seconds'), 'audio_bytes': len(audio_data)}
+
+        # Под нагрузкой архивная копия загружается после ответа пользователю;
+        # асинхронному распознаванию файл в бакете нужен сразу
+        defer_archive = STT_MODE != 'async' and await admission.defer_archive()
+
+        # Загружаем в S3. В режиме stream загрузка идет параллельно с
+        # распознаванием: первый фрагмент уходит в SpeechKit без ее ожидания
+        s3_key = None
+        archive = None
+        if not defer_archive:
+            archive = asyncio.create_task(self._archive(job, audio_data, audio_info))
+            if STT_MODE != 'stream':
+                s3_key = await self._archived_key(archive, audio_stats)
+
+        # SpeechKit сам читает файл из бакета, результат доставит recognition_poller
+        if STT_MODE == 'async' and s3_key:
+            await self._start_async_recognition(job, s3_key, audio_stats)
+            return
+
+        # Транскрибируем
+        try:
+            transcription = await self.recognize(stt_audio, on_partial=self._partial_display(job))
+        finally:
+            if archive is not None and not archive.done():
+                await asyncio.wait({archive})
+        if archive is not None and s3_key is None:
+            s3_key = await self._archived_key(archive, audio_stats)
+
+        # Сохраняем в базе данных
+        message_data = {
+            'message_id': job.message_id,
+            'timestamp': datetime.now().isoformat(),
+            's3_key': s3_key,
+            'transcription': transcription,
+            **audio_stats
+        }
+        await add_user_message(job.user_id, message_data, job.date)
+
+        # Удаляем индикатор загрузки
+        await self._delete_processing_message(job)
+
+        # Отправляем результат
+        await send_scheduler.send_message(
+            self._bot,
+            job.chat_id,
+            transcription,
+            reply_to_message_id=job.message_id,
+            reply_markup=get_main_menu_keyboard()
+        )
+
+        if defer_archive:
+            # Пересохраняем сообщение уже с ключом архивной копии. Ответ уже
+            # отправлен, поэтому ошибка загрузки не повторяет задание
+            s3_key, archive_stats = await self._archive(job, audio_data, audio_info)
+            if not s3_key:
+                logger.error(f"Архивная копия голосового сообщения {job.message_id} не загружена в S3")
+                return
+            message_data.update(s3_key=s3_key, **archive_stats)
+            await add_user_message(job.user_id, message_data, job.date)
+
+    async def prepare_audio(
+        self,
+        user_id: str,
+        message_id: int,
+        audio_data: bytes,
+        duration: Optional[float] = None
+    ) -> Tuple[bytes, Dict[str, Any]]:
+        """Сжимает тишину в записи (только STT_MODE=sync и STT_TRIM_SILENCE=1)
+
+        Возвращает аудио для распознавания и сведения о записи. Без сжатия
+        запись не декодируется: длительность берется из Telegram (duration).
+        Сжатие тишины в S3 не попадает (архивная копия - см. _archive). При
+        ошибке обработки распознается исходная запись.
+        """
+        audio_info = {'duration_seconds': duration} if duration is not None else {}
+        # В режиме stream сжатие потребовало бы декодировать всю запись до
+        # отправки первого фрагмента, в async SpeechKit читает файл из S3
+        if STT_TRIM_SILENCE and STT_MODE == 'sync':
+            try:
+                audio_info = await audio_executor.submit(
+                    user_id,
+                    trim_silence,
+                    bytes(audio_data),
+                    'ogg',
+                    STT_SILENCE_MIN_MS,
+                    STT_SILENCE_KEEP_MS,
+                    STT_SILENCE_THRESHOLD_DB,
+                    STT_SILENCE_MIN_SAVED_SECONDS
+                )
+                stt_audio = audio_info.pop('audio')
+            except Exception as e:
+                logger.warning(f"Не удалось сжать тишину в голосовом сообщении {message_id}: {e}")
+                return audio_data, audio_info
+        else:
+            stt_audio = audio_data
+
+        if 'duration_seconds' in audio_info:
+            self._record_audio(message_id, audio_info)
+        return stt_audio, audio_info
+
+    @staticmethod
+    async def _archived_key(archive: 'asyncio.Task', audio_stats: Dict[str, Any]) -> str:
+        """Ключ загруженной архивной копии; без нее задание повторяется"""
+        s3_key, archive_stats = await archive
+        if not s3_key:
+            # Задание будет повторено с задержкой, как при любой ошибке
+            raise RuntimeError("Не удалось загрузить голосовое сообщение в S3")
+        audio_stats.update(archive_stats)
+        return s3_key
+
+    async def _archive(self, job: VoiceJob, audio_data: bytes, audio_info: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Загружает архивную копию в S3, при S3_ARCHIVE_REENCODE=1 - перекодированную
+
+        Перекодирование выполняется в пуле процессов. Копия остается OGG/Opus,
+        поэтому ее можно отправить как голосовое и заново распознать. При
+        ошибке кодирования загружается исходная запись. Возвращает ключ и
+        поля archive_codec/archive_bytes для строки сообщения.
+        """
+        archive_data, codec = audio_data, None
+        if S3_ARCHIVE_REENCODE:
+            started = time.perf_counter()
+            try:
+                encoded = await audio_executor.submit(
+                    job.user_id, encode_archive, bytes(audio_data), 'ogg', S3_ARCHIVE_BITRATE
+                )
+                archive_data, codec = encoded['audio'], encoded['codec']
+            except Exception as e:
+                logger.warning(f"Не удалось перекодировать голосовое сообщение {job.message_id}: {e}")
+            else:
+                self._record_archive(job.message_id, len(audio_data), len(archive_data),
+                                     time.perf_counter() - started, audio_info.get('duration_seconds'))
+
+        s3_key = await s3_uploader.upload_voice_file(archive_data, int(job.user_id), job.message_id)
+        if not s3_key:
+            # Копии в бакете нет, строка не должна ссылаться на нее
+            return s3_key, {'archive_codec': None, 'archive_bytes': None}
+        return s3_key, {'archive_codec': codec, 'archive_bytes': len(archive_data)}
+
+    def _record_archive(self, message_id: int, bytes_in: int, bytes_out: int, seconds: float, duration: Optional[float]):
+        """Учитывает сэкономленные байты и скорость перекодирования архивной копии"""
+        self.stats['archive_bytes_in'] += bytes_in
+        self.stats['archive_bytes_out'] += bytes_out
+        self.stats['archive_encode_seconds'] += seconds
+        speed = f", x{duration / seconds:.0f} от реального времени" if duration and seconds else ''
+        logger.info(
+            f"Архивная копия {message_id}: {bytes_in} -> {bytes_out} байт "
+            f"(сэкономлено {bytes_in - bytes_out}), кодирование {seconds * 1000:.0f} мс{speed}"
+        )
+
+    def _record_audio(self, message_id: int, audio_info: Dict[str, Any]):
+        """Учитывает длительность записи и сэкономленные на распознавании секунды"""
+        duration = audio_info['duration_seconds']
+        seconds_saved = audio_info.get('seconds_saved', 0.0)
+        self.stats['audio_seconds'] += duration
+        self.stats['seconds_saved'] += seconds_saved
+        logger.info(
+            f"Голосовое сообщение {message_id}: {duration:.1f} с, "
+            f"в распознавание {duration - seconds_saved:.1f} с (сэкономлено {seconds_saved:.1f} с)"
+        )
+
+    async def recognize(self, audio_data: bytes, on_partial: Optional[PartialCallback] = None) -> str:
+        """Распознает запись синхронным API или потоково (STT_MODE=stream)
+
+        Промежуточный текст потокового распознавания передается в on_partial.
+        Ошибка синхронного API пробрасывается: задание будет повторено.
+        """
+        if STT_MODE == 'stream':
+            try:
+                transcription = await streaming_recognizer.recognize(
+                    iter_chunks(audio_data, STT_STREAM_CHUNK_SIZE), on_partial=on_partial
+                )
+                if transcription:
+                    return transcription
+            except Exception as e:
+                logger.warning(f"Ошибка потокового распознавания, используем синхронный API: {e}")
+
+        return await VoiceProcessor.request_transcription(audio_data)
+
+    def _partial_display(self, job: VoiceJob) -> PartialCallback:
+        """Показ промежуточного текста в индикаторе обработки"""
+        async def show_partial(text: str):
+            if job.processing_message_id is not None:
+                # Не ждем отправки: подряд идущие правки планировщик объединит
+                send_scheduler.schedule_edit_message_text(
+                    self._bot, job.chat_id, job.processing_message_id, PARTIAL_TRANSCRIPTION.format(text=text)
+                )
+
+        return show_partial
+
+    async def _start_async_recognition(self, job: VoiceJob, s3_key: str, audio_stats: Dict[str, Any]):
+        """Сохраняет сообщение без текста и запускает распознавание файла из S3"""
+        operation_id = await VoiceProcessor.start_long_running_recognition(s3_uploader.object_uri(s3_key))
+
+        message_data = {
+            'message_id': job.message_id,
+            'timestamp': datetime.now().isoformat(),
+            's3_key': s3_key,
+            'transcription': None,
+            **audio_stats
+        }
+        await add_user_message(job.user_id, message_data, job.date)
+
+        await recognition_poller.register(RecognitionOperation(
+            operation_id=operation_id,
+            user_id=job.user_id,
+            chat_id=job.chat_id,
+            message_id=job.message_id,
+            date=job.date,
+            processing_message_id=job.processing_message_id
+        ))
+
+    async def _delete_processing_message(self, job: VoiceJob):
+        """Удаляет сообщение «Обрабатываю...», если оно еще существует"""
+        if job.processing_message_id is None:
+            return
+        try:
+            await send_scheduler.delete_message(self._bot, job.chat_id, job.processing_message_id)
+        except Exception as e:
+            # Сообщение могло быть удалено на предыдущей попытке
+            logger.warning(f"Не удалось удалить индикатор обработки задания {job.id}: {e}")
+
+    async def _notify_failure(self, job: VoiceJob):
+        """Сообщает пользователю об окончательной ошибке обработки"""
+        try:
+            if job.processing_message_id is not None:
+                await send_scheduler.edit_message_text(self._bot, job.chat_id, job.processing_message_id, VOICE_ERROR)
+            else:
+                await send_scheduler.send_message(
+                    self._bot, job.chat_id, VOICE_ERROR, reply_to_message_id=job.message_id
+                )
+        except Exception as e:
+            logger.error(f"Не удалось сообщить об ошибке задания {job.id}: {e}")
+
+
+# Глобальный экземпляр очереди голосовых сообщений
+voice_queue = VoiceJobQueue()
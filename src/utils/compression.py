@@ -0,0 +1,182 @@
+"""Сжатие текста транскрипций zstd со словарем, обученным на русских транскрипциях
+
+Сжатое значение хранится как zstd фрейм (bytes), несжатое - как обычная
+строка, поэтому в одной колонке могут лежать оба формата. Идентификатор
+словаря записан в заголовке фрейма, поэтому после переобучения старые строки
+читаются своим словарем.
+
+Обучение словаря на транскрипциях из базы и пересжатие существующих строк:
+
+    python -m src.utils.compression train [размер словаря, байт]
+    python -m src.utils.compression recompress
+"""
+import asyncio
+import logging
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Union
+
+import zstandard
+
+from ..config.settings import TRANSCRIPTION_COMPRESSION, TRANSCRIPTION_COMPRESSION_LEVEL
+
+logger = logging.getLogger(__name__)
+
+StoredText = Union[str, bytes, None]
+# Возвращает все словари из хранилища в порядке добавления
+DictionaryLoader = Callable[[], List[bytes]]
+
+
+class TranscriptionCodec:
+    """Сжимает и распаковывает транскрипции
+
+    Словари регистрирует бэкенд хранилища при инициализации; новые строки
+    сжимаются последним зарегистрированным словарем. Если строка сжата
+    неизвестным словарем (его обучил другой процесс), словари перечитываются
+    из хранилища через загрузчик, заданный бэкендом.
+    """
+
+    def __init__(self, level: int = TRANSCRIPTION_COMPRESSION_LEVEL, enabled: bool = TRANSCRIPTION_COMPRESSION):
+        self.level = level
+        self.enabled = enabled
+        self._dictionaries: Dict[int, zstandard.ZstdCompressionDict] = {}
+        self._current: Optional[zstandard.ZstdCompressionDict] = None
+        # Объекты zstandard нельзя использовать из нескольких потоков одновременно
+        self._local = threading.local()
+        self._loader: Optional[DictionaryLoader] = None
+        self._reload_lock = threading.Lock()
+
+    @property
+    def dictionary_id(self) -> int:
+        """Идентификатор словаря для новых строк (0 - без словаря)"""
+        return self._current.dict_id() if self._current is not None else 0
+
+    def add_dictionary(self, data: bytes) -> int:
+        """Регистрирует словарь и делает его текущим, возвращает его идентификатор"""
+        dictionary = zstandard.ZstdCompressionDict(data)
+        dict_id = dictionary.dict_id()
+        if dict_id in self._dictionaries:
+            dictionary = self._dictionaries[dict_id]
+        else:
+            # Заранее подготовленный словарь ускоряет сжатие коротких строк
+            dictionary.precompute_compress(level=self.level)
+            self._dictionaries[dict_id] = dictionary
+        if dictionary is not self._current:
+            self._current = dictionary
+            self._local = threading.local()
+        return dict_id
+
+    def set_loader(self, loader: Optional[DictionaryLoader]):
+        """Задает загрузчик словарей для строк, сжатых неизвестным словарем"""
+        self._loader = loader
+
+    def _reload(self, dict_id: int) -> Optional[zstandard.ZstdCompressionDict]:
+        """Перечитывает словари из хранилища и возвращает словарь dict_id, если он нашелся"""
+        with self._reload_lock:
+            if dict_id not in self._dictionaries and self._loader is not None:
+                logger.info(f"Словарь сжатия {dict_id} не загружен, перечитываем словари")
+                for data in self._loader():
+                    self.add_dictionary(data)
+            return self._dictionaries.get(dict_id)
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            if self._current is not None:
+                compressor = zstandard.ZstdCompressor(dict_data=self._current, write_content_size=True)
+            else:
+                compressor = zstandard.ZstdCompressor(level=self.level, write_content_size=True)
+            self._local.compressor = compressor
+        return compressor
+
+    def _decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        decompressors = getattr(self._local, 'decompressors', None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            if dict_id:
+                dictionary = self._dictionaries.get(dict_id)
+                if dictionary is None:
+                    dictionary = self._reload(dict_id)
+                if dictionary is None:
+                    raise ValueError(f"Словарь сжатия {dict_id} не загружен")
+                decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            else:
+                decompressor = zstandard.ZstdDecompressor()
+            decompressors[dict_id] = decompressor
+        return decompressor
+
+    def compress(self, text: StoredText) -> StoredText:
+        """Значение для записи в базу: zstd фрейм, если он короче текста"""
+        if not self.enabled or not isinstance(text, str) or not text:
+            return text
+        raw = text.encode('utf-8')
+        compressed = self._compressor().compress(raw)
+        return compressed if len(compressed) < len(raw) else text
+
+    def decompress(self, value: StoredText) -> Optional[str]:
+        """Текст из значения, прочитанного из базы"""
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        dict_id = zstandard.get_frame_parameters(value).dict_id
+        return self._decompressor(dict_id).decompress(value).decode('utf-8')
+
+    @staticmethod
+    def train(samples: List[str], size: int = 64 * 1024) -> bytes:
+        """Обучает словарь на примерах транскрипций"""
+        encoded = [sample.encode('utf-8') for sample in samples if sample]
+        return zstandard.train_dictionary(size, encoded).as_bytes()
+
+
+# Глобальный экземпляр кодека транскрипций
+transcription_codec = TranscriptionCodec()
+
+
+async def _train(size: int):
+    from ..services.database import db_service
+
+    backend = db_service.backend
+    if not hasattr(backend, 'add_compression_dictionary'):
+        print(f"{type(backend).__name__} не поддерживает сжатие транскрипций")
+        return 1
+
+    await db_service.initialize()
+    samples = await backend.get_all_transcriptions()
+    if not samples:
+        print("В базе нет транскрипций для обучения")
+        return 1
+    try:
+        data = TranscriptionCodec.train(samples, size)
+    except zstandard.ZstdError as e:
+        print(f"Не удалось обучить словарь на {len(samples)} транскрипциях: {e}")
+        return 1
+
+    dict_id = await backend.add_compression_dictionary(data)
+    print(f"Словарь {dict_id} ({len(data)} байт) обучен на {len(samples)} транскрипциях")
+    return await _recompress()
+
+
+async def _recompress():
+    from ..services.database import db_service
+
+    await db_service.initialize()
+    before, after, rows = await db_service.backend.recompress_transcriptions()
+    print(f"Пересжато строк: {rows}, {before} -> {after} байт")
+    await db_service.close()
+    return 0
+
+
+def main() -> int:
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command == 'train':
+        return asyncio.run(_train(int(sys.argv[2]) if len(sys.argv) > 2 else 64 * 1024))
+    if command == 'recompress':
+        return asyncio.run(_recompress())
+    print(__doc__)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
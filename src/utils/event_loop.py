@@ -0,0 +1,93 @@
+"""Жизненный цикл event loop и мост для вызова корутин из синхронного кода"""
+import asyncio
+import logging
+import sys
+import threading
+from typing import Any, Coroutine, Optional
+
+from ..config.settings import USE_UVLOOP
+
+logger = logging.getLogger(__name__)
+
+
+def _uvloop():
+    """Модуль uvloop, если он включен и установлен"""
+    if not USE_UVLOOP:
+        return None
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("USE_UVLOOP=1, но uvloop не установлен, используется стандартный event loop")
+        return None
+    return uvloop
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Новый event loop: uvloop при USE_UVLOOP=1, иначе стандартный"""
+    uvloop = _uvloop()
+    return uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+
+
+def run(main: Coroutine) -> Any:
+    """Выполняет корутину в новом event loop и закрывает его вместе с оставшимися задачами"""
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=new_event_loop) as runner:
+            return runner.run(main)
+
+    uvloop = _uvloop()
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(main)
+
+
+class LoopBridge:
+    """Потокобезопасный вызов корутин из синхронного кода
+
+    Пока работает бот, корутины выполняются в его event loop через
+    run_coroutine_threadsafe, а вызывающий поток ждет результат. Без бота
+    (скрипты, консоль) используется собственный event loop в фоновом потоке.
+    Из потока самого event loop мост вызывать нельзя - там нужен await.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._own_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Подключает event loop бота"""
+        self._loop = loop
+
+    def detach(self):
+        """Отключает event loop бота перед его остановкой"""
+        self._loop = None
+
+    def _target_loop(self) -> asyncio.AbstractEventLoop:
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            return loop
+
+        with self._lock:
+            if self._own_loop is None:
+                self._own_loop = new_event_loop()
+                threading.Thread(
+                    target=self._own_loop.run_forever, name='loop-bridge', daemon=True
+                ).start()
+            return self._own_loop
+
+    def run(self, coroutine: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Выполняет корутину и возвращает ее результат"""
+        loop = self._target_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coroutine.close()
+            raise RuntimeError("Синхронную обертку нельзя вызывать из event loop, используйте await")
+
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result(timeout)
+
+
+# Глобальный мост между синхронным кодом и event loop
+loop_bridge = LoopBridge()
@@ -0,0 +1,123 @@
+"""Профилирование по требованию и обнаружение блокировок event loop"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from ..config.settings import PROFILE_DIR, LOOP_STALL_THRESHOLD_MS
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер потока с event loop"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._running = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        """Сворачивает стек в строку формата flamegraph"""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def run(self, thread_id: int, duration: float) -> Optional[str]:
+        """Собирает стеки потока thread_id в течение duration секунд и пишет их на диск
+
+        Блокирующий вызов, запускается вне event loop (например, через asyncio.to_thread).
+        Возвращает путь к файлу с результатами или None, если профайлер уже запущен.
+        """
+        with self._lock:
+            if self._running:
+                return None
+            self._running = True
+
+        try:
+            samples: Counter = Counter()
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                if frame is not None:
+                    samples[self._collapse(frame)] += 1
+                del frame
+                time.sleep(self.interval)
+
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+
+            logger.info(f"Профиль записан в {path} ({sum(samples.values())} сэмплов)")
+            return path
+        finally:
+            self._running = False
+
+
+class LoopStallDetector:
+    """Обнаруживает блокировки event loop и логирует стек, который их вызвал"""
+
+    def __init__(self, threshold_ms: float = LOOP_STALL_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    async def _heartbeat(self):
+        """Периодически отмечается из event loop"""
+        interval = self.threshold / 4
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(interval)
+
+    def _watch(self):
+        """Поток-сторож: проверяет, что event loop вовремя отмечается"""
+        reported = False
+        while not self._stop.wait(self.threshold / 4):
+            stalled_for = time.monotonic() - self._last_beat
+            if stalled_for < self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            reported = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else 'стек недоступен'
+            del frame
+            logger.warning(f"Event loop заблокирован на {stalled_for * 1000:.0f} мс:\n{stack}")
+
+    def start(self):
+        """Запускает детектор, вызывается из работающего event loop"""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name='loop-stall-detector', daemon=True).start()
+        logger.info(f"Детектор блокировок event loop включен (порог {self.threshold * 1000:.0f} мс)")
+
+    def stop(self):
+        """Останавливает детектор"""
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+
+
+# Глобальный экземпляр профайлера
+profiler = SamplingProfiler()
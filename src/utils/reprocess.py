@@ -0,0 +1,349 @@
+"""Пакетная переобработка сохраненных голосовых сообщений
+
+Перебирает user_messages за диапазон дат (всех пользователей или одного),
+скачивает записи из S3 по s3_key (исходные или их копии в Opus) и распознает их заново, и/или
+заново строит суммаризации по дням. Распознавание идет тем же конвейером,
+что и в боте (сжатие тишины, режим STT_MODE); новые транскрипции
+записываются в базу. Суммаризации бот не хранит, поэтому они дописываются
+в JSONL файл.
+
+    python -m src.utils.reprocess --from 2024-01-01 --to 2024-01-31 --transcribe
+    python -m src.utils.reprocess --from 2024-01-01 --user 12345 --summarize --summaries-out summaries.jsonl
+
+Одновременно обрабатывается не больше --workers сообщений, запросы к
+SpeechKit и Yandex GPT ограничены --rate в секунду. Прогресс сохраняется в
+--checkpoint, повторный запуск с теми же параметрами продолжает с места
+остановки (--restart начинает заново).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ..config.messages import STT_ERROR
+from ..config.settings import STT_MODE, STT_POLL_INTERVAL, STT_OPERATION_MAX_AGE
+from ..models.message_row import MessageRow
+from ..services.audio_executor import audio_executor
+from ..services.database import db_service
+from ..services.message_summarizer import MessageSummarizer
+from ..services.s3_uploader import s3_uploader
+from ..services.send_scheduler import TokenBucket
+from ..services.voice_processor import VoiceProcessor
+from ..services.voice_queue import voice_queue
+from .event_loop import run
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500
+PROGRESS_INTERVAL = 5.0
+
+
+class Checkpoint:
+    """Состояние переобработки в JSON файле
+
+    Для распознавания хранится id, до которого (включительно) все сообщения
+    обработаны, для суммаризаций - уже готовые дни. Файл заменяется атомарно.
+    """
+
+    def __init__(self, path: str, params: Dict[str, Any]):
+        self.path = path
+        self.params = params
+        self.last_id = 0
+        self.summaries_done: Set[str] = set()
+        self.failed: List[str] = []
+
+    def load(self) -> bool:
+        """Читает сохраненное состояние; False, если оно от запуска с другими параметрами"""
+        if not os.path.exists(self.path):
+            return True
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('params') != self.params:
+            return False
+        self.last_id = data.get('last_id', 0)
+        self.summaries_done = set(data.get('summaries_done', []))
+        self.failed = data.get('failed', [])
+        return True
+
+    def save(self):
+        data = {
+            'params': self.params,
+            'last_id': self.last_id,
+            'summaries_done': sorted(self.summaries_done),
+            'failed': self.failed
+        }
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class Reprocessor:
+    """Пул воркеров над страницами user_messages с ограничением частоты запросов к API"""
+
+    def __init__(self, args: argparse.Namespace, checkpoint: Checkpoint):
+        self.args = args
+        self.checkpoint = checkpoint
+        self.bucket = TokenBucket(args.rate, max(1.0, args.rate))
+        self.stats = {
+            'transcribed': 0,
+            'changed': 0,
+            'skipped': 0,
+            'summaries': 0,
+            'failed': 0,
+            'bytes': 0
+        }
+        self._in_flight: Set[int] = set()
+        self._dispatched = checkpoint.last_id
+        self._started = time.monotonic()
+
+    async def _throttle(self):
+        """Ждет разрешения на запрос к внешнему API"""
+        delay = self.bucket.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _pool(self, items: AsyncIterator[Any], handle: Callable[[Any], Awaitable[None]]):
+        """Обрабатывает элементы не более чем в args.workers задачах"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.args.workers * 2)
+
+        async def worker():
+            while (item := await queue.get()) is not None:
+                await handle(item)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.args.workers)]
+        try:
+            async for item in items:
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _pages(self, after_id: int) -> AsyncIterator[MessageRow]:
+        """Сообщения диапазона по возрастанию id, постранично"""
+        while True:
+            page = await db_service.get_messages_page(
+                self.args.start, self.args.end, after_id, PAGE_SIZE, self.args.user
+            )
+            for message in page:
+                yield message
+            if len(page) < PAGE_SIZE:
+                return
+            after_id = page[-1].id
+
+    # Распознавание
+
+    async def transcribe_all(self):
+        async def dispatch() -> AsyncIterator[MessageRow]:
+            async for message in self._pages(self.checkpoint.last_id):
+                self._in_flight.add(message.id)
+                self._dispatched = message.id
+                yield message
+
+        await self._pool(dispatch(), self._transcribe_one)
+
+    def save_checkpoint(self):
+        """Сохраняет прогресс: last_id сдвигается до первого незавершенного сообщения"""
+        if self._in_flight:
+            self.checkpoint.last_id = min(self._in_flight) - 1
+        else:
+            self.checkpoint.last_id = self._dispatched
+        self.checkpoint.save()
+
+    async def _transcribe_one(self, message: MessageRow):
+        try:
+            if not message.s3_key:
+                self.stats['skipped'] += 1
+                return
+            transcription = await self._recognize(message)
+            if transcription == STT_ERROR:
+                raise RuntimeError(STT_ERROR)
+
+            self.stats['transcribed'] += 1
+            if transcription != message.transcription:
+                self.stats['changed'] += 1
+                if not self.args.dry_run:
+                    await db_service.update_transcription(
+                        message.user_id, message.message_id, message.date, transcription
+                    )
+        except Exception as e:
+            # Сообщение не задерживает checkpoint, ошибка запоминается в нем для разбора
+            self.stats['failed'] += 1
+            self.checkpoint.failed.append(f'{message.user_id}/{message.message_id}')
+            logger.error(f"Не удалось переобработать сообщение {message.id} ({message.s3_key}): {e}")
+        finally:
+            self._in_flight.discard(message.id)
+
+    async def _recognize(self, message: MessageRow) -> str:
+        """Распознает запись из S3 в режиме STT_MODE"""
+        if STT_MODE == 'async':
+            # SpeechKit читает файл из бакета сам, скачивать запись не нужно
+            await self._throttle()
+            operation_id = await VoiceProcessor.start_long_running_recognition(
+                s3_uploader.object_uri(message.s3_key)
+            )
+            # Зависшая или потерянная операция не должна занимать воркер навсегда
+            deadline = time.monotonic() + STT_OPERATION_MAX_AGE
+            while time.monotonic() < deadline:
+                await asyncio.sleep(STT_POLL_INTERVAL)
+                await self._throttle()
+                operation = await VoiceProcessor.get_recognition_operation(operation_id)
+                transcription = VoiceProcessor.extract_operation_text(operation)
+                if transcription is not None:
+                    return transcription
+            raise TimeoutError(f"операция {operation_id} не завершилась за {STT_OPERATION_MAX_AGE:.0f} с")
+
+        audio_data = await s3_uploader.download_voice_file(message.s3_key)
+        self.stats['bytes'] += len(audio_data)
+        stt_audio, _ = await voice_queue.prepare_audio(
+            message.user_id, message.message_id, audio_data, message.audio_seconds
+        )
+        await self._throttle()
+        return await voice_queue.recognize(stt_audio)
+
+    # Суммаризации
+
+    async def _days(self) -> List[Tuple[str, str]]:
+        """Пары (пользователь, дата) с сообщениями в диапазоне"""
+        days = set()
+        async for message in self._pages(0):
+            days.add((message.user_id, message.date))
+        return sorted(days)
+
+    async def summarize_all(self):
+        days = [
+            day for day in await self._days()
+            if f'{day[0]}/{day[1]}' not in self.checkpoint.summaries_done
+        ]
+        with open(self.args.summaries_out, 'a', encoding='utf-8') as output:
+            async def summarize(day: Tuple[str, str]):
+                await self._summarize_one(day, output)
+
+            async def items() -> AsyncIterator[Tuple[str, str]]:
+                for day in days:
+                    yield day
+
+            await self._pool(items(), summarize)
+
+    async def _summarize_one(self, day: Tuple[str, str], output):
+        user_id, day_date = day
+        try:
+            transcriptions = await db_service.get_user_transcriptions(user_id, day_date)
+            await self._throttle()
+            summary = await MessageSummarizer.summarize_messages(transcriptions)
+            if MessageSummarizer.is_error(summary):
+                raise RuntimeError(summary)
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error(f"Не удалось построить суммаризацию {user_id} за {day_date}: {e}")
+            return
+
+        output.write(json.dumps({
+            'user_id': user_id,
+            'date': day_date,
+            'messages': len(transcriptions),
+            'summary': summary
+        }, ensure_ascii=False) + '\n')
+        output.flush()
+        self.stats['summaries'] += 1
+        self.checkpoint.summaries_done.add(f'{user_id}/{day_date}')
+
+    # Прогресс
+
+    def report(self) -> str:
+        elapsed = time.monotonic() - self._started
+        done = self.stats['transcribed'] + self.stats['summaries'] + self.stats['failed']
+        return (
+            f"[{elapsed:6.0f} с] распознано {self.stats['transcribed']} (изменено {self.stats['changed']}, "
+            f"без записи {self.stats['skipped']}), суммаризаций {self.stats['summaries']}, "
+            f"ошибок {self.stats['failed']}; {done / elapsed if elapsed else 0:.2f} операций/с, "
+            f"S3 {self.stats['bytes'] / 1024 / 1024 / elapsed if elapsed else 0:.2f} МБ/с, "
+            f"checkpoint id {self.checkpoint.last_id}"
+        )
+
+    async def progress(self):
+        """Периодически печатает прогресс и сохраняет checkpoint"""
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            self.save_checkpoint()
+            print(self.report(), flush=True)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    today = date.today().strftime('%Y-%m-%d')
+    parser = argparse.ArgumentParser(
+        prog='python -m src.utils.reprocess',
+        description="Повторное распознавание голосовых сообщений и построение суммаризаций"
+    )
+    parser.add_argument('--from', dest='start', required=True, help="первая дата диапазона, YYYY-MM-DD")
+    parser.add_argument('--to', dest='end', default=today, help="последняя дата диапазона (по умолчанию сегодня)")
+    parser.add_argument('--user', help="только сообщения этого пользователя")
+    parser.add_argument('--transcribe', action='store_true', help="распознать записи из S3 заново")
+    parser.add_argument('--summarize', action='store_true', help="построить суммаризации по дням")
+    parser.add_argument('--summaries-out', default='summaries.jsonl', help="файл для суммаризаций (JSONL)")
+    parser.add_argument('--workers', type=int, default=4, help="одновременно обрабатываемых сообщений")
+    parser.add_argument('--rate', type=float, default=2.0, help="запросов к SpeechKit и Yandex GPT в секунду")
+    parser.add_argument('--checkpoint', default='reprocess.checkpoint.json', help="файл прогресса")
+    parser.add_argument('--restart', action='store_true', help="игнорировать сохраненный прогресс")
+    parser.add_argument('--dry-run', action='store_true', help="распознавать, но не записывать в базу")
+    args = parser.parse_args(argv)
+    if not (args.transcribe or args.summarize):
+        parser.error("укажите --transcribe и/или --summarize")
+    if args.workers < 1 or args.rate <= 0:
+        parser.error("--workers и --rate должны быть положительными")
+    return args
+
+
+async def reprocess(args: argparse.Namespace) -> int:
+    params = {
+        key: getattr(args, key)
+        for key in ('start', 'end', 'user', 'transcribe', 'summarize', 'dry_run')
+    }
+    checkpoint = Checkpoint(args.checkpoint, params)
+    if not args.restart and not checkpoint.load():
+        print(f"{args.checkpoint} сохранен для других параметров, запустите с --restart", file=sys.stderr)
+        return 1
+
+    reprocessor = Reprocessor(args, checkpoint)
+    progress = asyncio.create_task(reprocessor.progress())
+    try:
+        if args.transcribe:
+            await reprocessor.transcribe_all()
+        if args.summarize:
+            # Суммаризации строятся уже по новым транскрипциям
+            await reprocessor.summarize_all()
+    finally:
+        progress.cancel()
+        await asyncio.gather(progress, return_exceptions=True)
+        reprocessor.save_checkpoint()
+        print(reprocessor.report())
+        await db_service.close()
+        audio_executor.shutdown()
+
+    return 1 if reprocessor.stats['failed'] else 0
+
+
+def main() -> int:
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.WARNING
+    )
+    args = parse_args()
+    try:
+        return run(reprocess(args))
+    except KeyboardInterrupt:
+        print("Прервано, прогресс сохранен", file=sys.stderr)
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,30 +1,39 @@
 """Утилиты для работы с хранилищем данных"""
-import asyncio
-from typing import Any, Dict, List
-from datetime import date, datetime
+from typing import Any, Dict, List, Sequence
+from datetime import date, datetime, timedelta
 
+from ..models.message_row import MessageRow
 from ..models.user_message import UserMessage
+from ..models.user_stats import UserStats
 from ..services.database import db_service
+from .event_loop import loop_bridge
 
 
-async def get_user_messages(user_id: str, target_date: str = None) -> List[Dict[str, Any]]:
-    """Получает сообщения пользователя за определенную дату"""
+async def get_user_messages(user_id: str, target_date: str = None) -> List[MessageRow]:
+    """Получает сообщения пользователя за определенную дату
+
+    Строки поддерживают доступ по ключу (msg['transcription'], msg.get(...)),
+    как словари, которые функция возвращала раньше.
+    """
     if target_date is None:
         target_date = date.today().strftime('%Y-%m-%d')
     
-    messages = await db_service.get_user_messages(user_id, target_date)
-    
-    # Конвертируем модели в словари для обратной совместимости
-    result = []
-    for msg in messages:
-        result.append({
-            'message_id': msg.message_id,
-            'timestamp': msg.timestamp,
-            's3_key': msg.s3_key,
-            'transcription': msg.transcription
-        })
+    return await db_service.get_user_messages(user_id, target_date)
+
+
+async def get_message_columns(
+    user_id: str,
+    columns: Sequence[str],
+    start_date: str = None,
+    end_date: str = None
+) -> Dict[str, tuple]:
+    """Только нужные колонки сообщений пользователя за диапазон дат (по умолчанию за сегодня)"""
+    if start_date is None:
+        start_date = date.today().strftime('%Y-%m-%d')
+    if end_date is None:
+        end_date = start_date
     
-    return result
+    return await db_service.fetch_message_columns(user_id, start_date, end_date, columns)
 
 
 async def add_user_message(user_id: str, message_data: Dict[str, Any], target_date: str = None):
@@ -39,7 +48,11 @@ async def add_user_message(user_id: str, message_data: Dict[str, Any], target_da
         date=target_date,
         timestamp=message_data.get('timestamp', datetime.now().isoformat()),
         s3_key=message_data.get('s3_key'),
-        transcription=message_data.get('transcription')
+        transcription=message_data.get('transcription'),
+        audio_seconds=message_data.get('audio_seconds'),
+        audio_bytes=message_data.get('audio_bytes'),
+        archive_codec=message_data.get('archive_codec'),
+        archive_bytes=message_data.get('archive_bytes')
     )
     
     # Сохраняем в базе данных
@@ -62,26 +75,38 @@ async def has_user_messages(user_id: str, target_date: str = None) -> bool:
     return await db_service.has_user_messages(user_id, target_date)
 
 
-# Синхронные обертки для обратной совместимости
-def get_user_messages_sync(user_id: str, target_date: str = None) -> List[Dict[str, Any]]:
+async def record_summary(user_id: str, target_date: str = None):
+    """Учитывает построенную суммаризацию в статистике пользователя"""
+    if target_date is None:
+        target_date = date.today().strftime('%Y-%m-%d')
+    
+    await db_service.record_summary(user_id, target_date)
+
+
+async def get_user_stats(user_id: str, days: int = None) -> UserStats:
+    """Статистика пользователя за последние days дней (None - за все время)"""
+    today = date.today()
+    start_date = (today - timedelta(days=days - 1)).strftime('%Y-%m-%d') if days else '0000-00-00'
+    
+    return await db_service.get_user_stats(user_id, start_date, today.strftime('%Y-%m-%d'))
+
+
+# Синхронные обертки для обратной совместимости (для кода вне event loop, например потоков)
+def get_user_messages_sync(user_id: str, target_date: str = None) -> List[MessageRow]:
     """Синхронная обертка для получения сообщений пользователя"""
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(get_user_messages(user_id, target_date))
+    return loop_bridge.run(get_user_messages(user_id, target_date))
 
 
 def add_user_message_sync(user_id: str, message_data: Dict[str, Any], target_date: str = None):
     """Синхронная обертка для добавления сообщения пользователя"""
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(add_user_message(user_id, message_data, target_date))
+    loop_bridge.run(add_user_message(user_id, message_data, target_date))
 
 
 def get_user_transcriptions_sync(user_id: str, target_date: str = None) -> List[str]:
     """Синхронная обертка для получения транскрипций пользователя"""
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(get_user_transcriptions(user_id, target_date))
+    return loop_bridge.run(get_user_transcriptions(user_id, target_date))
 
 
 def has_user_messages_sync(user_id: str, target_date: str = None) -> bool:
     """Синхронная обертка для проверки наличия сообщений пользователя"""
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(has_user_messages(user_id, target_date))
+    return loop_bridge.run(has_user_messages(user_id, target_date))
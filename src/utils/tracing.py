@@ -0,0 +1,159 @@
+"""Трассировка обработки отдельных обновлений"""
+import contextvars
+import functools
+import json
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from ..config.settings import TRACE_SLOW_THRESHOLD_MS, TRACE_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Текущая трасса и текущий span для задачи asyncio
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('current_trace', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """Отрезок времени внутри трассы"""
+
+    __slots__ = ('span_id', 'name', 'parent_id', 'attrs', 'start', 'duration_ms', 'error')
+
+    def __init__(self, name: str, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.span_id = 0
+        self.name = name
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def finish(self):
+        """Фиксирует длительность span'а"""
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+
+
+class Trace:
+    """Трасса обработки одного обновления"""
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def add_span(self, span: Span):
+        """Регистрирует span в трассе"""
+        span.span_id = len(self.spans) + 1
+        self.spans.append(span)
+
+    def to_dict(self, duration_ms: float) -> Dict[str, Any]:
+        """Представление трассы для структурированного лога"""
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'duration_ms': round(duration_ms, 2),
+            'attrs': self.attrs,
+            'spans': [
+                {
+                    'id': span.span_id,
+                    'parent': span.parent_id,
+                    'name': span.name,
+                    'offset_ms': round((span.start - self.start) * 1000, 2),
+                    'duration_ms': round(span.duration_ms, 2) if span.duration_ms is not None else None,
+                    'error': span.error,
+                    **({'attrs': span.attrs} if span.attrs else {})
+                }
+                for span in self.spans
+            ]
+        }
+
+
+def get_current_trace_id() -> Optional[str]:
+    """Возвращает идентификатор текущей трассы"""
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Контекстный менеджер для замера участка кода внутри текущей трассы"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, attrs)
+    trace.add_span(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+
+
+def trace_span(name: str):
+    """Декоратор для асинхронных вызовов сервисов"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _update_attrs(update: Any) -> Dict[str, Any]:
+    """Извлекает из обновления атрибуты для трассы"""
+    attrs: Dict[str, Any] = {'update_id': getattr(update, 'update_id', None)}
+    user = getattr(update, 'effective_user', None)
+    if user is not None:
+        attrs['user_id'] = user.id
+    callback_query = getattr(update, 'callback_query', None)
+    if callback_query is not None:
+        attrs['callback_data'] = callback_query.data
+    return attrs
+
+
+def _report(trace: Trace, duration_ms: float):
+    """Пишет трассу в лог, если она медленная или попала в выборку"""
+    if duration_ms >= TRACE_SLOW_THRESHOLD_MS:
+        logger.warning("slow_update %s", json.dumps(trace.to_dict(duration_ms), ensure_ascii=False))
+    elif TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE:
+        logger.info("sampled_update %s", json.dumps(trace.to_dict(duration_ms), ensure_ascii=False))
+
+
+@contextmanager
+def root_trace(name: str, **attrs):
+    """Открывает корневую трассу для единицы работы вне обработчиков (например, задания очереди)"""
+    trace = Trace(name, attrs)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    except Exception as e:
+        trace.attrs['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _report(trace, (time.perf_counter() - trace.start) * 1000)
+
+
+def trace_handler(func):
+    """Декоратор для обработчиков обновлений: открывает корневую трассу"""
+    @functools.wraps(func)
+    async def wrapper(update, context, *args, **kwargs):
+        with root_trace(func.__name__, **_update_attrs(update)):
+            return await func(update, context, *args, **kwargs)
+    return wrapper
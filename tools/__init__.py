@@ -0,0 +1 @@
+"""Вспомогательные инструменты для разработки и проверки бота"""
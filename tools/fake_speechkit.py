@@ -0,0 +1,129 @@
+"""Локальная заглушка Yandex SpeechKit для проверки распознавания без облака
+
+Поддерживает синхронный API (POST /speech/v1/stt:recognize), запуск
+асинхронного распознавания (POST /speech/stt/v2/longRunningRecognize) и
+опрос операций (GET /operations/<id>). Операция завершается через
+--delay секунд, в качестве текста возвращается адрес распознанного файла.
+
+Запуск: python -m tools.fake_speechkit [--port 8090] [--delay 2]
+
+Для бота:
+    YANDEX_STT_URL=http://127.0.0.1:8090/speech/v1/stt:recognize
+    YANDEX_STT_ASYNC_URL=http://127.0.0.1:8090/speech/stt/v2/longRunningRecognize
+    YANDEX_OPERATION_URL=http://127.0.0.1:8090/operations
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+
+class FakeSpeechKit:
+    """Состояние заглушки: операции и счетчики запросов"""
+
+    def __init__(self, delay: float = 2.0):
+        self.delay = delay
+        self.operations: Dict[str, Dict[str, Any]] = {}
+        self.requests = {'recognize': 0, 'long_running': 0, 'operation': 0}
+        self.lock = threading.Lock()
+
+    def start_operation(self, uri: str) -> Dict[str, Any]:
+        operation_id = uuid.uuid4().hex
+        with self.lock:
+            self.requests['long_running'] += 1
+            self.operations[operation_id] = {'uri': uri, 'ready_at': time.time() + self.delay}
+        return {'id': operation_id, 'done': False}
+
+    def get_operation(self, operation_id: str) -> Dict[str, Any]:
+        with self.lock:
+            self.requests['operation'] += 1
+            operation = self.operations.get(operation_id)
+        if operation is None:
+            return None
+        if time.time() < operation['ready_at']:
+            return {'id': operation_id, 'done': False}
+        return {
+            'id': operation_id,
+            'done': True,
+            'response': {
+                'chunks': [
+                    {'alternatives': [{'text': f"распознано: {operation['uri']}", 'confidence': 1}], 'channelTag': '1'}
+                ]
+            }
+        }
+
+
+def make_handler(state: FakeSpeechKit):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: Any):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        def do_POST(self):
+            body = self._read_body()
+            if self.path.startswith('/speech/v1/stt:recognize'):
+                with state.lock:
+                    state.requests['recognize'] += 1
+                self._reply(200, {'result': f"распознано {len(body)} байт"})
+            elif self.path.startswith('/speech/stt/v2/longRunningRecognize'):
+                uri = json.loads(body)['audio']['uri']
+                self._reply(200, state.start_operation(uri))
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_GET(self):
+            if self.path.startswith('/operations/'):
+                operation = state.get_operation(self.path.rsplit('/', 1)[-1])
+                if operation is None:
+                    self._reply(404, {'error': 'operation not found'})
+                else:
+                    self._reply(200, operation)
+            elif self.path == '/stats':
+                self._reply(200, state.requests)
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_fake_speechkit(port: int = 0, delay: float = 2.0):
+    """Запускает заглушку в фоновом потоке, возвращает (сервер, состояние)
+
+    При port=0 порт выбирается свободный: server.server_address[1].
+    """
+    state = FakeSpeechKit(delay)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--delay', type=float, default=2.0, help="время выполнения операции, с")
+    args = parser.parse_args()
+
+    state = FakeSpeechKit(args.delay)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(state))
+    print(f"Заглушка SpeechKit слушает http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Локальная заглушка gRPC распознавателя SpeechKit v3 (Recognizer.RecognizeStreaming)
+
+На каждую полученную часть аудио отвечает промежуточным результатом, каждые
+--chunks-per-phrase частей завершает фразу (final и final_refinement).
+Задержка --chunk-delay имитирует распознавание в реальном времени.
+
+Запуск: python -m tools.fake_stt_grpc [--port 50051]
+
+Для бота:
+    STT_MODE=stream
+    YANDEX_STT_GRPC_ENDPOINT=127.0.0.1:50051
+    YANDEX_STT_GRPC_INSECURE=1
+"""
+import argparse
+import time
+from concurrent import futures
+
+import grpc
+from yandex.cloud.ai.stt.v3 import stt_pb2, stt_service_pb2_grpc
+
+
+class FakeRecognizer(stt_service_pb2_grpc.RecognizerServicer):
+    """Распознаватель, который «слышит» по слову на каждую часть аудио"""
+
+    def __init__(self, chunks_per_phrase: int = 4, chunk_delay: float = 0.0):
+        self.chunks_per_phrase = chunks_per_phrase
+        self.chunk_delay = chunk_delay
+        self.sessions = 0
+
+    @staticmethod
+    def _alternative_update(text: str) -> stt_pb2.AlternativeUpdate:
+        return stt_pb2.AlternativeUpdate(alternatives=[stt_pb2.Alternative(text=text)], channel_tag='0')
+
+    def _finish_phrase(self, final_index: int, words):
+        text = ' '.join(words)
+        yield stt_pb2.StreamingResponse(
+            audio_cursors=stt_pb2.AudioCursors(final_index=final_index),
+            final=self._alternative_update(text)
+        )
+        yield stt_pb2.StreamingResponse(
+            audio_cursors=stt_pb2.AudioCursors(final_index=final_index),
+            final_refinement=stt_pb2.FinalRefinement(
+                final_index=final_index,
+                normalized_text=self._alternative_update(text.capitalize() + '.')
+            )
+        )
+
+    def RecognizeStreaming(self, request_iterator, context):
+        self.sessions += 1
+        final_index = 0
+        words = []
+        received = 0
+
+        for request in request_iterator:
+            if not request.HasField('chunk'):
+                continue
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+
+            received += len(request.chunk.data)
+            words.append(f"слово{len(words) + 1}")
+            yield stt_pb2.StreamingResponse(
+                audio_cursors=stt_pb2.AudioCursors(received_data_ms=received, final_index=final_index),
+                partial=self._alternative_update(' '.join(words))
+            )
+
+            if len(words) >= self.chunks_per_phrase:
+                yield from self._finish_phrase(final_index, words)
+                final_index += 1
+                words = []
+
+        if words:
+            yield from self._finish_phrase(final_index, words)
+
+
+def start_fake_recognizer(port: int = 0, chunks_per_phrase: int = 4, chunk_delay: float = 0.0):
+    """Запускает заглушку в фоне, возвращает (сервер, распознаватель, порт)"""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+    recognizer = FakeRecognizer(chunks_per_phrase, chunk_delay)
+    stt_service_pb2_grpc.add_RecognizerServicer_to_server(recognizer, server)
+    port = server.add_insecure_port(f'127.0.0.1:{port}')
+    server.start()
+    return server, recognizer, port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=50051)
+    parser.add_argument('--chunks-per-phrase', type=int, default=4)
+    parser.add_argument('--chunk-delay', type=float, default=0.1, help="задержка на часть аудио, с")
+    args = parser.parse_args()
+
+    server, _, port = start_fake_recognizer(args.port, args.chunks_per_phrase, args.chunk_delay)
+    print(f"Заглушка gRPC распознавателя слушает 127.0.0.1:{port}")
+    try:
+        server.wait_for_termination()
+    except KeyboardInterrupt:
+        server.stop(0)
+
+
+if __name__ == '__main__':
+    main()